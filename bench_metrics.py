@@ -0,0 +1,36 @@
+"""Benchmark the per-event overhead of the handler histogram wrapper
+
+Usage: python bench_metrics.py [events]
+"""
+import asyncio
+import sys
+import time
+
+from jinbe import MetricsRegistry
+
+async def run_pass(callback, count):
+    start = time.perf_counter()
+    for _ in range(count):
+        await callback(None)
+    return (time.perf_counter() - start) / count
+
+async def main(count):
+    registry = MetricsRegistry()
+    registry.histogram("jinbe_event_handler_seconds", "handlers")
+    
+    async def on_message(message):
+        return None
+    
+    timed = registry.timed(on_message)
+    # Warm up both paths outside the measurement
+    await run_pass(on_message, 1000)
+    await run_pass(timed, 1000)
+    
+    plain = await run_pass(on_message, count)
+    wrapped = await run_pass(timed, count)
+    print(f"{count} events")
+    print(f"{'plain':>8}: {plain * 1e6:7.3f} µs/event")
+    print(f"{'timed':>8}: {wrapped * 1e6:7.3f} µs/event   overhead {(wrapped - plain) * 1e6:7.3f} µs/event")
+
+if __name__ == "__main__":
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 100000))
@@ -0,0 +1,62 @@
+"""Benchmark quote card rendering with a cold and a warm cache
+
+Usage: python bench_quote_cards.py [renders] [concurrency]
+Needs Pillow.
+"""
+import asyncio
+import io
+import sys
+import tempfile
+import time
+
+from jinbe import Image, QuoteCardRenderer
+
+def make_avatar(seed):
+    buffer = io.BytesIO()
+    Image.new("RGB", (128, 128), (seed * 37 % 256, seed * 91 % 256, 200)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+def percentile(values, fraction):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * fraction))]
+
+async def run_pass(renderer, quotes, concurrency):
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+    
+    async def render(index, avatar):
+        async def load():
+            return avatar
+        async with semaphore:
+            start = time.perf_counter()
+            await renderer.render_card(f"avatar-{index % 20}", load, f"User {index % 20}",
+                                       f"Quote number {index}: " + "the quick brown fox jumps over the lazy dog " * 4,
+                                       "Jan 01, 2025 • 12:00 UTC")
+            latencies.append(time.perf_counter() - start)
+    
+    start = time.perf_counter()
+    await asyncio.gather(*[render(index, avatar) for index, avatar in quotes])
+    return len(quotes) / (time.perf_counter() - start), latencies
+
+async def main(count, concurrency):
+    quotes = [(index, make_avatar(index % 20)) for index in range(count)]
+    with tempfile.TemporaryDirectory() as cache_dir:
+        renderer = QuoteCardRenderer(cache_dir=cache_dir)
+        # Start the workers outside the measurement
+        await asyncio.get_running_loop().run_in_executor(renderer.pool(), sum, [])
+        
+        results = [("cold", *await run_pass(renderer, quotes, concurrency))]
+        results.append(("warm (memory)", *await run_pass(renderer, quotes, concurrency)))
+        renderer.renders = type(renderer.renders)(renderer.renders.maxsize)
+        results.append(("warm (disk)", *await run_pass(renderer, quotes, concurrency)))
+        renderer.executor.shutdown()
+    
+    print(f"{count} renders, concurrency {concurrency}, {renderer.workers} worker process(es)")
+    for name, rate, latencies in results:
+        print(f"{name:>14}: {rate:8.1f} renders/s   p50 {percentile(latencies, 0.5) * 1000:7.2f} ms   p99 {percentile(latencies, 0.99) * 1000:7.2f} ms")
+    print(f"cards rasterized: {renderer.rendered}")
+
+if __name__ == "__main__":
+    if Image is None:
+        sys.exit("Pillow is not installed")
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else 200, int(sys.argv[2]) if len(sys.argv) > 2 else 8))
@@ -1,17 +1,348 @@
 import discord
+import aiohttp
 import asyncio
 import json
+import bisect
+import copy
+import csv
 import datetime
+import functools
+import gzip
+import hashlib
+import heapq
+import io
+import math
 import os
 import re
+import sys
+import threading
+import time
+import traceback
+from aiohttp import web
+from collections import OrderedDict, deque
+from concurrent.futures import ProcessPoolExecutor
 from discord.ext import commands, tasks
 from discord.ui import Button, View, Select
-from typing import Dict, List, Optional
+from types import MappingProxyType
+from typing import Dict, List, NamedTuple, Optional
 from dotenv import load_dotenv
 
+try:
+    import yaml  # Optional: enables .yaml/.yml template packs
+except ImportError:
+    yaml = None
+
+try:
+    from PIL import Image, ImageDraw, ImageFont  # Optional: enables /quote image cards
+except ImportError:
+    Image = ImageDraw = ImageFont = None
+
 # Load environment variables
 load_dotenv()
 
+# === METRICS ===
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+API_ROUTE_PREFIX = re.compile(r"^/api/v\d+")
+API_ROUTE_REACTIONS = re.compile(r"/reactions/[^/]+")
+API_ROUTE_IDS = re.compile(r"/\d{15,21}(?=/|$)")
+API_ROUTE_TOKENS = re.compile(r"^(/(?:webhooks|interactions)/\{id\})/[^/]+")
+
+def api_route(path):
+    """Collapse IDs, tokens and emoji out of an API path: /channels/{id}/messages"""
+    path = API_ROUTE_PREFIX.sub("", path)
+    path = API_ROUTE_REACTIONS.sub("/reactions/{emoji}", path)
+    path = API_ROUTE_IDS.sub("/{id}", path)
+    return API_ROUTE_TOKENS.sub(r"\1/{token}", path)
+
+class Histogram:
+    """Fixed-bucket histogram; observe() is a bisect and three additions"""
+    
+    __slots__ = ("buckets", "counts", "sum", "count")
+    
+    def __init__(self, buckets=LATENCY_BUCKETS):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # Last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+    
+    def observe(self, value):
+        self.counts[bisect.bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class MetricsRegistry:
+    """Counters, histograms and scrape-time gauges in the Prometheus text format
+    
+    Series are keyed by a tuple of (label, value) pairs. Recording is plain
+    dict and list updates with no locking (everything runs on the event
+    loop), so it is cheap enough for the on_message path; all formatting
+    happens in render() when the endpoint is scraped.
+    """
+    
+    def __init__(self):
+        self.families = {}  # name -> (type, help)
+        self.counters = {}  # name -> {labels: value}
+        self.histograms = {}  # name -> {labels: Histogram}
+        self.gauges = {}  # name -> callable returning {labels: value}
+    
+    def counter(self, name, help_text):
+        self.families[name] = ("counter", help_text)
+        self.counters.setdefault(name, {})
+    
+    def histogram(self, name, help_text):
+        self.families[name] = ("histogram", help_text)
+        self.histograms.setdefault(name, {})
+    
+    def gauge(self, name, help_text, collect):
+        self.families[name] = ("gauge", help_text)
+        self.gauges[name] = collect
+    
+    def inc(self, name, labels=(), amount=1):
+        series = self.counters[name]
+        series[labels] = series.get(labels, 0) + amount
+    
+    def observe(self, name, labels, value):
+        series = self.histograms[name]
+        histogram = series.get(labels)
+        if histogram is None:
+            histogram = series[labels] = Histogram()
+        histogram.observe(value)
+    
+    def timed(self, handler):
+        """Wrap an event handler so its run time lands in the handler histogram"""
+        labels = (("event", handler.__name__),)
+        series = self.histograms["jinbe_event_handler_seconds"]
+        
+        @functools.wraps(handler)
+        async def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                return await handler(*args, **kwargs)
+            finally:
+                elapsed = time.perf_counter() - started
+                histogram = series.get(labels)
+                if histogram is None:
+                    histogram = series[labels] = Histogram()
+                histogram.observe(elapsed)
+        return wrapper
+    
+    @staticmethod
+    def format_labels(labels, extra=()):
+        pairs = tuple(labels) + tuple(extra)
+        if not pairs:
+            return ""
+        escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n") for _, value in pairs)
+        return "{" + ",".join(f'{name}="{value}"' for (name, _), value in zip(pairs, escaped)) + "}"
+    
+    def render(self) -> str:
+        lines = []
+        for name, (kind, help_text) in self.families.items():
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            if kind == "counter":
+                for labels, value in list(self.counters[name].items()):
+                    lines.append(f"{name}{self.format_labels(labels)} {value}")
+            elif kind == "gauge":
+                try:
+                    values = self.gauges[name]()
+                except Exception as e:
+                    print(f"Metrics gauge {name} failed: {e}")
+                    continue
+                for labels, value in values.items():
+                    lines.append(f"{name}{self.format_labels(labels)} {value}")
+            else:
+                for labels, histogram in list(self.histograms[name].items()):
+                    cumulative = 0
+                    for bound, count in zip(histogram.buckets + ("+Inf",), histogram.counts):
+                        cumulative += count
+                        lines.append(f"{name}_bucket{self.format_labels(labels, (('le', bound),))} {cumulative}")
+                    lines.append(f"{name}_sum{self.format_labels(labels)} {histogram.sum}")
+                    lines.append(f"{name}_count{self.format_labels(labels)} {histogram.count}")
+        return "\n".join(lines) + "\n"
+    
+    def http_trace(self):
+        """aiohttp trace hooks counting every Discord API call by route and status"""
+        trace = aiohttp.TraceConfig()
+        
+        async def on_request_end(session, context, params):
+            route = api_route(params.url.path)
+            status = params.response.status
+            self.inc("jinbe_api_requests_total", (("method", params.method), ("route", route), ("status", str(status))))
+            if status == 429:
+                scope = params.response.headers.get("X-RateLimit-Scope", "unknown")
+                self.inc("jinbe_api_rate_limited_total", (("route", route), ("scope", scope)))
+        
+        async def on_request_exception(session, context, params):
+            self.inc("jinbe_api_requests_total", (("method", params.method), ("route", api_route(params.url.path)), ("status", "error")))
+        
+        trace.on_request_end.append(on_request_end)
+        trace.on_request_exception.append(on_request_exception)
+        return trace
+
+metrics = MetricsRegistry()
+metrics.histogram("jinbe_event_handler_seconds", "Time spent in gateway event handlers")
+metrics.counter("jinbe_moderation_verdicts_total", "Messages checked by each moderation detector, by verdict")
+metrics.histogram("jinbe_data_flush_seconds", "Time taken to write bot_data.json")
+metrics.counter("jinbe_data_flush_errors_total", "Failed writes of bot_data.json")
+metrics.counter("jinbe_api_requests_total", "Discord API requests by route and response status")
+metrics.counter("jinbe_api_rate_limited_total", "Discord API 429 responses by route and rate limit scope")
+
+# Label sets used on the on_message path, built once
+AUTOMOD_CLEAN = (("detector", "automod"), ("verdict", "clean"))
+AUTOMOD_VIOLATION = (("detector", "automod"), ("verdict", "violation"))
+NSFW_CLEAN = (("detector", "nsfw"), ("verdict", "clean"))
+NSFW_VIOLATION = (("detector", "nsfw"), ("verdict", "violation"))
+
+class MetricsServer:
+    """Serves GET /metrics for a local Prometheus (or any scraper)"""
+    
+    def __init__(self, registry):
+        self.registry = registry
+        self.runner = None
+    
+    async def handle_metrics(self, request):
+        return web.Response(text=self.registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+    
+    async def start(self, host=METRICS_HOST, port=METRICS_PORT):
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        return site
+    
+    async def stop(self):
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+metrics_server = MetricsServer(metrics)
+
+# === EVENT LOOP MONITOR ===
+
+LOOP_LAG_INTERVAL = 0.05  # Seconds between lag samples
+SLOW_CALLBACK_THRESHOLD = int(os.getenv("SLOW_CALLBACK_MS", "100")) / 1000
+LOOP_STACK_DEPTH = 12  # Frames kept per captured stack
+
+class LoopMonitor:
+    """Event loop lag sampler and slow-callback detector
+    
+    A task ticks every LOOP_LAG_INTERVAL and records how late each tick ran
+    (the loop lag). A watchdog thread checks the time of the last tick; if
+    the loop hasn't ticked for longer than the threshold, something is
+    blocking it, so the watchdog grabs the loop thread's current stack. When
+    the loop comes back the stall is recorded against the subsystem that was
+    running: the class (or function) of the innermost frame in this file,
+    or the module when the stall was outside the bot's own code.
+    """
+    
+    def __init__(self, interval=LOOP_LAG_INTERVAL, threshold=SLOW_CALLBACK_THRESHOLD, registry=metrics):
+        self.interval = interval
+        self.threshold = threshold
+        self.registry = registry
+        self.task = None
+        self.watchdog = None
+        self.stopping = threading.Event()
+        self.loop_thread_id = None
+        self.beat = time.monotonic()
+        self.captured = None  # (subsystem, where, stack) seen by the watchdog during the current stall
+        self.recent_lag = deque(maxlen=1200)  # About a minute of samples
+        self.max_lag = 0.0
+        self.offenders = {}  # subsystem -> {"count", "total", "worst", "where", "stack"}
+    
+    def start(self):
+        if self.task and not self.task.done():
+            return
+        self.loop_thread_id = threading.get_ident()
+        self.beat = time.monotonic()
+        self.stopping.clear()
+        self.task = asyncio.get_running_loop().create_task(self.sample())
+        self.watchdog = threading.Thread(target=self.watch, name="loop-watchdog", daemon=True)
+        self.watchdog.start()
+    
+    def stop(self):
+        self.stopping.set()
+        if self.task:
+            self.task.cancel()
+            self.task = None
+    
+    async def sample(self):
+        while True:
+            expected = time.monotonic() + self.interval
+            await asyncio.sleep(self.interval)
+            now = time.monotonic()
+            self.beat = now
+            lag = max(0.0, now - expected)
+            self.registry.observe("jinbe_event_loop_lag_seconds", (), lag)
+            self.recent_lag.append(lag)
+            self.max_lag = max(self.max_lag, lag)
+            
+            captured, self.captured = self.captured, None
+            if captured and lag >= self.threshold:
+                self.record(*captured, lag)
+    
+    def watch(self):
+        stalled_since = None
+        while not self.stopping.wait(self.threshold / 4):
+            beat = self.beat
+            if time.monotonic() - beat <= self.interval + self.threshold:
+                continue
+            if stalled_since == beat:
+                continue  # Already captured this stall
+            stalled_since = beat
+            frame = sys._current_frames().get(self.loop_thread_id)
+            if frame is not None:
+                self.captured = self.attribute(frame)
+    
+    @staticmethod
+    def attribute(frame):
+        """(subsystem, where, formatted stack) for a frame of the blocked loop thread"""
+        culprit = frame
+        current = frame
+        while current is not None:
+            if current.f_code.co_filename == __file__:
+                culprit = current
+                break
+            current = current.f_back
+        code = culprit.f_code
+        if code.co_filename == __file__:
+            subsystem = code.co_qualname.split(".")[0]
+        else:
+            subsystem = culprit.f_globals.get("__name__", "unknown")
+        where = f"{os.path.basename(code.co_filename)}:{culprit.f_lineno} in {code.co_qualname}"
+        stack = "".join(traceback.format_list(traceback.extract_stack(frame, limit=LOOP_STACK_DEPTH)))
+        return subsystem, where, stack
+    
+    def record(self, subsystem, where, stack, duration):
+        offender = self.offenders.setdefault(subsystem, {"count": 0, "total": 0.0, "worst": 0.0, "where": where, "stack": stack})
+        offender["count"] += 1
+        offender["total"] += duration
+        if duration >= offender["worst"]:
+            offender.update(worst=duration, where=where, stack=stack)
+        self.registry.inc("jinbe_slow_callbacks_total", (("subsystem", subsystem),))
+        print(f"⚠️ Event loop blocked for {duration * 1000:.0f}ms in {where}")
+    
+    def worst_offenders(self, limit=5):
+        return sorted(self.offenders.items(), key=lambda item: item[1]["worst"], reverse=True)[:limit]
+    
+    def lag_percentile(self, fraction):
+        recent = sorted(self.recent_lag)
+        return recent[min(int(len(recent) * fraction), len(recent) - 1)] if recent else 0.0
+
+loop_monitor = LoopMonitor()
+metrics.histogram("jinbe_event_loop_lag_seconds", "How late the loop lag sampler's ticks ran")
+metrics.counter("jinbe_slow_callbacks_total", "Times the event loop was blocked past the slow-callback threshold, by subsystem")
+metrics.gauge("jinbe_slow_callback_worst_seconds", "Longest event loop block seen per subsystem",
+              lambda: {(("subsystem", subsystem),): offender["worst"] for subsystem, offender in loop_monitor.offenders.items()})
+metrics.gauge("jinbe_event_loop_lag_max_seconds", "Largest event loop lag seen since startup", lambda: {(): loop_monitor.max_lag})
+
 # === DATA PERSISTENCE SYSTEM ===
 
 class DataManager:
@@ -28,18 +359,32 @@ class DataManager:
             return {
                 "welcome_messages": {},
                 "auto_mod": {"warnings": {}, "banned_users": {}},
-                "server_configs": {}
+                "server_configs": {},
+                "template_jobs": {},
+                "snapshots": {},
+                "role_assignments": {},
+                "reaction_roles": {},
+                "temp_voice": {},
+                "scheduled_announcements": {},
+                "lockdowns": {},
+                "rules": {},
+                "channel_locks": {},
+                "youtube_milestones": {}
             }
     
     def save_data(self):
         """Save data to JSON file"""
+        started = time.perf_counter()
         try:
             with open(self.data_file, 'w') as f:
                 json.dump(self.data, f, indent=2)
             return True
         except Exception as e:
+            metrics.inc("jinbe_data_flush_errors_total")
             print(f"Error saving data: {e}")
             return False
+        finally:
+            metrics.observe("jinbe_data_flush_seconds", (), time.perf_counter() - started)
     
     def get_welcome_message(self, guild_id):
         return self.data["welcome_messages"].get(str(guild_id))
@@ -80,10 +425,238 @@ class DataManager:
     def remove_banned_user(self, user_id):
         if str(user_id) in self.data["auto_mod"]["banned_users"]:
             del self.data["auto_mod"]["banned_users"][str(user_id)]
+    
+    def get_template_jobs(self):
+        return self.data.setdefault("template_jobs", {})
+    
+    def set_template_job(self, guild_id, job_state):
+        self.get_template_jobs()[str(guild_id)] = job_state
+        self.save_data()
+    
+    def remove_template_job(self, guild_id):
+        if str(guild_id) in self.get_template_jobs():
+            del self.data["template_jobs"][str(guild_id)]
+            self.save_data()
+    
+    def get_role_assignments(self):
+        return self.data.setdefault("role_assignments", {})
+    
+    def set_role_assignment(self, key, state):
+        self.get_role_assignments()[key] = state
+        self.save_data()
+    
+    def remove_role_assignment(self, key):
+        if key in self.get_role_assignments():
+            del self.data["role_assignments"][key]
+            self.save_data()
+    
+    def get_reaction_roles(self):
+        return self.data.setdefault("reaction_roles", {})
+    
+    def set_reaction_roles(self, message_id, entry):
+        self.get_reaction_roles()[str(message_id)] = entry
+        self.save_data()
+    
+    def remove_reaction_roles(self, message_id):
+        if str(message_id) in self.get_reaction_roles():
+            del self.data["reaction_roles"][str(message_id)]
+            self.save_data()
+    
+    def get_temp_voice(self):
+        return self.data.setdefault("temp_voice", {})
+    
+    def update_temp_voice(self, guild_id, **fields):
+        self.get_temp_voice().setdefault(str(guild_id), {}).update(fields)
+        self.save_data()
+    
+    def remove_temp_voice(self, guild_id):
+        if str(guild_id) in self.get_temp_voice():
+            del self.data["temp_voice"][str(guild_id)]
+            self.save_data()
+    
+    def get_server_config(self, guild_id):
+        return self.data.setdefault("server_configs", {}).get(str(guild_id), {})
+    
+    def update_server_config(self, guild_id, **fields):
+        self.data.setdefault("server_configs", {}).setdefault(str(guild_id), {}).update(fields)
+        self.save_data()
+    
+    def get_lockdowns(self):
+        return self.data.setdefault("lockdowns", {})
+    
+    def set_lockdown(self, guild_id, state):
+        self.get_lockdowns()[str(guild_id)] = state
+        self.save_data()
+    
+    def remove_lockdown(self, guild_id):
+        if str(guild_id) in self.get_lockdowns():
+            del self.data["lockdowns"][str(guild_id)]
+            self.save_data()
+    
+    def get_channel_locks(self):
+        return self.data.setdefault("channel_locks", {})
+    
+    def set_channel_lock(self, channel_id, snapshot):
+        self.get_channel_locks()[str(channel_id)] = snapshot
+        self.save_data()
+    
+    def pop_channel_lock(self, channel_id):
+        """Remove and return a channel's lock snapshot; (False, None) if it has none"""
+        if str(channel_id) not in self.get_channel_locks():
+            return False, None
+        snapshot = self.data["channel_locks"].pop(str(channel_id))
+        self.save_data()
+        return True, snapshot
+    
+    def get_rules(self):
+        return self.data.setdefault("rules", {})
+    
+    def get_scheduled_announcements(self):
+        return self.data.setdefault("scheduled_announcements", {})
+    
+    def get_milestones(self):
+        return self.data.setdefault("youtube_milestones", {})
+    
+    def update_milestones(self, guild_id, **fields):
+        self.get_milestones().setdefault(str(guild_id), {}).update(fields)
+        self.save_data()
+    
+    def get_snapshots(self):
+        return self.data.setdefault("snapshots", {})
+    
+    def add_snapshot(self, guild_id, entry, keep):
+        history = self.get_snapshots().setdefault(str(guild_id), [])
+        history.append(entry)
+        del history[:-keep]
+        self.save_data()
 
 # Initialize data manager
 data_manager = DataManager()
 
+# === OUTBOUND REQUEST SCHEDULER ===
+
+# Priority classes, highest first
+PRIORITY_MODERATION = 0
+PRIORITY_INTERACTION = 1
+PRIORITY_LOG = 2
+PRIORITY_BULK = 3
+OUTBOUND_PRIORITIES = ("moderation", "interaction", "log", "bulk")
+
+OUTBOUND_CONCURRENCY = 8  # Requests in flight at once
+OUTBOUND_BULK_CONCURRENCY = 5  # Bulk jobs never take the last slots, so moderation doesn't queue behind them
+
+class OutboundScheduler:
+    """Client-side scheduler every outbound Discord action goes through
+    
+    Requests are served strictly by priority class; within a class guilds
+    take turns (round-robin), so one guild's template apply can't starve
+    another guild. discord.py still handles the per-route rate limits.
+    """
+    
+    def __init__(self, concurrency=OUTBOUND_CONCURRENCY, bulk_concurrency=OUTBOUND_BULK_CONCURRENCY):
+        self.concurrency = concurrency
+        self.bulk_concurrency = bulk_concurrency
+        # One {guild ID: queue} per priority; dict order is the round-robin order
+        self.queues = [{} for _ in OUTBOUND_PRIORITIES]
+        self.in_flight = 0
+        self.bulk_in_flight = 0
+        self.loop = None
+        self.wakeup = None
+        self.dispatcher = None
+        self.tasks = set()  # Requests in flight; the loop only keeps weak references to tasks
+        self.served = [0] * len(OUTBOUND_PRIORITIES)
+        self.waits = [deque(maxlen=500) for _ in OUTBOUND_PRIORITIES]  # Recent queue wait times (seconds)
+        self.max_wait = [0.0] * len(OUTBOUND_PRIORITIES)
+    
+    async def submit(self, priority, guild_id, factory):
+        """Queue `factory()` (a coroutine function) and return its result once it ran"""
+        self.ensure_dispatcher()
+        future = self.loop.create_future()
+        self.queues[priority].setdefault(guild_id, deque()).append((factory, future, time.monotonic()))
+        self.wakeup.set()
+        return await future
+    
+    def ensure_dispatcher(self):
+        loop = asyncio.get_running_loop()
+        if self.loop is not loop or self.dispatcher is None or self.dispatcher.done():
+            self.loop = loop
+            self.wakeup = asyncio.Event()
+            self.dispatcher = loop.create_task(self.dispatch())
+    
+    def depth(self, priority) -> int:
+        return sum(len(queue) for queue in self.queues[priority].values())
+    
+    def next_request(self):
+        for priority, guilds in enumerate(self.queues):
+            if not guilds:
+                continue
+            if priority == PRIORITY_BULK and self.bulk_in_flight >= self.bulk_concurrency:
+                return None
+            guild_id = next(iter(guilds))
+            queue = guilds.pop(guild_id)
+            request = queue.popleft()
+            if queue:
+                guilds[guild_id] = queue  # Back of the line for this guild
+            return priority, request
+        return None
+    
+    async def dispatch(self):
+        while True:
+            await self.wakeup.wait()
+            self.wakeup.clear()
+            while self.in_flight < self.concurrency:
+                picked = self.next_request()
+                if not picked:
+                    break
+                self.in_flight += 1
+                if picked[0] == PRIORITY_BULK:
+                    self.bulk_in_flight += 1
+                task = self.loop.create_task(self.run(*picked))
+                self.tasks.add(task)
+                task.add_done_callback(self.tasks.discard)
+    
+    async def run(self, priority, request):
+        factory, future, enqueued = request
+        wait = time.monotonic() - enqueued
+        self.served[priority] += 1
+        self.max_wait[priority] = max(self.max_wait[priority], wait)
+        self.waits[priority].append(wait)
+        try:
+            if not future.cancelled():
+                result = await factory()
+                if not future.done():
+                    future.set_result(result)
+        except asyncio.CancelledError:
+            future.cancel()
+            raise
+        except Exception as e:
+            if not future.done():
+                future.set_exception(e)
+        finally:
+            self.in_flight -= 1
+            if priority == PRIORITY_BULK:
+                self.bulk_in_flight -= 1
+            self.wakeup.set()
+    
+    def stats(self) -> List[Dict]:
+        """Queue depth and wait times per priority class"""
+        stats = []
+        for priority, name in enumerate(OUTBOUND_PRIORITIES):
+            waits = sorted(self.waits[priority])
+            stats.append({
+                "priority": name,
+                "depth": self.depth(priority),
+                "served": self.served[priority],
+                "avg_wait": sum(waits) / len(waits) if waits else 0.0,
+                "p95_wait": waits[int(len(waits) * 0.95)] if waits else 0.0,
+                "max_wait": self.max_wait[priority]
+            })
+        return stats
+
+outbound = OutboundScheduler()
+metrics.gauge("jinbe_outbound_queue_depth", "Discord actions waiting in the outbound scheduler, by priority",
+              lambda: {(("priority", name),): outbound.depth(priority) for priority, name in enumerate(OUTBOUND_PRIORITIES)})
+
 # === COMPREHENSIVE AUTO-MOD SYSTEM ===
 
 class AdvancedAutoMod:
@@ -166,7 +739,7 @@ class AdvancedAutoMod:
         
         # Delete the message
         try:
-            await message.delete()
+            await outbound.submit(PRIORITY_MODERATION, message.guild.id, message.delete)
         except:
             pass
         
@@ -203,7 +776,7 @@ class AdvancedAutoMod:
             
             embed.set_footer(text="Thank you for helping keep our community respectful")
             
-            await user.send(embed=embed)
+            await outbound.submit(PRIORITY_LOG, user.guild.id, lambda: user.send(embed=embed))
         except:
             pass  # Can't DM user
     
@@ -212,10 +785,10 @@ class AdvancedAutoMod:
         if warn_count == 3:
             # Temp ban for 1 hour
             try:
-                await message.author.ban(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.ban(
                     reason=f"Auto-mod: 3 warnings for inappropriate language",
                     delete_message_days=1
-                )
+                ))
                 
                 unban_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
                 data_manager.add_banned_user(message.author.id, unban_time)
@@ -229,9 +802,9 @@ class AdvancedAutoMod:
         elif warn_count >= 5:
             # Permanent kick
             try:
-                await message.author.kick(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.kick(
                     reason=f"Auto-mod: 5 warnings for inappropriate language"
-                )
+                ))
                 # Reset warnings after kick
                 data_manager.remove_warnings(message.guild.id, message.author.id)
             except Exception as e:
@@ -241,7 +814,7 @@ class AdvancedAutoMod:
         """Schedule automatic unban"""
         await asyncio.sleep(delay_seconds)
         try:
-            await guild.unban(user)
+            await outbound.submit(PRIORITY_MODERATION, guild.id, lambda: guild.unban(user))
             data_manager.remove_banned_user(user.id)
         except:
             pass
@@ -278,7 +851,7 @@ class AdvancedAutoMod:
         embed.add_field(name="Action Taken", value=action_taken, inline=False)
         embed.add_field(name="Message Content", value=f"``{message.content}```", inline=False)
         
-        await staff_channel.send(embed=embed)
+        await outbound.submit(PRIORITY_LOG, message.guild.id, lambda: staff_channel.send(embed=embed))
 
 # Initialize advanced auto-mod
 advanced_auto_mod = AdvancedAutoMod()
@@ -425,7 +998,7 @@ class NSFWDetector:
         
         # Delete the message
         try:
-            await message.delete()
+            await outbound.submit(PRIORITY_MODERATION, message.guild.id, message.delete)
         except:
             pass
         
@@ -468,7 +1041,7 @@ class NSFWDetector:
             
             embed.set_footer(text="Thank you for helping keep our community family-friendly")
             
-            await user.send(embed=embed)
+            await outbound.submit(PRIORITY_LOG, user.guild.id, lambda: user.send(embed=embed))
         except:
             pass
     
@@ -477,10 +1050,10 @@ class NSFWDetector:
         if nsfw_count == 3:
             # Temp ban for NSFW content
             try:
-                await message.author.ban(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.ban(
                     reason="Auto-mod: 3 NSFW content violations",
                     delete_message_days=1
-                )
+                ))
                 
                 unban_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=2)
                 data_manager.add_banned_user(message.author.id, unban_time)
@@ -493,9 +1066,9 @@ class NSFWDetector:
         elif nsfw_count >= 5:
             # Kick for excessive NSFW violations
             try:
-                await message.author.kick(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.kick(
                     reason="Auto-mod: Excessive NSFW content violations"
-                )
+                ))
                 data_manager.remove_warnings(message.guild.id, message.author.id)
             except Exception as e:
                 print(f"NSFW kick error: {e}")
@@ -504,7 +1077,7 @@ class NSFWDetector:
         """Schedule automatic unban"""
         await asyncio.sleep(delay_seconds)
         try:
-            await guild.unban(user)
+            await outbound.submit(PRIORITY_MODERATION, guild.id, lambda: guild.unban(user))
             data_manager.remove_banned_user(user.id)
         except:
             pass
@@ -542,78 +1115,11 @@ class NSFWDetector:
         embed.add_field(name="Action Taken", value=action, inline=False)
         embed.add_field(name="Message Content", value=f"``{message.content}```", inline=False)
         
-        await staff_channel.send(embed=embed)
+        await outbound.submit(PRIORITY_LOG, message.guild.id, lambda: staff_channel.send(embed=embed))
 
 # Initialize NSFW detector
 nsfw_detector = NSFWDetector()
 
-# === BLOX FRUITS CREW TEMPLATE ===
-
-blox_fruits_template = {
-    "name": "⚔️ Blox Fruits Crew Server",
-    "description": "Perfect for Blox Fruits crews with automatic bounty roles and crew management",
-    "roles": {
-        "owner": {"name": "👑 Fleet Admiral", "permissions": ["administrator"], "color": 0xff0000},
-        "vice_captain": {"name": "⭐ Vice Captain", "permissions": ["manage_messages", "kick_members"], "color": 0xffa500},
-        "officer": {"name": "🔧 Officer", "permissions": ["manage_messages"], "color": 0x00ff00},
-        
-        # Auto bounty roles (will be created when users join)
-        "5m_bounty": {"name": "🌊 5M Bounty", "permissions": ["read_messages"], "color": 0x00bfff},
-        "5m_marine": {"name": "⚓ 5M Marine", "permissions": ["read_messages"], "color": 0x00bfff},
-        "10m_bounty": {"name": "🌊 10M Bounty", "permissions": ["read_messages"], "color": 0x1e90ff},
-        "10m_marine": {"name": "⚓ 10M Marine", "permissions": ["read_messages"], "color": 0x1e90ff},
-        "15m_bounty": {"name": "🌊 15M Bounty", "permissions": ["read_messages"], "color": 0x4169e1},
-        "15m_marine": {"name": "⚓ 15M Marine", "permissions": ["read_messages"], "color": 0x4169e1},
-        "20m_bounty": {"name": "🌊 20M Bounty", "permissions": ["read_messages"], "color": 0x0000ff},
-        "20m_marine": {"name": "⚓ 20M Marine", "permissions": ["read_messages"], "color": 0x0000ff},
-        "30m_bounty": {"name": "🌊 30M Bounty", "permissions": ["read_messages"], "color": 0x8a2be2},
-        "30m_marine": {"name": "⚓ 30M Marine", "permissions": ["read_messages"], "color": 0x8a2be2},
-        
-        "member": {"name": "🎮 Crew Member", "permissions": ["read_messages"], "color": 0x808080}
-    },
-    "categories": {
-        "welcome": {"name": "🏴‍☠️ WELCOME ABOARD", "position": 0},
-        "crew_management": {"name": "⚓ CREW MANAGEMENT", "position": 1},
-        "battle_chat": {"name": "⚔️ BATTLE & STRATEGY", "position": 2},
-        "trading": {"name": "💰 TRADING & FRUITS", "position": 3},
-        "voice_crew": {"name": "🎧 VOICE CHAT", "position": 4},
-        "staff": {"name": "👑 OFFICER QUARTERS", "position": 5}
-    },
-    "channels": {
-        "welcome": [
-            {"name": "📜crew-rules", "type": "text", "topic": "Crew rules and guidelines"},
-            {"name": "👋welcome", "type": "text", "topic": "Welcome new crew members!"},
-            {"name": "📢announcements", "type": "text", "topic": "Important crew announcements"}
-        ],
-        "crew_management": [
-            {"name": "📋crew-applications", "type": "text", "topic": "Apply to join the crew"},
-            {"name": "🔄crew-updates", "type": "text", "topic": "Crew status and updates"},
-            {"name": "👥crew-chat", "type": "text", "topic": "General crew discussions"},
-            {"name": "🎯bounty-board", "type": "text", "topic": "Bounty hunting targets and achievements"}
-        ],
-        "battle_chat": [
-            {"name": "⚔️battle-strategy", "type": "text", "topic": "Battle tactics and strategies"},
-            {"name": "🏆pvp-arena", "type": "text", "topic": "PvP discussions and matchmaking"},
-            {"name": "🎮game-updates", "type": "text", "topic": "Latest Blox Fruits updates"}
-        ],
-        "trading": [
-            {"name": "🍎fruit-trading", "type": "text", "topic": "Fruit trading and values"},
-            {"name": "💎item-trading", "type": "text", "topic": "Item and gear trading"},
-            {"name": "💰belli-making", "type": "text", "topic": "Money making strategies"}
-        ],
-        "voice_crew": [
-            {"name": "General Voice", "type": "voice"},
-            {"name": "Battle Planning", "type": "voice"},
-            {"name": "Trading Hub", "type": "voice"},
-            {"name": "AFK", "type": "voice"}
-        ],
-        "staff": [
-            {"name": "🔧officer-chat", "type": "text", "topic": "Officer discussions"},
-            {"name": "📊crew-stats", "type": "text", "topic": "Crew statistics and management"}
-        ]
-    }
-}
-
 # === AUTO CREW NAME ROLE SYSTEM ===
 
 class BloxFruitsCrewSystem:
@@ -672,163 +1178,648 @@ class BloxFruitsCrewSystem:
 # Initialize crew system
 blox_fruits_system = BloxFruitsCrewSystem()
 
-# === YOUTUBE COMMUNITY TEMPLATE ===
-
-youtube_template = {
-    "name": "🎬 YouTube Community Server",
-    "description": "Perfect for YouTube creators with milestone tracking and community engagement",
-    "roles": {
-        "owner": {"name": "🎬 Channel Owner", "permissions": ["administrator"], "color": 0xff0000},
-        "content_creator": {"name": "📹 Content Creator", "permissions": ["manage_messages"], "color": 0x00ff00},
-        "editor": {"name": "✂️ Editor", "permissions": ["attach_files"], "color": 0x9370db},
-        "moderator": {"name": "🛡️ Moderator", "permissions": ["manage_messages"], "color": 0x00bfff},
-        
-        # Milestone roles (auto-assigned based on subscriber counts)
-        "1k_subs": {"name": "🥉 1K Subscribers", "permissions": ["read_messages"], "color": 0xcd7f32},
-        "10k_subs": {"name": "🥈 10K Subscribers", "permissions": ["read_messages"], "color": 0xc0c0c0},
-        "25k_subs": {"name": "🥇 25K Subscribers", "permissions": ["read_messages"], "color": 0xffd700},
-        "50k_subs": {"name": "💎 50K Subscribers", "permissions": ["read_messages"], "color": 0xb9f2ff},
-        "100k_subs": {"name": "🏆 100K Subscribers", "permissions": ["read_messages"], "color": 0xff6b6b},
-        "250k_subs": {"name": "🌟 250K Subscribers", "permissions": ["read_messages"], "color": 0x9b59b6},
-        "500k_subs": {"name": "🚀 500K Subscribers", "permissions": ["read_messages"], "color": 0xe74c3c},
-        "1m_subs": {"name": "👑 1M Subscribers", "permissions": ["read_messages"], "color": 0xf1c40f},
-        
-        "subscriber": {"name": "👍 Subscriber", "permissions": ["read_messages"], "color": 0x7289da}
-    },
-    "categories": {
-        "welcome": {"name": "🎬 WELCOME", "position": 0},
-        "content": {"name": "📹 CONTENT ZONE", "position": 1},
-        "community": {"name": "💬 COMMUNITY CHAT", "position": 2},
-        "collaborations": {"name": "🤝 COLLABORATIONS", "position": 3},
-        "support": {"name": "💡 SUPPORT & FEEDBACK", "position": 4},
-        "voice": {"name": "🎧 VOICE CHAT", "position": 5}
-    },
-    "channels": {
-        "welcome": [
-            {"name": "👋welcome", "type": "text", "topic": "Welcome to our YouTube community!"},
-            {"name": "📋server-rules", "type": "text", "topic": "Community guidelines and rules"},
-            {"name": "🎯announcements", "type": "text", "topic": "Channel announcements and updates"}
-        ],
-        "content": [
-            {"name": "📢yt-announcements", "type": "text", "topic": "YouTube video announcements and updates"},
-            {"name": "🎥yt-uploads", "type": "text", "topic": "Latest video uploads and discussions"},
-            {"name": "📊milestone-tracker", "type": "text", "topic": "Channel growth and milestone celebrations"}
-        ],
-        "community": [
-            {"name": "💬general", "type": "text", "topic": "General community discussions"},
-            {"name": "💭feedback", "type": "text", "topic": "Video feedback and suggestions"},
-            {"name": "🎮off-topic", "type": "text", "topic": "Off-topic discussions"}
-        ],
-        "collaborations": [
-            {"name": "🤝collab-requests", "type": "text", "topic": "Collaboration opportunities"},
-            {"name": "💼brand-deals", "type": "text", "topic": "Brand partnership discussions"}
-        ],
-        "support": [
-            {"name": "❓q-and-a", "type": "text", "topic": "Questions and answers about content"},
-            {"name": "💡video-ideas", "type": "text", "topic": "Suggest video ideas and topics"},
-            {"name": "🔧technical-help", "type": "text", "topic": "Technical support and help"}
-        ],
-        "voice": [
-            {"name": "General Voice", "type": "voice"},
-            {"name": "Content Planning", "type": "voice"},
-            {"name": "Community Hangout", "type": "voice"}
-        ]
-    }
-}
-
 # === YOUTUBE MILESTONE SYSTEM ===
 
 class YouTubeMilestoneSystem:
+    # (subscriber count, key, role/channel name), sorted by count
+    MILESTONE_LEVELS = [
+        (1000, "1k_subs", "🥉 1K Subscribers"),
+        (10000, "10k_subs", "🥈 10K Subscribers"),
+        (25000, "25k_subs", "🥇 25K Subscribers"),
+        (50000, "50k_subs", "💎 50K Subscribers"),
+        (100000, "100k_subs", "🏆 100K Subscribers"),
+        (250000, "250k_subs", "🌟 250K Subscribers"),
+        (500000, "500k_subs", "🚀 500K Subscribers"),
+        (1000000, "1m_subs", "👑 1M Subscribers")
+    ]
+    MILESTONE_THRESHOLDS = [count for count, _, _ in MILESTONE_LEVELS]
+    
     def __init__(self):
-        self.milestone_channels = {}
-        self.subscriber_roles = {
-            1000: "1k_subs",
-            10000: "10k_subs", 
-            25000: "25k_subs",
-            50000: "50k_subs",
-            100000: "100k_subs",
-            250000: "250k_subs", 
-            500000: "500k_subs",
-            1000000: "1m_subs"
+        # guild ID -> {milestone key: channel ID}
+        self.milestone_channels = {
+            int(guild_id): dict(state.get("channels", {}))
+            for guild_id, state in data_manager.get_milestones().items()
         }
+        self.subscriber_roles = {count: key for count, key, _ in self.MILESTONE_LEVELS}
     
     async def setup_milestone_channels(self, guild):
         """Setup milestone tracking channels"""
         milestone_channels = {}
         
-        milestone_levels = [
-            ("1k_subs", "🥉 1K Subscribers"),
-            ("10k_subs", "🥈 10K Subscribers"),
-            ("25k_subs", "🥇 25K Subscribers"),
-            ("50k_subs", "💎 50K Subscribers"),
-            ("100k_subs", "🏆 100K Subscribers"),
-            ("250k_subs", "🌟 250K Subscribers"),
-            ("500k_subs", "🚀 500K Subscribers"),
-            ("1m_subs", "👑 1M Subscribers")
-        ]
-        
-        for role_key, role_name in milestone_levels:
+        for _, role_key, role_name in self.MILESTONE_LEVELS:
             channel = await guild.create_text_channel(
                 name=role_name,
                 topic=f"Channel milestone: {role_name}"
             )
             milestone_channels[role_key] = channel
         
+        self.milestone_channels[guild.id] = {key: channel.id for key, channel in milestone_channels.items()}
+        data_manager.update_milestones(guild.id, channels=self.milestone_channels[guild.id])
         return milestone_channels
     
+    def get_milestone_channel(self, guild, role_key):
+        channel_id = self.milestone_channels.get(guild.id, {}).get(role_key)
+        return guild.get_channel(channel_id) if channel_id else None
+    
     async def update_milestone(self, guild, subscriber_count):
-        """Update milestone roles and channels"""
-        milestone_levels = [
-            (1000, "1k_subs"),
-            (10000, "10k_subs"),
-            (25000, "25k_subs"),
-            (50000, "50k_subs"),
-            (100000, "100k_subs"),
-            (250000, "250k_subs"),
-            (500000, "500k_subs"),
-            (1000000, "1m_subs")
-        ]
-        
-        for count, role_key in milestone_levels:
-            if subscriber_count >= count:
-                role = discord.utils.get(guild.roles, name=self.milestone_channels[role_key].name)
-                if role:
-                    await self.milestone_channels[role_key].send(f"🎉 Reached {count} subscribers!")
-                    await self.assign_milestone_role(guild, role)
-            else:
-                break
+        """Announce and assign only the milestones crossed since the last update
+        
+        The number of thresholds already crossed is persisted per guild, so a
+        repeated (or lower) count does no work and a higher one costs a
+        bisect plus the newly crossed milestones.
+        """
+        reached = data_manager.get_milestones().get(str(guild.id), {}).get("reached", 0)
+        crossed = bisect.bisect_right(self.MILESTONE_THRESHOLDS, subscriber_count)
+        if crossed <= reached:
+            return []
+        
+        # Record the new high-water mark first, so a concurrent update can't announce twice
+        data_manager.update_milestones(guild.id, reached=crossed)
+        
+        new_levels = self.MILESTONE_LEVELS[reached:crossed]
+        roles = []
+        progress_channel = None
+        for count, role_key, role_name in new_levels:
+            channel = self.get_milestone_channel(guild, role_key)
+            if channel:
+                try:
+                    await outbound.submit(PRIORITY_LOG, guild.id, lambda channel=channel, count=count: channel.send(f"🎉 Reached {count} subscribers!"))
+                    progress_channel = channel
+                except discord.HTTPException as e:
+                    print(f"Milestone announcement failed in {guild.name}: {e}")
+            role = discord.utils.get(guild.roles, name=role_name)
+            if role:
+                roles.append(role)
     
-    async def assign_milestone_role(self, guild, role):
-        """Assign milestone role to all subscribers"""
-        for member in guild.members:
-            if not member.bot:
-                await member.add_roles(role)
+        if roles:
+            self.assign_milestone_roles(guild, roles, progress_channel)
+        return [count for count, _, _ in new_levels]
+    
+    def assign_milestone_roles(self, guild, roles, progress_channel=None):
+        """Give milestone roles to all subscribers in one background job"""
+        return milestone_role_assigner.start(guild, roles, progress_channel, f"Assign {', '.join(role.name for role in roles)}")
 
 # Initialize milestone system
 youtube_milestone_system = YouTubeMilestoneSystem()
 
+MILESTONE_CHECKPOINT_EVERY = 100  # Members per checkpoint
+
+class BulkRoleAssigner:
+    """Gives roles to every non-bot member of a guild
+    
+    Members that already hold the roles are skipped (from the cached role
+    member lists), several missing roles are merged into one member edit,
+    edits run concurrently within the member-edit rate-limit bucket, and
+    progress is checkpointed so a restart resumes where it stopped. Only one
+    job runs per checkpoint key, so a reconnect can't start a second runner
+    on a checkpoint that is still being worked on.
+    """
+    
+    def __init__(self):
+        self.running = {}  # checkpoint key -> Job
+    
+    def start(self, guild, roles, progress_channel, description, state=None):
+        """Run the assignment as a background job, or return the job already running it"""
+        key = self.checkpoint_key(guild.id, [role.id for role in roles])
+        running = self.running.get(key)
+        if running and not running.done:
+            return running
+        job = job_manager.start(
+            guild.id, "milestone_roles", description,
+            lambda job: self.run(guild, roles, progress_channel, job, state),
+            exclusive=False
+        )
+        self.running[key] = job
+        return job
+    
+    @staticmethod
+    def checkpoint_key(guild_id, role_ids):
+        return f"{guild_id}:{','.join(str(role_id) for role_id in sorted(role_ids))}"
+    
+    @staticmethod
+    def pending_members(guild, roles):
+        """(member, missing roles) for every non-bot member lacking any of the roles, by member ID"""
+        holders = {role.id: {member.id for member in role.members} for role in roles}
+        pending = []
+        for member in sorted(guild.members, key=lambda member: member.id):
+            if member.bot:
+                continue
+            missing = [role for role in roles if member.id not in holders[role.id]]
+            if missing:
+                pending.append((member, missing))
+        return pending
+    
+    async def assign(self, guild, member, missing):
+        if len(missing) == 1:
+            await outbound.submit(PRIORITY_BULK, guild.id, lambda: member.add_roles(missing[0]))
+        else:
+            # One PATCH with the member's full role list instead of one PUT per role
+            roles = [role for role in member.roles if not role.is_default()] + missing
+            await outbound.submit(PRIORITY_BULK, guild.id, lambda: member.edit(roles=roles))
+    
+    async def run(self, guild, roles, progress_channel=None, job=None, state=None):
+        """Assign `roles` to every member, resuming from `state` if given"""
+        key = self.checkpoint_key(guild.id, [role.id for role in roles])
+        if state is None:
+            state = {
+                "guild_id": guild.id,
+                "roles": [role.id for role in roles],
+                "channel_id": progress_channel.id if progress_channel else None,
+                "after": 0,  # Highest member ID already handled
+                "assigned": 0
+            }
+            data_manager.set_role_assignment(key, state)
+        
+        pending = [(member, missing) for member, missing in self.pending_members(guild, roles) if member.id > state["after"]]
+        role_names = ", ".join(role.name for role in roles)
+        progress = ProgressReporter(f"🏆 Assigning {role_names}...", total=len(pending), channel=progress_channel)
+        if job:
+            job.progress = progress
+        if progress_channel:
+            await progress.start()
+        
+        bucket = RATE_LIMIT_BUCKETS["member_edit"]
+        semaphore = asyncio.Semaphore(bucket["limit"])
+        
+        async def assign_one(member, missing):
+            async with semaphore:
+                if job:
+                    job.token.check()
+                try:
+                    await self.assign(guild, member, missing)
+                    return True
+                except discord.HTTPException as e:
+                    print(f"Could not give {member} milestone roles: {e}")
+                    return False
+                finally:
+                    progress.advance()
+        
+        try:
+            for start in range(0, len(pending), MILESTONE_CHECKPOINT_EVERY):
+                batch = pending[start:start + MILESTONE_CHECKPOINT_EVERY]
+                results = await asyncio.gather(*(assign_one(member, missing) for member, missing in batch))
+                state["after"] = batch[-1][0].id
+                state["assigned"] += sum(results)
+                data_manager.set_role_assignment(key, state)
+        except JobCancelled:
+            data_manager.remove_role_assignment(key)  # Cancelled on purpose, don't resume
+            raise
+        
+        data_manager.remove_role_assignment(key)
+        if progress_channel:
+            await progress.finish(content=f"🏆 **{role_names}** given to {state['assigned']} members")
+        return state["assigned"]
+
+milestone_role_assigner = BulkRoleAssigner()
+
+# === SUBSCRIBER COUNT INGEST ===
+
+# Local endpoint an external poller posts subscriber counts to; disabled unless a port is set
+SUBSCRIBER_INGEST_HOST = os.getenv("SUBSCRIBER_INGEST_HOST", "127.0.0.1")
+SUBSCRIBER_INGEST_PORT = int(os.getenv("SUBSCRIBER_INGEST_PORT", "0"))
+SUBSCRIBER_INGEST_TOKEN = os.getenv("SUBSCRIBER_INGEST_TOKEN")
+MILESTONE_EVALUATION_INTERVAL = float(os.getenv("MILESTONE_EVALUATION_INTERVAL", "10"))
+
+class SubscriberIngest:
+    """HTTP ingest for per-guild subscriber counts
+    
+    POST /subscribers with {"guild_id": ..., "count": ...} (or a list of
+    them under "updates"). Counts are coalesced per guild: the newest count
+    wins and each guild is evaluated at most once per interval.
+    GET /subscribers/metrics returns ingest and evaluation stats.
+    """
+    
+    def __init__(self, evaluate, interval=MILESTONE_EVALUATION_INTERVAL, token=SUBSCRIBER_INGEST_TOKEN):
+        self.evaluate = evaluate  # async (guild_id, count)
+        self.interval = interval
+        self.token = token
+        self.pending = {}  # guild ID -> (newest count, time the first pending update arrived)
+        self.timers = {}  # guild ID -> scheduled evaluation task
+        self.last_evaluation = {}  # guild ID -> monotonic time
+        self.runner = None
+        self.started = time.monotonic()
+        self.received = 0
+        self.rejected = 0
+        self.coalesced = 0
+        self.evaluations = 0
+        self.latencies = deque(maxlen=500)  # Seconds from first pending update to evaluation done
+    
+    def submit(self, guild_id, count):
+        """Record a count; schedules an evaluation unless one is already pending"""
+        self.received += 1
+        if guild_id in self.pending:
+            self.coalesced += 1
+            self.pending[guild_id] = (count, self.pending[guild_id][1])
+        else:
+            self.pending[guild_id] = (count, time.monotonic())
+        
+        if guild_id not in self.timers:
+            due = self.last_evaluation.get(guild_id, 0.0) + self.interval
+            self.timers[guild_id] = asyncio.create_task(self.evaluate_after(guild_id, max(0.0, due - time.monotonic())))
+    
+    async def evaluate_after(self, guild_id, delay):
+        try:
+            await asyncio.sleep(delay)
+            count, first_seen = self.pending.pop(guild_id)
+            self.last_evaluation[guild_id] = time.monotonic()
+            try:
+                await self.evaluate(guild_id, count)
+            except Exception as e:
+                print(f"Milestone evaluation error for guild {guild_id}: {e}")
+            self.evaluations += 1
+            self.latencies.append(time.monotonic() - first_seen)
+        except asyncio.CancelledError:
+            # Stopped: leave the count pending and don't reschedule
+            self.timers.pop(guild_id, None)
+            raise
+        del self.timers[guild_id]
+        # Counts that arrived during the evaluation get their own turn
+        if guild_id in self.pending:
+            due = self.last_evaluation.get(guild_id, 0.0) + self.interval
+            self.timers[guild_id] = asyncio.create_task(self.evaluate_after(guild_id, max(0.0, due - time.monotonic())))
+    
+    def metrics(self) -> Dict:
+        latencies = sorted(self.latencies)
+        uptime = max(time.monotonic() - self.started, 1e-9)
+        return {
+            "received": self.received,
+            "rejected": self.rejected,
+            "coalesced": self.coalesced,
+            "evaluations": self.evaluations,
+            "pending_guilds": len(self.pending),
+            "ingest_per_second": self.received / uptime,
+            "evaluation_latency_avg": sum(latencies) / len(latencies) if latencies else 0.0,
+            "evaluation_latency_p95": latencies[int(len(latencies) * 0.95)] if latencies else 0.0,
+            "evaluation_latency_max": latencies[-1] if latencies else 0.0
+        }
+    
+    async def handle_post(self, request):
+        if self.token and request.headers.get("Authorization") != f"Bearer {self.token}":
+            self.rejected += 1
+            return web.json_response({"error": "unauthorized"}, status=401)
+        try:
+            body = await request.json()
+            updates = body["updates"] if isinstance(body, dict) and "updates" in body else [body]
+            parsed = [(int(update["guild_id"]), int(update["count"])) for update in updates]
+        except (ValueError, KeyError, TypeError):
+            self.rejected += 1
+            return web.json_response({"error": "expected {\"guild_id\": int, \"count\": int}"}, status=400)
+        
+        for guild_id, count in parsed:
+            self.submit(guild_id, count)
+        return web.json_response({"accepted": len(parsed)}, status=202)
+    
+    async def handle_metrics(self, request):
+        return web.json_response(self.metrics())
+    
+    def make_app(self):
+        app = web.Application()
+        app.router.add_post("/subscribers", self.handle_post)
+        app.router.add_get("/subscribers/metrics", self.handle_metrics)
+        return app
+    
+    async def start(self, host=SUBSCRIBER_INGEST_HOST, port=SUBSCRIBER_INGEST_PORT):
+        self.runner = web.AppRunner(self.make_app())
+        await self.runner.setup()
+        site = web.TCPSite(self.runner, host, port)
+        await site.start()
+        return site
+    
+    async def stop(self):
+        tasks = list(self.timers.values())
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        self.timers.clear()  # Tasks cancelled before they started never ran their cleanup
+        if self.runner:
+            await self.runner.cleanup()
+            self.runner = None
+
+async def evaluate_subscriber_count(guild_id, count):
+    guild = bot.get_guild(guild_id)
+    if guild:
+        await youtube_milestone_system.update_milestone(guild, count)
+
+subscriber_ingest = SubscriberIngest(evaluate_subscriber_count)
+
 # === REACTION ROLE SYSTEM ===
 
+def emoji_key(emoji):
+    """Stable key for a reaction emoji: the ID for custom emojis, the character otherwise"""
+    if isinstance(emoji, str):
+        emoji = discord.PartialEmoji.from_str(emoji)
+    return str(emoji.id) if emoji.id else emoji.name
+
 class ReactionRoleSystem:
+    """Reaction role bindings, message ID -> {emoji key -> role ID}
+    
+    Bindings are persisted in bot_data.json (with the guild and channel of
+    each message) and loaded into a flat dict, so a reaction on any other
+    message costs one dict lookup.
+    """
+    
     def __init__(self):
+        self.panel_channels = {}  # guild ID -> reaction role channel ID
         self.reaction_roles = {}
+        self.load()
+    
+    def load(self):
+        self.reaction_roles = {
+            int(message_id): {key: int(role_id) for key, role_id in entry["roles"].items()}
+            for message_id, entry in data_manager.get_reaction_roles().items()
+        }
+    
+    def role_for(self, message_id, emoji):
+        bindings = self.reaction_roles.get(message_id)
+        if bindings is None:
+            return None
+        return bindings.get(emoji_key(emoji))
+    
+    def bind(self, guild_id, channel_id, message_id, emoji, role_id):
+        bindings = self.reaction_roles.setdefault(message_id, {})
+        bindings[emoji_key(emoji)] = role_id
+        data_manager.set_reaction_roles(message_id, {
+            "guild_id": guild_id,
+            "channel_id": channel_id,
+            "roles": dict(bindings)
+        })
+    
+    def unbind(self, message_id, emoji=None):
+        """Remove one emoji binding, or every binding on the message; returns whether anything was removed"""
+        bindings = self.reaction_roles.get(message_id)
+        if not bindings:
+            return False
+        if emoji is not None:
+            if bindings.pop(emoji_key(emoji), None) is None:
+                return False
+            if bindings:
+                entry = data_manager.get_reaction_roles()[str(message_id)]
+                data_manager.set_reaction_roles(message_id, dict(entry, roles=dict(bindings)))
+                return True
+        del self.reaction_roles[message_id]
+        data_manager.remove_reaction_roles(message_id)
+        return True
+    
+    def binding(self, message_id):
+        """The persisted entry (guild, channel, roles) of a message, if it has bindings"""
+        return data_manager.get_reaction_roles().get(str(message_id))
+    
+    def bindings_for_guild(self, guild_id):
+        return {
+            int(message_id): entry for message_id, entry in data_manager.get_reaction_roles().items()
+            if entry.get("guild_id") == guild_id
+        }
     
     async def setup_reaction_roles(self, guild, category_id):
         category = guild.get_channel(category_id)
         if not category: 
             return False
         reaction_role_channel = await guild.create_text_channel(name=" реакција за улоге", category=category)
-        self.reaction_roles[guild.id] = reaction_role_channel.id
+        self.panel_channels[guild.id] = reaction_role_channel.id
         return True
 
 reaction_role_system = ReactionRoleSystem()
 
+REACTION_ROLE_DEBOUNCE = 1.5  # Seconds to collect a member's reaction role changes before applying them
+
+class ReactionRoleBatcher:
+    """Folds a member's rapid reaction role toggles into one role update
+    
+    Changes are collected per member for REACTION_ROLE_DEBOUNCE seconds;
+    the latest add/remove per role wins, roles the member already has (or
+    lacks) are dropped, and what is left is applied as a single add/remove
+    or, for several roles, one member edit with the full role list.
+    
+    Flushes for the same member run one at a time. The member cache only
+    catches up when the gateway sends the member update, so while a burst is
+    still being flushed each update starts from the roles the previous one
+    produced rather than from the cache.
+    """
+    
+    def __init__(self, delay=REACTION_ROLE_DEBOUNCE):
+        self.delay = delay
+        self.pending = {}  # (guild ID, member ID) -> {role ID: True to add / False to remove}
+        self.locks = {}  # (guild ID, member ID) -> lock held while that member's flush runs
+        self.known_roles = {}  # (guild ID, member ID) -> role IDs after our last update in the current burst
+        self.flushes = set()  # Scheduled flush tasks, held so they aren't garbage collected
+        self.events = 0
+        self.requests = 0
+    
+    def queue(self, guild, member_id, role_id, add):
+        self.events += 1
+        key = (guild.id, member_id)
+        if key not in self.pending:
+            self.pending[key] = {}
+            task = asyncio.create_task(self.flush_later(guild, member_id))
+            self.flushes.add(task)
+            task.add_done_callback(self.flushes.discard)
+        self.pending[key][role_id] = add
+    
+    async def flush_later(self, guild, member_id):
+        await asyncio.sleep(self.delay)
+        key = (guild.id, member_id)
+        lock = self.locks.setdefault(key, asyncio.Lock())
+        async with lock:
+            # Toggles that arrive while this runs start a new batch, flushed after this one
+            changes = self.pending.pop(key, {})
+            member = guild.get_member(member_id)
+            if member and changes:
+                try:
+                    self.known_roles[key] = await self.apply(guild, member, changes, self.known_roles.get(key))
+                except Exception as e:
+                    self.known_roles.pop(key, None)  # Unknown outcome, trust the cache again
+                    print(f"Error updating reaction roles for {member}: {e}")
+        if key not in self.pending:
+            # Burst over; the next one starts from the (by then updated) member cache
+            self.locks.pop(key, None)
+            self.known_roles.pop(key, None)
+    
+    async def apply(self, guild, member, changes, known_roles=None):
+        """Apply `changes`; returns the member's role IDs afterwards"""
+        current = known_roles if known_roles is not None else {role.id for role in member.roles}
+        add = [guild.get_role(role_id) for role_id, wanted in changes.items() if wanted and role_id not in current]
+        remove = [guild.get_role(role_id) for role_id, wanted in changes.items() if not wanted and role_id in current]
+        add = [role for role in add if role]
+        remove = [role for role in remove if role]
+        
+        if not add and not remove:
+            return current
+        self.requests += 1
+        added = {role.id for role in add}
+        removed = {role.id for role in remove}
+        if len(add) + len(remove) == 1:
+            if add:
+                await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: member.add_roles(add[0]))
+            else:
+                await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: member.remove_roles(remove[0]))
+            return (current - removed) | added
+        # One PATCH with the member's net role list instead of one request per toggle
+        roles = [guild.get_role(role_id) for role_id in current if role_id not in removed and role_id != guild.id]
+        roles = [role for role in roles if role] + add
+        updated = await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: member.edit(roles=roles))
+        if updated is not None:
+            return {role.id for role in updated.roles}
+        return {role.id for role in roles} | {guild.id}
+
+reaction_role_batcher = ReactionRoleBatcher()
+
+# === TIMER QUEUE ===
+
+class TimerQueue:
+    """Runs keyed callbacks at their due time from one heap and one sleeping task
+    
+    Scheduling a key that is already pending replaces its timer, so a burst
+    of reschedules for the same key collapses into the last one.
+    """
+    
+    def __init__(self, name="timer"):
+        self.name = name
+        self.heap = []  # (due, sequence, key); replaced and cancelled entries are skipped when popped
+        self.timers = {}  # key -> (due, sequence, callback)
+        self.sequence = 0
+        self.wakeup = None
+        self.task = None
+        self.firing = set()  # Callback tasks still running, held so they aren't garbage collected
+    
+    def schedule(self, key, delay, callback):
+        """Call `callback()` (a coroutine function) in `delay` seconds, replacing any timer for `key`"""
+        self.sequence += 1
+        due = time.monotonic() + delay
+        self.timers[key] = (due, self.sequence, callback)
+        heapq.heappush(self.heap, (due, self.sequence, key))
+        if len(self.heap) > 2 * len(self.timers) + 64:
+            self.heap = [(due, sequence, key) for key, (due, sequence, _) in self.timers.items()]
+            heapq.heapify(self.heap)
+        
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.run())
+        elif self.wakeup and self.heap[0][1] == self.sequence:
+            self.wakeup.set()  # New earliest timer; re-arm the sleep
+    
+    def cancel(self, key):
+        return self.timers.pop(key, None) is not None
+    
+    def __contains__(self, key):
+        return key in self.timers
+    
+    def __len__(self):
+        return len(self.timers)
+    
+    async def run(self):
+        self.wakeup = asyncio.Event()
+        while self.timers:
+            due, sequence, key = self.heap[0]
+            timer = self.timers.get(key)
+            if not timer or timer[1] != sequence:
+                heapq.heappop(self.heap)
+                continue
+            
+            delay = due - time.monotonic()
+            if delay > 0:
+                self.wakeup.clear()
+                try:
+                    await asyncio.wait_for(self.wakeup.wait(), delay)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+            
+            heapq.heappop(self.heap)
+            del self.timers[key]
+            task = asyncio.create_task(self.fire(key, timer[2]))
+            self.firing.add(task)
+            task.add_done_callback(self.firing.discard)
+        self.heap.clear()
+    
+    async def fire(self, key, callback):
+        try:
+            await callback()
+        except Exception as e:
+            print(f"Error in {self.name} timer {key}: {e}")
+
+class GuildRateLimiter:
+    """Sliding-window limit of `limit` calls per `per` seconds for each guild"""
+    
+    def __init__(self, limit, per):
+        self.limit = limit
+        self.per = per
+        self.calls = {}  # guild ID -> deque of call times
+    
+    async def acquire(self, guild_id):
+        calls = self.calls.setdefault(guild_id, deque())
+        while True:
+            now = time.monotonic()
+            while calls and now - calls[0] >= self.per:
+                calls.popleft()
+            if len(calls) < self.limit:
+                calls.append(now)
+                return
+            await asyncio.sleep(self.per - (now - calls[0]))
+
 # === TEMPORARY VOICE CHANNELS SYSTEM ===
 
+TEMP_VOICE_POOL_SIZE = 3  # Hidden rooms kept ready per guild
+TEMP_VOICE_POOL_NAME = "🎤 Room"
+TEMP_VOICE_USER_LIMIT = 10
+TEMP_VOICE_GRACE_PERIOD = 30  # Seconds an empty room survives, so a reconnect finds it again
+TEMP_VOICE_CHANNEL_RATE = {"limit": 5, "per": 10.0}  # Room creates + deletes per guild
+
 class TempVoiceSystem:
-    def __init__(self):
-        self.temp_channels = {}
-        self.creator_channels = {}
+    """Temporary voice rooms handed out from a pool of pre-created channels
+    
+    Each guild keeps TEMP_VOICE_POOL_SIZE hidden voice channels next to its
+    creator channel. Joining the creator moves the member straight into a
+    pooled room (one API call); the room is renamed and unhidden after the
+    move and the pool is topped up in the background. Empty rooms are
+    deleted rather than recycled, since Discord only allows two renames per
+    channel every 10 minutes. Creators, pools and live rooms are persisted
+    so a restart can clean up orphans.
+    
+    Voice events are filtered through the creator ID set and the room index,
+    so mute/deafen/stream toggles and unrelated channels return at once.
+    Empty rooms are deleted after TEMP_VOICE_GRACE_PERIOD from a shared
+    timer queue (a rejoin cancels it, repeated leaves re-arm it), and room
+    creates/deletes are rate limited per guild to absorb join storms.
+    """
+    
+    def __init__(self, pool_size=TEMP_VOICE_POOL_SIZE):
+        self.pool_size = pool_size
+        self.temp_channels = {}  # room channel ID -> {'guild_id', 'owner', 'created_at'}
+        self.creator_channels = {}  # guild ID -> creator channel ID
+        self.creator_ids = set()
+        self.pools = {}  # guild ID -> [pooled channel IDs]
+        self.refilling = set()
+        self.deletions = TimerQueue("temp voice deletion")
+        self.channel_limiter = GuildRateLimiter(**TEMP_VOICE_CHANNEL_RATE)
+        self.load()
+    
+    def load(self):
+        for guild_id, state in data_manager.get_temp_voice().items():
+            self.creator_channels[int(guild_id)] = state["creator_channel_id"]
+            self.creator_ids.add(state["creator_channel_id"])
+            self.pools[int(guild_id)] = list(state.get("pool", []))
+            for channel_id, room in state.get("rooms", {}).items():
+                self.temp_channels[int(channel_id)] = dict(room, guild_id=int(guild_id))
+    
+    def save(self, guild_id):
+        if guild_id not in self.creator_channels:
+            data_manager.remove_temp_voice(guild_id)
+            return
+        data_manager.update_temp_voice(
+            guild_id,
+            creator_channel_id=self.creator_channels[guild_id],
+            pool=self.pools.get(guild_id, []),
+            rooms={
+                str(channel_id): {"owner": room["owner"], "created_at": room["created_at"]}
+                for channel_id, room in self.temp_channels.items() if room["guild_id"] == guild_id
+            }
+        )
+    
+    @staticmethod
+    def pool_overwrites(guild):
+        return {
+            guild.default_role: discord.PermissionOverwrite(view_channel=False),
+            guild.me: discord.PermissionOverwrite(view_channel=True, connect=True, manage_channels=True, move_members=True)
+        }
     
     async def setup_temp_voice(self, guild, category_id, creator_channel_name="➕ Create Voice"):
         category = guild.get_channel(category_id)
@@ -836,78 +1827,140 @@ class TempVoiceSystem:
             return False
         creator_channel = await guild.create_voice_channel(name=creator_channel_name, category=category)
         self.creator_channels[guild.id] = creator_channel.id
+        self.creator_ids.add(creator_channel.id)
+        self.pools.setdefault(guild.id, [])
+        self.save(guild.id)
+        asyncio.create_task(self.refill(guild))
         return True
-
-temp_voice_system = TempVoiceSystem()
-
-class YouTubeMilestoneSystem:
-    def __init__(self):
-        self.milestone_channels = {}
-        self.subscriber_roles = {
-            1000: "1k_subs",
-            10000: "10k_subs", 
-            25000: "25k_subs",
-            50000: "50k_subs",
-            100000: "100k_subs",
-            250000: "250k_subs", 
-            500000: "500k_subs",
-            1000000: "1m_subs"
-        }
     
-    async def setup_milestone_channels(self, guild):
-        """Setup milestone tracking channels"""
-        milestone_channels = {}
+    async def disable(self, guild):
+        """Delete the creator, pooled and empty rooms and forget the guild"""
+        channel_ids = [self.creator_channels.pop(guild.id, None)] + self.pools.pop(guild.id, [])
+        channel_ids += [channel_id for channel_id, room in self.temp_channels.items() if room["guild_id"] == guild.id]
+        for channel_id in channel_ids:
+            channel = guild.get_channel(channel_id) if channel_id else None
+            self.creator_ids.discard(channel_id)
+            self.temp_channels.pop(channel_id, None)
+            self.deletions.cancel(channel_id)
+            if channel and not getattr(channel, "members", None):
+                try:
+                    await outbound.submit(PRIORITY_BULK, guild.id, channel.delete)
+                except Exception:
+                    pass
+        self.save(guild.id)
+    
+    async def refill(self, guild):
+        """Create hidden rooms until the guild's pool is full"""
+        if guild.id in self.refilling or guild.id not in self.creator_channels:
+            return
+        self.refilling.add(guild.id)
+        try:
+            creator = guild.get_channel(self.creator_channels[guild.id])
+            category = creator.category if creator else None
+            pool = self.pools.setdefault(guild.id, [])
+            while len(pool) < self.pool_size and guild.id in self.creator_channels:
+                await self.channel_limiter.acquire(guild.id)
+                channel = await outbound.submit(PRIORITY_BULK, guild.id, lambda: guild.create_voice_channel(
+                    name=TEMP_VOICE_POOL_NAME, category=category,
+                    overwrites=self.pool_overwrites(guild), user_limit=TEMP_VOICE_USER_LIMIT
+                ))
+                pool.append(channel.id)
+                self.save(guild.id)
+        except Exception as e:
+            print(f"Error refilling temp voice pool for {guild.name}: {e}")
+        finally:
+            self.refilling.discard(guild.id)
+    
+    async def open_room(self, member, creator):
+        """Put a member who joined the creator channel into a room of their own"""
+        guild = member.guild
+        pool = self.pools.setdefault(guild.id, [])
+        channel = None
+        while pool and not channel:
+            channel = guild.get_channel(pool.pop(0))
+        name = f"🎤 {member.display_name}'s Room"
         
-        milestone_levels = [
-            ("1k_subs", "🥉 1K Subscribers"),
-            ("10k_subs", "🥈 10K Subscribers"),
-            ("25k_subs", "🥇 25K Subscribers"),
-            ("50k_subs", "💎 50K Subscribers"),
-            ("100k_subs", "🏆 100K Subscribers"),
-            ("250k_subs", "🌟 250K Subscribers"),
-            ("500k_subs", "🚀 500K Subscribers"),
-            ("1m_subs", "👑 1M Subscribers")
-        ]
+        if channel:
+            try:
+                await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: member.move_to(channel))
+            except Exception:
+                pool.insert(0, channel.id)  # Member left before the move; keep the room pooled
+                return None
+            # Rename and unhide once the member is already in it
+            asyncio.create_task(outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: channel.edit(name=name, sync_permissions=True)))
+        else:
+            # Pool is empty: fall back to creating the room on the spot
+            await self.channel_limiter.acquire(guild.id)
+            channel = await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: guild.create_voice_channel(name=name, category=creator.category, user_limit=TEMP_VOICE_USER_LIMIT))
+            await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: member.move_to(channel))
+        
+        self.temp_channels[channel.id] = {
+            "guild_id": guild.id,
+            "owner": member.id,
+            "created_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+        }
+        self.save(guild.id)
+        asyncio.create_task(self.refill(guild))
+        return channel
+    
+    async def handle_voice_move(self, member, before, after):
+        """Open, keep or schedule deletion of rooms for a member who changed channel"""
+        if after and after.id in self.creator_ids:
+            await self.open_room(member, after)
+        elif after and after.id in self.temp_channels:
+            self.deletions.cancel(after.id)  # Back before the grace period ran out
+        
+        if before and before.id in self.temp_channels and not before.members:
+            self.deletions.schedule(before.id, TEMP_VOICE_GRACE_PERIOD, lambda: self.expire(before))
+    
+    async def expire(self, channel):
+        if channel.id in self.temp_channels and not channel.members:
+            await self.close_room(channel)
+    
+    async def close_room(self, channel):
+        """Delete an empty room"""
+        self.deletions.cancel(channel.id)
+        self.temp_channels.pop(channel.id, None)
+        self.save(channel.guild.id)
+        await self.channel_limiter.acquire(channel.guild.id)
+        try:
+            await outbound.submit(PRIORITY_BULK, channel.guild.id, channel.delete)
+        except discord.NotFound:
+            pass
+    
+    async def reconcile(self, guild):
+        """Drop state for channels that no longer exist and clean up rooms orphaned by a restart"""
+        creator = guild.get_channel(self.creator_channels.get(guild.id, 0))
+        if not creator:
+            print(f"🧹 Temp voice creator channel is gone in {guild.name}, disabling temp voice")
+            await self.disable(guild)
+            return
         
-        for role_key, role_name in milestone_levels:
-            channel = await guild.create_text_channel(
-                name=role_name,
-                topic=f"Channel milestone: {role_name}"
-            )
-            milestone_channels[role_key] = channel
+        pool = [channel_id for channel_id in self.pools.get(guild.id, []) if guild.get_channel(channel_id)]
+        self.pools[guild.id] = pool
         
-        return milestone_channels
-    
-    async def update_milestone(self, guild, subscriber_count):
-        """Update milestone roles and channels"""
-        milestone_levels = [
-            (1000, "1k_subs"),
-            (10000, "10k_subs"),
-            (25000, "25k_subs"),
-            (50000, "50k_subs"),
-            (100000, "100k_subs"),
-            (250000, "250k_subs"),
-            (500000, "500k_subs"),
-            (1000000, "1m_subs")
-        ]
+        # Empty pool-named channels we don't know about were created right before a crash
+        known = set(pool) | set(self.temp_channels)
+        for channel in (creator.category.voice_channels if creator.category else []):
+            if channel.name == TEMP_VOICE_POOL_NAME and channel.id not in known and not channel.members:
+                try:
+                    await outbound.submit(PRIORITY_BULK, guild.id, channel.delete)
+                except Exception:
+                    pass
         
-        for count, role_key in milestone_levels:
-            if subscriber_count >= count:
-                role = discord.utils.get(guild.roles, name=self.milestone_channels[role_key].name)
-                if role:
-                    await self.milestone_channels[role_key].send(f"🎉 Reached {count} subscribers!")
-                    await self.assign_milestone_role(guild, role)
-            else:
-                break
-    
-    async def assign_milestone_role(self, guild, role):
-        """Assign milestone role to all subscribers"""
-        for member in guild.members:
-            if not member.bot:
-                await member.add_roles(role)
+        for channel_id, room in list(self.temp_channels.items()):
+            if room["guild_id"] != guild.id:
+                continue
+            channel = guild.get_channel(channel_id)
+            if not channel:
+                del self.temp_channels[channel_id]
+            elif not channel.members:
+                await self.close_room(channel)
+        
+        self.save(guild.id)
+        await self.refill(guild)
 
-# Initialize milestone system
-youtube_milestone_system = YouTubeMilestoneSystem()
+temp_voice_system = TempVoiceSystem()
 
 # === ANTI SPAM SYSTEM ===
 
@@ -971,7 +2024,7 @@ class AntiSpamSystem:
         
         # Delete the message
         try:
-            await message.delete()
+            await outbound.submit(PRIORITY_MODERATION, message.guild.id, message.delete)
         except:
             pass
         
@@ -1008,7 +2061,7 @@ class AntiSpamSystem:
             
             embed.set_footer(text="Thank you for helping keep our community respectful")
             
-            await user.send(embed=embed)
+            await outbound.submit(PRIORITY_LOG, user.guild.id, lambda: user.send(embed=embed))
         except:
             pass  # Can't DM user
     
@@ -1017,10 +2070,10 @@ class AntiSpamSystem:
         if warn_count == 3:
             # Temp ban for spamming
             try:
-                await message.author.ban(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.ban(
                     reason="Auto-mod: 3 spam warnings",
                     delete_message_days=1
-                )
+                ))
                 
                 unban_time = datetime.datetime.now(datetime.timezone.utc) + datetime.timedelta(hours=1)
                 data_manager.add_banned_user(message.author.id, unban_time)
@@ -1034,9 +2087,9 @@ class AntiSpamSystem:
         elif warn_count >= 5:
             # Kick for excessive spamming
             try:
-                await message.author.kick(
+                await outbound.submit(PRIORITY_MODERATION, message.guild.id, lambda: message.author.kick(
                     reason="Auto-mod: Excessive spam warnings"
-                )
+                ))
                 data_manager.remove_warnings(message.guild.id, message.author.id)
             except Exception as e:
                 print(f"Spam kick error: {e}")
@@ -1045,7 +2098,7 @@ class AntiSpamSystem:
         """Schedule automatic unban"""
         await asyncio.sleep(delay_seconds)
         try:
-            await guild.unban(user)
+            await outbound.submit(PRIORITY_MODERATION, guild.id, lambda: guild.unban(user))
             data_manager.remove_banned_user(user.id)
         except:
             pass
@@ -1082,13 +2135,13 @@ class AntiSpamSystem:
         embed.add_field(name="Action Taken", value=action, inline=False)
         embed.add_field(name="Message Content", value=f"``{message.content}```", inline=False)
         
-        await staff_channel.send(embed=embed)
+        await outbound.submit(PRIORITY_LOG, message.guild.id, lambda: staff_channel.send(embed=embed))
 
 # Initialize anti-spam system
 anti_spam = AntiSpamSystem()
 
 # Initialize YouTube system
-youtube_system = YouTubeMilestoneSystem()
+youtube_system = youtube_milestone_system
 
 # === AUTO RULES SYSTEM ===
 
@@ -1139,6 +2192,109 @@ class RulesSystem:
             ]
         }
 
+RULES_HISTORY = 20  # Rule versions kept per guild for rollback
+
+class RulesStore:
+    """Versioned rules per guild, plus the messages that display them
+    
+    Every change adds a version (the last RULES_HISTORY are kept), and the
+    ID of each live rules message is recorded per channel, so an update is
+    one message edit per channel, done concurrently, rather than a purge and
+    a new post. Messages that were deleted are posted again and re-recorded.
+    """
+    
+    def state(self, guild_id):
+        return data_manager.get_rules().setdefault(str(guild_id), {"versions": [], "messages": {}})
+    
+    def current(self, guild_id):
+        versions = data_manager.get_rules().get(str(guild_id), {}).get("versions", [])
+        return versions[-1] if versions else None
+    
+    def version(self, guild_id, number):
+        return next((version for version in self.state(guild_id)["versions"] if version["version"] == number), None)
+    
+    def record(self, guild_id, rules, user_id=None, kind="edit"):
+        state = self.state(guild_id)
+        number = state["versions"][-1]["version"] + 1 if state["versions"] else 1
+        version = {
+            "version": number,
+            "kind": kind,  # template, edit or rollback
+            "rules": list(rules),
+            "edited_by": user_id,
+            "edited_at": datetime.datetime.now(datetime.timezone.utc).isoformat()
+        }
+        state["versions"].append(version)
+        del state["versions"][:-RULES_HISTORY]
+        data_manager.save_data()
+        return version
+    
+    def set_message(self, guild_id, channel_id, message_id):
+        self.state(guild_id)["messages"][str(channel_id)] = message_id
+        data_manager.save_data()
+    
+    def remove_channel(self, guild_id, channel_id):
+        removed = self.state(guild_id)["messages"].pop(str(channel_id), None)
+        data_manager.save_data()
+        return removed is not None
+    
+    def message_for(self, guild_id, channel_id):
+        return data_manager.get_rules().get(str(guild_id), {}).get("messages", {}).get(str(channel_id))
+    
+    def adopt_template(self, guild_id, channel_id, message_id, rules):
+        """Track the rules a template just posted; the old channels are gone with the old layout"""
+        self.state(guild_id)["messages"] = {}
+        self.record(guild_id, rules, kind="template")
+        self.set_message(guild_id, channel_id, message_id)
+    
+    @staticmethod
+    def embed_for(version):
+        if version["kind"] == "template":
+            embed = build_rules_embed(version["rules"])
+        else:
+            embed = discord.Embed(
+                title="🛡️ Server Rules (Edited)",
+                description="These rules were customized by the server owner.",
+                color=0xffa500
+            )
+            for i, rule in enumerate(version["rules"], 1):
+                embed.add_field(name=f"Rule #{i}", value=rule, inline=False)
+            edited_at = int(datetime.datetime.fromisoformat(version["edited_at"]).timestamp())
+            embed.add_field(
+                name="📝 Last Updated",
+                value=f"Edited by <@{version['edited_by']}> at <t:{edited_at}:F>",
+                inline=False
+            )
+        embed.set_footer(text=f"Rules version {version['version']}")
+        return embed
+    
+    async def show(self, guild, channel, embed):
+        """Edit the channel's rules message in place, posting (and recording) a new one if it's gone"""
+        message_id = self.message_for(guild.id, channel.id)
+        if message_id:
+            try:
+                await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: channel.get_partial_message(message_id).edit(embed=embed))
+                return "edited"
+            except discord.NotFound:
+                pass
+        message = await outbound.submit(PRIORITY_INTERACTION, guild.id, lambda: channel.send(embed=embed))
+        self.set_message(guild.id, channel.id, message.id)
+        return "posted"
+    
+    async def publish(self, guild, version):
+        """Show `version` in every rules channel of the guild; returns {channel: result}"""
+        embed = self.embed_for(version)
+        channels = []
+        for channel_id in list(self.state(guild.id)["messages"]):
+            channel = guild.get_channel(int(channel_id))
+            if channel:
+                channels.append(channel)
+            else:
+                self.remove_channel(guild.id, channel_id)
+        results = await asyncio.gather(*[self.show(guild, channel, embed) for channel in channels], return_exceptions=True)
+        return {channel: ("failed" if isinstance(result, Exception) else result) for channel, result in zip(channels, results)}
+
+rules_store = RulesStore()
+
 async def setup_rules_channel(guild, template_name, owner_role):
     """Create rules channel and post auto-generated rules"""
     # Check if a rules channel already exists in the welcome category
@@ -1152,52 +2308,17 @@ async def setup_rules_channel(guild, template_name, owner_role):
                 existing_rules_channel = channel
                 break
     
-    # If no existing rules channel found, create one
-    if not existing_rules_channel:
-        rules_channel = await guild.create_text_channel(
-            name="📜rules-config",
-            topic="Server rules configuration - Only Owner & Bot can access"
-        )
-    else:
-        # Use existing rules channel
-        rules_channel = existing_rules_channel
-    
-    # Set permissions - only owner and bot can access (if we created a new channel)
-    if not existing_rules_channel:
-        await rules_channel.set_permissions(guild.default_role, view_channel=False)
-        if owner_role:
-            await rules_channel.set_permissions(owner_role, view_channel=True, send_messages=True)
-        await rules_channel.set_permissions(guild.me, view_channel=True, send_messages=True)
-    
-    # Post auto-generated rules
-    rules_system = RulesSystem()
-    rules = rules_system.default_rules.get(template_name, [])
-    
-    # Check if rules message already exists to avoid duplicates
-    try:
-        async for message in rules_channel.history(limit=5):
-            if "Auto-Generated Server Rules" in message.content or (message.embeds and message.embeds[0].title == "🛡️ Auto-Generated Server Rules"):
-                # Rules message already exists, don't post again
-                return rules_channel
-    except:
-        pass  # Continue with posting rules if we can't check history
-    
-    embed = discord.Embed(
-        title="🛡️ Auto-Generated Server Rules",
-        description="These rules were automatically generated for your server template.",
-        color=0x00ff00
-    )
-    
-    for i, rule in enumerate(rules, 1):
-        embed.add_field(name=f"Rule #{i}", value=rule, inline=False)
-    
-    embed.add_field(
-        name="⚙️ How to Edit Rules",
-        value="Use `/editrules` to modify these rules. Only server owners can edit rules.",
-        inline=False
+    known_message = bool(existing_rules_channel and rules_store.message_for(guild.id, existing_rules_channel.id))
+    plan = template_planner.plan_rules_channel(
+        OperationPlan("rules"), template_name, owner_role.id if owner_role else None, existing_rules_channel, known_message=known_message
     )
+    executor = PlanExecutor(guild, plan)
+    await executor.run()
     
-    await rules_channel.send(embed=embed)
+    rules_channel = executor.channels.get("rules")
+    message_id = executor.sent_messages.get("rules") or executor.found_messages.get("rules")
+    if rules_channel and message_id and not known_message:
+        rules_store.adopt_template(guild.id, rules_channel.id, message_id, RulesSystem().default_rules.get(template_name, []))
     return rules_channel
 
 # === WELCOME SYSTEM ===
@@ -1224,206 +2345,598 @@ welcome_system = WelcomeSystem()
 async def setup_staff_channel(guild, staff_roles):
     """Create staff-only channel"""
     try:
-        staff_channel = await guild.create_text_channel(
-            name="🔧staff-chat",
-            topic="Staff discussions and coordination"
+        plan = template_planner.plan_staff_channel(OperationPlan("staff"), [role.id for role in staff_roles if role])
+        executor = PlanExecutor(guild, plan)
+        await executor.run()
+        return executor.channels.get("staff_chat")
+    except Exception as e:
+        print(f"Staff channel setup error: {e}")
+        return None
+
+# === TEMPLATE PACKS ===
+
+TEMPLATE_PACK_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "templates")
+TEMPLATE_CAPTURE_DIR = os.path.join(TEMPLATE_PACK_DIR, "captured")  # One subdirectory per guild
+TEMPLATE_STAGING_DIR = os.path.join(TEMPLATE_CAPTURE_DIR, ".staging")  # Captures being written; never loaded
+TEMPLATE_CACHE_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "template_cache")
+TEMPLATE_IR_VERSION = 1
+CHANNEL_TYPES = ("text", "voice", "stage")
+STAFF_ROLE_NAMES = ["👑 Owner", "⚡ Head Admin", "🔧 Admin", "🛡️ Moderator", "Owner", "Admin", "Moderator"]
+
+class TemplatePackError(Exception):
+    """Raised when a template pack does not match the pack schema"""
+
+def freeze(value):
+    """Recursively turn dicts/lists into read-only mappings/tuples"""
+    if isinstance(value, dict):
+        return MappingProxyType({key: freeze(item) for key, item in value.items()})
+    if isinstance(value, (list, tuple)):
+        return tuple(freeze(item) for item in value)
+    return value
+
+def thaw(value):
+    """Inverse of freeze, for JSON serialization"""
+    if isinstance(value, MappingProxyType):
+        return {key: thaw(item) for key, item in value.items()}
+    if isinstance(value, tuple):
+        return [thaw(item) for item in value]
+    return value
+
+def _parse_color(value, where):
+    if isinstance(value, bool):
+        raise TemplatePackError(f"{where}: color must be an int or '#rrggbb'")
+    if isinstance(value, int):
+        return value
+    if isinstance(value, str) and re.fullmatch(r"#?[0-9a-fA-F]{6}", value):
+        return int(value.lstrip("#"), 16)
+    raise TemplatePackError(f"{where}: color must be an int or '#rrggbb'")
+
+def _validate_overwrites(overwrites, role_keys, where):
+    if not isinstance(overwrites, dict):
+        raise TemplatePackError(f"{where}: overwrites must be an object")
+    for target, permissions in overwrites.items():
+        if target not in ("@everyone", "@me") and target not in role_keys:
+            raise TemplatePackError(f"{where}: unknown overwrite target '{target}'")
+        if not isinstance(permissions, dict):
+            raise TemplatePackError(f"{where}: overwrite for '{target}' must be an object")
+        for name, value in permissions.items():
+            if name not in discord.PermissionOverwrite.VALID_NAMES:
+                raise TemplatePackError(f"{where}: unknown permission '{name}'")
+            if value not in (True, False, None):
+                raise TemplatePackError(f"{where}: permission '{name}' must be true, false or null")
+
+def validate_template_pack(pack) -> Dict:
+    """Check a raw pack against the schema and return its normalized form"""
+    if not isinstance(pack, dict):
+        raise TemplatePackError("pack must be an object")
+    for field in ("name", "description"):
+        if not isinstance(pack.get(field), str) or not pack[field]:
+            raise TemplatePackError(f"'{field}' must be a non-empty string")
+    for field in ("roles", "categories", "channels"):
+        if not isinstance(pack.get(field), dict):
+            raise TemplatePackError(f"'{field}' must be an object")
+    
+    roles = {}
+    for key, role in pack["roles"].items():
+        where = f"roles.{key}"
+        if not isinstance(role, dict) or not isinstance(role.get("name"), str):
+            raise TemplatePackError(f"{where}: role needs a name")
+        permissions = role.get("permissions", [])
+        for permission in permissions:
+            if permission not in discord.Permissions.VALID_FLAGS:
+                raise TemplatePackError(f"{where}: unknown permission '{permission}'")
+        roles[key] = {
+            "name": role["name"],
+            "permissions": list(permissions),
+            "color": _parse_color(role.get("color", 0), where),
+            "hoist": bool(role.get("hoist", key in ['owner', 'admin', 'moderator'])),
+            "mentionable": bool(role.get("mentionable", key in ['owner', 'admin']))
+        }
+    
+    categories = {}
+    for key, category in pack["categories"].items():
+        where = f"categories.{key}"
+        if not isinstance(category, dict) or not isinstance(category.get("name"), str):
+            raise TemplatePackError(f"{where}: category needs a name")
+        if not isinstance(category.get("position", 0), int):
+            raise TemplatePackError(f"{where}: position must be an int")
+        categories[key] = {"name": category["name"], "position": category.get("position", 0)}
+        if category.get("overwrites"):
+            _validate_overwrites(category["overwrites"], roles, where)
+            categories[key]["overwrites"] = category["overwrites"]
+    
+    channels = {}
+    for cat_key, entries in pack["channels"].items():
+        if cat_key not in categories:
+            raise TemplatePackError(f"channels.{cat_key}: no category with that key")
+        if not isinstance(entries, list):
+            raise TemplatePackError(f"channels.{cat_key}: must be a list")
+        channels[cat_key] = []
+        for index, channel in enumerate(entries):
+            where = f"channels.{cat_key}[{index}]"
+            if not isinstance(channel, dict) or not isinstance(channel.get("name"), str):
+                raise TemplatePackError(f"{where}: channel needs a name")
+            if channel.get("type") not in CHANNEL_TYPES:
+                raise TemplatePackError(f"{where}: type must be one of {', '.join(CHANNEL_TYPES)}")
+            entry = {"name": channel["name"], "type": channel["type"]}
+            if channel.get("topic"):
+                entry["topic"] = str(channel["topic"])
+            if channel.get("overwrites"):
+                _validate_overwrites(channel["overwrites"], roles, where)
+                entry["overwrites"] = channel["overwrites"]
+            channels[cat_key].append(entry)
+    
+    return {
+        "name": pack["name"],
+        "description": pack["description"],
+        "order": pack.get("order", 1000),
+        "roles": roles,
+        "categories": categories,
+        "channels": channels
+    }
+
+class CompiledTemplate(NamedTuple):
+    """Immutable IR of a template pack
+    
+    Indexing by field name (template['roles']) is kept so compiled templates
+    can be used wherever the old template dicts were.
+    """
+    id: str
+    name: str
+    description: str
+    order: int
+    roles: MappingProxyType
+    categories: MappingProxyType
+    channels: MappingProxyType
+    role_names: frozenset
+    staff_role_keys: tuple
+    operations: tuple  # ("role", key) / ("category", key) / ("channel", category key, index) in creation order
+    content_hash: str
+    source_hash: str
+    
+    def __getitem__(self, key):
+        if isinstance(key, str):
+            return getattr(self, key)
+        return tuple.__getitem__(self, key)
+    
+    @classmethod
+    def compile(cls, template_id, normalized, source_hash):
+        """Build the IR from a normalized pack"""
+        operations = [("role", key) for key in normalized["roles"]]
+        operations += [("category", key) for key in normalized["categories"]]
+        for cat_key, entries in normalized["channels"].items():
+            operations += [("channel", cat_key, index) for index in range(len(entries))]
+        
+        canonical = json.dumps(normalized, sort_keys=True, ensure_ascii=False, separators=(",", ":"))
+        return cls(
+            id=template_id,
+            name=normalized["name"],
+            description=normalized["description"],
+            order=normalized["order"],
+            roles=freeze(normalized["roles"]),
+            categories=freeze(normalized["categories"]),
+            channels=freeze(normalized["channels"]),
+            role_names=frozenset(role["name"] for role in normalized["roles"].values()),
+            staff_role_keys=tuple(key for key, role in normalized["roles"].items() if role["name"] in STAFF_ROLE_NAMES),
+            operations=tuple(operations),
+            content_hash=hashlib.sha256(canonical.encode("utf-8")).hexdigest(),
+            source_hash=source_hash
         )
-        
-        # Set permissions - only staff roles can access
-        await staff_channel.set_permissions(guild.default_role, view_channel=False)
-        for role in staff_roles:
-            if role:  # Check if role exists
-                await staff_channel.set_permissions(role, view_channel=True, send_messages=True)
-        await staff_channel.set_permissions(guild.me, view_channel=True, send_messages=True)
-        
-        # Welcome message for staff
-        embed = discord.Embed(
-            title="👋 Welcome to Staff Chat",
-            description="This channel is for staff discussions, coordination, and important server matters.",
-            color=0x7289da
+    
+    def to_cache(self):
+        return {
+            "version": TEMPLATE_IR_VERSION,
+            "id": self.id,
+            "name": self.name,
+            "description": self.description,
+            "order": self.order,
+            "roles": thaw(self.roles),
+            "categories": thaw(self.categories),
+            "channels": thaw(self.channels),
+            "role_names": sorted(self.role_names),
+            "staff_role_keys": list(self.staff_role_keys),
+            "operations": [list(operation) for operation in self.operations],
+            "content_hash": self.content_hash,
+            "source_hash": self.source_hash
+        }
+    
+    @classmethod
+    def from_cache(cls, data):
+        return cls(
+            id=data["id"],
+            name=data["name"],
+            description=data["description"],
+            order=data["order"],
+            roles=freeze(data["roles"]),
+            categories=freeze(data["categories"]),
+            channels=freeze(data["channels"]),
+            role_names=frozenset(data["role_names"]),
+            staff_role_keys=tuple(data["staff_role_keys"]),
+            operations=tuple(tuple(operation) for operation in data["operations"]),
+            content_hash=data["content_hash"],
+            source_hash=data["source_hash"]
         )
-        embed.add_field(
-            name="Available Commands",
-            value="• `/announce` - Make server announcements\n• `/welcome` - Set welcome message\n• `/editrules` - Modify server rules",
-            inline=False
+
+class TemplateCompiler:
+    """Loads template packs from disk and compiles them, caching the IR by source hash"""
+    
+    def __init__(self, pack_dir=TEMPLATE_PACK_DIR, cache_dir=TEMPLATE_CACHE_DIR):
+        self.pack_dir = pack_dir
+        self.cache_dir = cache_dir
+        self.cache_hits = 0
+    
+    def pack_files(self) -> List[str]:
+        if not os.path.isdir(self.pack_dir):
+            return []
+        extensions = (".json", ".yaml", ".yml") if yaml else (".json",)
+        return sorted(
+            os.path.join(self.pack_dir, name) for name in os.listdir(self.pack_dir)
+            if name.endswith(extensions)
         )
+    
+    def parse(self, path, source):
+        if path.endswith(".json"):
+            return json.loads(source)
+        return yaml.safe_load(source)
+    
+    def compile_file(self, path, use_cache=True) -> CompiledTemplate:
+        """Compile a pack; with use_cache=False it is only validated and nothing is written"""
+        with open(path, 'rb') as f:
+            source = f.read()
+        source_hash = hashlib.sha256(source).hexdigest()
+        template_id = os.path.splitext(os.path.basename(path))[0].lower()
+        
+        cache_path = os.path.join(self.cache_dir, f"{template_id}-{source_hash[:16]}.json")
+        if not use_cache:
+            return self.compile_source(path, template_id, source, source_hash)
+        try:
+            with open(cache_path, 'r', encoding='utf-8') as f:
+                cached = json.load(f)
+            if cached.get("version") == TEMPLATE_IR_VERSION and cached.get("source_hash") == source_hash:
+                self.cache_hits += 1
+                return CompiledTemplate.from_cache(cached)
+        except (FileNotFoundError, ValueError, KeyError):
+            pass
         
-        await staff_channel.send(embed=embed)
-        return staff_channel
-    except Exception as e:
-        print(f"Staff channel setup error: {e}")
+        compiled = self.compile_source(path, template_id, source, source_hash)
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Drop IR compiled from older versions of this pack (not of packs whose ID merely starts the same)
+            stale = re.compile(re.escape(template_id) + r"-[0-9a-f]{16}\.json")
+            for name in os.listdir(self.cache_dir):
+                if stale.fullmatch(name):
+                    os.remove(os.path.join(self.cache_dir, name))
+            with open(cache_path, 'w', encoding='utf-8') as f:
+                json.dump(compiled.to_cache(), f, ensure_ascii=False)
+        except OSError as e:
+            print(f"Could not cache compiled template {template_id}: {e}")
+        return compiled
+    
+    def compile_source(self, path, template_id, source, source_hash) -> CompiledTemplate:
+        try:
+            raw = self.parse(path, source.decode("utf-8"))
+        except Exception as e:
+            raise TemplatePackError(f"could not parse: {e}")
+        return CompiledTemplate.compile(template_id, validate_template_pack(raw), source_hash)
+    
+    def compile_all(self):
+        """Compile every pack; returns ({id: CompiledTemplate}, [error strings])"""
+        self.cache_hits = 0
+        templates, errors = {}, []
+        for path in self.pack_files():
+            try:
+                compiled = self.compile_file(path)
+                templates[compiled.id] = compiled
+            except TemplatePackError as e:
+                errors.append(f"{os.path.basename(path)}: {e}")
+        ordered = sorted(templates.values(), key=lambda template: (template.order, template.id))
+        return {template.id: template for template in ordered}, errors
+
+# === TEMPLATE CAPTURE ===
+
+CAPTURE_CHUNK_SIZE = 50  # Channels written between yields to the event loop
+CAPTURE_CHANNEL_TYPES = {
+    discord.ChannelType.text: "text",
+    discord.ChannelType.news: "text",
+    discord.ChannelType.voice: "voice",
+    discord.ChannelType.stage_voice: "stage"
+}
+
+def _capture_key(name, used):
+    """Pack key from a role/category name: ascii slug, unique within the pack"""
+    base = re.sub(r"[^a-z0-9]+", "_", name.lower()).strip("_") or "item"
+    key, n = base, 2
+    while key in used:
+        key, n = f"{base}_{n}", n + 1
+    used.add(key)
+    return key
+
+def _capture_overwrites(channel, role_keys):
+    """Overwrites in pack form; member and bot-role overwrites don't carry over to other guilds"""
+    overwrites = {}
+    for target, overwrite in channel.overwrites.items():
+        if not isinstance(target, discord.Role):
+            continue
+        key = "@everyone" if target.is_default() else role_keys.get(target.id)
+        permissions = {name: value for name, value in overwrite if value is not None}
+        if key and permissions:
+            overwrites[key] = permissions
+    return overwrites
+
+async def capture_template_pack(guild, path, name, description):
+    """Stream a guild's structure into a template pack file
+    
+    The pack is written entry by entry (one per line, like the bundled packs),
+    and each category's channel list is only built when it is written, so
+    beyond the role list memory stays bounded by the largest category rather
+    than the channel count. Channels without a category go into an
+    "uncategorized" category.
+    """
+    def line(value):
+        return json.dumps(value, ensure_ascii=False)
+    
+    def uncategorized(channel):
+        return channel.category_id is None and channel.type != discord.ChannelType.category
+    
+    def channels_of(category):
+        if category is None:
+            return sorted(filter(uncategorized, guild.channels), key=lambda channel: (channel.position, channel.id))
+        return category.channels
+    
+    counts = {"roles": 0, "categories": 0, "channels": 0}
+    groups = list(guild.categories)
+    if any(uncategorized(channel) and channel.type in CAPTURE_CHANNEL_TYPES for channel in guild.channels):
+        groups.insert(0, None)
+    
+    with open(path, 'w', encoding='utf-8') as f:
+        f.write("{\n")
+        f.write(f'  "name": {line(name)},\n  "description": {line(description)},\n  "order": 500,\n')
+        
+        role_keys, used = {}, set()
+        f.write('  "roles": {')
+        for role in sorted(guild.roles, key=lambda role: role.position, reverse=True):
+            if role.is_default() or role.managed:
+                continue
+            role_keys[role.id] = key = _capture_key(role.name, used)
+            entry = {
+                "name": role.name,
+                "permissions": [permission for permission, value in role.permissions if value],
+                "color": f"#{role.color.value:06x}",
+                "hoist": role.hoist,
+                "mentionable": role.mentionable
+            }
+            f.write(("," if counts["roles"] else "") + f"\n    {line(key)}: {line(entry)}")
+            counts["roles"] += 1
+        f.write("\n  },\n")
+        
+        category_keys, used = [], set()
+        f.write('  "categories": {')
+        for position, category in enumerate(groups):
+            if category is None:
+                key, entry = _capture_key("uncategorized", used), {"name": "💬 UNCATEGORIZED", "position": position}
+            else:
+                key, entry = _capture_key(category.name, used), {"name": category.name, "position": position}
+                overwrites = _capture_overwrites(category, role_keys)
+                if overwrites:
+                    entry["overwrites"] = overwrites
+            category_keys.append(key)
+            f.write(("," if position else "") + f"\n    {line(key)}: {line(entry)}")
+            counts["categories"] += 1
+        f.write("\n  },\n")
+        
+        f.write('  "channels": {')
+        for position, category in enumerate(groups):
+            f.write(("," if position else "") + f"\n    {line(category_keys[position])}: [")
+            written = 0
+            for channel in channels_of(category):
+                channel_type = CAPTURE_CHANNEL_TYPES.get(channel.type)
+                if not channel_type:
+                    continue  # Forums and threads have no template equivalent
+                entry = {"name": channel.name, "type": channel_type}
+                if getattr(channel, "topic", None):
+                    entry["topic"] = channel.topic
+                if not (category and channel.permissions_synced):
+                    overwrites = _capture_overwrites(channel, role_keys)
+                    if overwrites:
+                        entry["overwrites"] = overwrites
+                f.write(("," if written else "") + f"\n      {line(entry)}")
+                written += 1
+                counts["channels"] += 1
+                if counts["channels"] % CAPTURE_CHUNK_SIZE == 0:
+                    await asyncio.sleep(0)  # Let other events run while large guilds are captured
+            f.write("\n    ]" if written else "]")
+        f.write("\n  }\n}\n")
+    return counts
+
+# === GUILD SNAPSHOTS ===
+
+SNAPSHOT_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "snapshots")
+SNAPSHOT_HISTORY = 10  # Snapshots kept per guild
+
+def _snapshot_overwrites(channel):
+    """Channel overwrites as [target, {permission: value}] pairs (targets: @everyone, role ID, member:<id>)"""
+    pairs = []
+    for target, overwrite in channel.overwrites.items():
+        if isinstance(target, discord.Role):
+            key = "@everyone" if target.is_default() else target.id
+        else:
+            key = f"member:{target.id}"
+        permissions = {name: value for name, value in overwrite if value is not None}
+        pairs.append([key, permissions])
+    pairs.sort(key=lambda pair: str(pair[0]))
+    return pairs
+
+class GuildSnapshotStore:
+    """Compressed, content-addressed snapshots of guild structure
+    
+    Each snapshot is stored once as snapshots/<sha256>.json.gz; the per-guild
+    history in bot_data.json only holds hashes, so an unchanged guild never
+    writes a second copy.
+    """
+    
+    def __init__(self, snapshot_dir=SNAPSHOT_DIR):
+        self.snapshot_dir = snapshot_dir
+        # guild ID -> structure hash of the newest snapshot
+        self.latest = {
+            int(guild_id): history[-1]["hash"]
+            for guild_id, history in data_manager.get_snapshots().items() if history
+        }
+    
+    @staticmethod
+    def capture(guild) -> Dict:
+        """Roles, categories, channels, topics and overwrites of a guild (from cache, no API calls)"""
+        roles = [
+            {
+                "id": role.id,
+                "name": role.name,
+                "permissions": [name for name, value in role.permissions if value],
+                "color": role.color.value,
+                "hoist": role.hoist,
+                "mentionable": role.mentionable,
+                "position": role.position
+            }
+            for role in sorted(guild.roles, key=lambda role: role.position, reverse=True)
+            if not role.is_default() and not role.managed
+        ]
+        categories = [
+            {"id": category.id, "name": category.name, "position": category.position, "overwrites": _snapshot_overwrites(category)}
+            for category in guild.categories
+        ]
+        channels = []
+        for channel_type, group in (("text", guild.text_channels), ("voice", guild.voice_channels), ("stage", guild.stage_channels)):
+            for channel in group:
+                channels.append({
+                    "id": channel.id,
+                    "name": channel.name,
+                    "type": channel_type,
+                    "category": channel.category_id,
+                    "position": channel.position,
+                    "topic": getattr(channel, "topic", None) or "",
+                    "synced": bool(channel.category and channel.permissions_synced),
+                    "overwrites": _snapshot_overwrites(channel)
+                })
+        return {"guild_id": guild.id, "roles": roles, "categories": categories, "channels": channels}
+    
+    @staticmethod
+    def encode(structure) -> bytes:
+        return json.dumps(structure, sort_keys=True, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    
+    def path(self, snapshot_hash):
+        return os.path.join(self.snapshot_dir, f"{snapshot_hash}.json.gz")
+    
+    def save(self, guild, reason="manual"):
+        """Snapshot a guild; returns (hash, True if the structure changed since the last snapshot)"""
+        encoded = self.encode(self.capture(guild))
+        snapshot_hash = hashlib.sha256(encoded).hexdigest()
+        if self.latest.get(guild.id) == snapshot_hash:
+            return snapshot_hash, False
+        
+        path = self.path(snapshot_hash)
+        if not os.path.exists(path):
+            os.makedirs(self.snapshot_dir, exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(gzip.compress(encoded))
+            os.replace(path + ".tmp", path)
+        
+        structure = json.loads(encoded)
+        data_manager.add_snapshot(guild.id, {
+            "hash": snapshot_hash,
+            "taken_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "reason": reason,
+            "roles": len(structure["roles"]),
+            "categories": len(structure["categories"]),
+            "channels": len(structure["channels"])
+        }, SNAPSHOT_HISTORY)
+        self.latest[guild.id] = snapshot_hash
+        return snapshot_hash, True
+    
+    def load(self, snapshot_hash) -> Dict:
+        with open(self.path(snapshot_hash), 'rb') as f:
+            return json.loads(gzip.decompress(f.read()))
+    
+    def history(self, guild_id) -> List[Dict]:
+        """Snapshots of a guild, newest first"""
+        return list(reversed(data_manager.get_snapshots().get(str(guild_id), [])))
+    
+    def find(self, guild_id, prefix) -> Optional[Dict]:
+        """Look up a guild snapshot by (a prefix of) its hash"""
+        for entry in self.history(guild_id):
+            if entry["hash"].startswith(prefix.lower()):
+                return entry
         return None
+    
+    def prune(self):
+        """Delete snapshot files no guild history refers to any more"""
+        referenced = {entry["hash"] for history in data_manager.get_snapshots().values() for entry in history}
+        removed = 0
+        if not os.path.isdir(self.snapshot_dir):
+            return removed
+        for name in os.listdir(self.snapshot_dir):
+            if name.endswith(".json.gz") and name[:-len(".json.gz")] not in referenced:
+                os.remove(os.path.join(self.snapshot_dir, name))
+                removed += 1
+        return removed
 
 class TemplateSystem:
     """Advanced template management system"""
     
     def __init__(self):
-        self.templates = self._load_templates()
+        self.compiler = TemplateCompiler()
+        self.templates = {}
+        self.captured = {}  # guild ID -> {template ID: CompiledTemplate}, only offered in that guild
+        self.role_names = frozenset()
+        self.load_errors = []
+        self.reload()
         self.server_configs = {}
-        self.backup_snapshots = {}
-        
-    def _load_templates(self) -> Dict:
-        return {
-            "gaming": {
-                "name": "🎮 Ultimate Gaming Community",
-                "description": "Complete gaming server with esports ready structure",
-                "roles": {
-                    "owner": {"name": "👑 Owner", "permissions": ["administrator"], "color": 0xff0000},
-                    "head_admin": {"name": "⚡ Head Admin", "permissions": ["manage_guild", "manage_roles"], "color": 0xff4500},
-                    "admin": {"name": "🔧 Admin", "permissions": ["manage_channels", "manage_messages"], "color": 0xffa500},
-                    "moderator": {"name": "🛡️ Moderator", "permissions": ["manage_messages", "kick_members"], "color": 0x00ff00},
-                    "event_host": {"name": "🎯 Event Host", "permissions": ["mute_members", "move_members"], "color": 0x9370db},
-                    "vip_member": {"name": "⭐ VIP Member", "permissions": ["priority_speaker"], "color": 0xffff00},
-                    "member": {"name": "🎮 Member", "permissions": ["read_messages"], "color": 0x00bfff}
-                },
-                "categories": {
-                    "welcome": {"name": "🚀 WELCOME", "position": 0},
-                    "main_chat": {"name": "💬 MAIN CHAT", "position": 1},
-                    "gaming_zones": {"name": "🎮 GAMING ZONES", "position": 2},
-                    "esports": {"name": "🏆 ESPORTS", "position": 3},
-                    "voice_channels": {"name": "🎧 VOICE CHAT", "position": 4},
-                    "staff": {"name": "🔧 STAFF ZONE", "position": 5}
-                },
-                "channels": {
-                    "welcome": [
-                        {"name": "📋rules", "type": "text", "topic": "Server rules and guidelines"},
-                        {"name": "🎉welcome", "type": "text", "topic": "Welcome new members!"},
-                        {"name": "📢announcements", "type": "text", "topic": "Important server announcements"}
-                    ],
-                    "main_chat": [
-                        {"name": "💬general", "type": "text", "topic": "General discussion"},
-                        {"name": "📸memes", "type": "text", "topic": "Share your favorite memes"},
-                        {"name": "🎮gaming-news", "type": "text", "topic": "Latest gaming news"}
-                    ],
-                    "gaming_zones": [
-                        {"name": "🎯fps-games", "type": "text", "topic": "FPS games discussion"},
-                        {"name": "🧙rpg-games", "type": "text", "topic": "RPG games discussion"},
-                        {"name": "🎲casual-games", "type": "text", "topic": "Casual games chat"}
-                    ],
-                    "esports": [
-                        {"name": "🏆tournaments", "type": "text", "topic": "Tournament announcements"},
-                        {"name": "📊leaderboards", "type": "text", "topic": "Server leaderboards"},
-                        {"name": "🤝scrims", "type": "text", "topic": "Find scrim partners"}
-                    ],
-                    "voice_channels": [
-                        {"name": "🎧General Voice", "type": "voice"},
-                        {"name": "🎮Gaming Lobby 1", "type": "voice"},
-                        {"name": "🎮Gaming Lobby 2", "type": "voice"},
-                        {"name": "🏆Tournament Voice", "type": "voice"},
-                        {"name": "🤫AFK", "type": "voice"}
-                    ],
-                    "staff": [
-                        {"name": "🔧staff-chat", "type": "text", "topic": "Staff discussions"},
-                        {"name": "📋staff-commands", "type": "text", "topic": "Bot command channel"}
-                    ]
-                }
-            },
-            "music": {
-                "name": "🎵 Ultimate Music Community", 
-                "description": "Perfect server for music lovers and creators",
-                "roles": {
-                    "owner": {"name": "👑 Owner", "permissions": ["administrator"], "color": 0xff0000},
-                    "curator": {"name": "🎼 Curator", "permissions": ["manage_messages", "manage_roles"], "color": 0x00ff00},
-                    "dj": {"name": "🎧 DJ", "permissions": ["priority_speaker", "mute_members"], "color": 0x9370db},
-                    "artist": {"name": "🎤 Artist", "permissions": ["attach_files"], "color": 0xff69b4},
-                    "member": {"name": "🎵 Listener", "permissions": ["read_messages"], "color": 0x00bfff}
-                },
-                "categories": {
-                    "welcome": {"name": "🎵 WELCOME", "position": 0},
-                    "music_chat": {"name": "💬 MUSIC CHAT", "position": 1},
-                    "genres": {"name": "🎶 MUSIC GENRES", "position": 2},
-                    "events": {"name": "🎪 EVENTS", "position": 3},
-                    "voice_stages": {"name": "🎤 VOICE & STAGES", "position": 4}
-                },
-                "channels": {
-                    "welcome": [
-                        {"name": "🎵welcome", "type": "text", "topic": "Welcome to our music community!"},
-                        {"name": "📋rules", "type": "text", "topic": "Server rules and guidelines"},
-                        {"name": "🎼introductions", "type": "text", "topic": "Introduce yourself!"},
-                        {"name": "📢announcements", "type": "text", "topic": "Important server announcements"}
-                    ],
-                    "music_chat": [
-                        {"name": "💬general", "type": "text", "topic": "General music discussion"},
-                        {"name": "🎧song-requests", "type": "text", "topic": "Request your favorite songs"},
-                        {"name": "📻music-news", "type": "text", "topic": "Latest music news"}
-                    ],
-                    "genres": [
-                        {"name": "🎸rock-metal", "type": "text", "topic": "Rock and Metal discussion"},
-                        {"name": "🎹electronic", "type": "text", "topic": "Electronic music lovers"},
-                        {"name": "🎤hiphop-rap", "type": "text", "topic": "HipHop & Rap zone"},
-                        {"name": "🎼classical-jazz", "type": "text", "topic": "Classical and Jazz"}
-                    ],
-                    "events": [
-                        {"name": "🎪events", "type": "text", "topic": "Upcoming music events"},
-                        {"name": "🏆charts", "type": "text", "topic": "Weekly music charts"},
-                        {"name": "🎵spotify-playlists", "type": "text", "topic": "Share your playlists"}
-                    ],
-                    "voice_stages": [
-                        {"name": "🎧Music Lounge", "type": "voice"},
-                        {"name": "🎤Live Stage", "type": "stage"},
-                        {"name": "🎼Chill Zone", "type": "voice"},
-                        {"name": "🎶Listening Party", "type": "voice"}
-                    ]
-                }
-            },
-            "friends": {
-                "name": "👥 Ultimate Friends Hangout",
-                "description": "Cozy server for friends and small communities",
-                "roles": {
-                    "owner": {"name": "👑 Owner", "permissions": ["administrator"], "color": 0xff0000},
-                    "member": {"name": "😊 Friend", "permissions": ["read_messages"], "color": 0x00bfff}
-                },
-                "categories": {
-                    "welcome": {"name": "👋 WELCOME", "position": 0},
-                    "main_chat": {"name": "💬 CHAT ZONE", "position": 1},
-                    "media": {"name": "📸 MEDIA", "position": 2},
-                    "activities": {"name": "🎮 ACTIVITIES", "position": 3},
-                    "voice": {"name": "🎧 VOICE CHAT", "position": 4}
-                },
-                "channels": {
-                    "welcome": [
-                        {"name": "👋welcome", "type": "text", "topic": "Welcome to our friend group!"},
-                        {"name": "📋server-info", "type": "text", "topic": "Server information"},
-                        {"name": "📢announcements", "type": "text", "topic": "Important server announcements"}
-                    ],
-                    "main_chat": [
-                        {"name": "💬general", "type": "text", "topic": "General chat"},
-                        {"name": "🤪random", "type": "text", "topic": "Random discussions"},
-                        {"name": "💭thoughts", "type": "text", "topic": "Share your thoughts"}
-                    ],
-                    "media": [
-                        {"name": "📸photos", "type": "text", "topic": "Share your photos"},
-                        {"name": "🎬videos", "type": "text", "topic": "Share interesting videos"},
-                        {"name": "🎵music", "type": "text", "topic": "Music recommendations"}
-                    ],
-                    "activities": [
-                        {"name": "🎮gaming", "type": "text", "topic": "Gaming discussions"},
-                        {"name": "🎬movie-night", "type": "text", "topic": "Movie night planning"},
-                        {"name": "🍿recommendations", "type": "text", "topic": "Share recommendations"}
-                    ],
-                    "voice": [
-                        {"name": "🎧General Voice", "type": "voice"},
-                        {"name": "🎮Gaming Voice", "type": "voice"},
-                        {"name": "🍿Chill Zone", "type": "voice"},
-                        {"name": "💤AFK", "type": "voice"}
-                    ]
-                }
-            },
-            "bloxfruits": blox_fruits_template,
-            "youtube": youtube_template
-        }
+        self.backup_snapshots = GuildSnapshotStore()
+        
+    def reload(self):
+        """(Re)load template packs from disk, returns (template count, errors)"""
+        templates, errors = self.compiler.compile_all()
+        captured = {}
+        if os.path.isdir(TEMPLATE_CAPTURE_DIR):
+            for guild_dir in sorted(os.listdir(TEMPLATE_CAPTURE_DIR)):
+                if not guild_dir.isdigit():
+                    continue
+                # Each guild gets its own IR cache, so equal template IDs in two guilds don't evict each other
+                compiler = TemplateCompiler(
+                    pack_dir=os.path.join(TEMPLATE_CAPTURE_DIR, guild_dir),
+                    cache_dir=os.path.join(TEMPLATE_CACHE_DIR, "captured", guild_dir)
+                )
+                guild_templates, guild_errors = compiler.compile_all()
+                captured[int(guild_dir)] = guild_templates
+                errors += [f"captured/{guild_dir}/{error}" for error in guild_errors]
+        for error in errors:
+            print(f"⚠️ Template pack error: {error}")
 
-    def get_template(self, name: str) -> Optional[Dict]:
+        self.templates = templates
+        self.captured = captured
+        # Every shared template role name, used to clean up roles before a template is applied.
+        # Captured packs stay out of this: their role names are only torn down when that pack is applied.
+        self.role_names = frozenset().union(*(template.role_names for template in templates.values()))
+        self.load_errors = errors
+        return len(templates) + sum(len(guild_templates) for guild_templates in captured.values()), errors
+    
+    def templates_for(self, guild_id) -> Dict[str, CompiledTemplate]:
+        """Shared templates plus the ones captured in this guild"""
+        return dict(self.templates, **self.captured.get(guild_id, {}))
+    
+    def get_template(self, name: str, guild_id=None) -> Optional[CompiledTemplate]:
         """Get template by name"""
-        return self.templates.get(name)
+        return self.templates_for(guild_id).get(name)
 
 class TemplateSelectView(View):
     """Interactive template selection view"""
     
-    def __init__(self, bot):
+    def __init__(self, bot, guild_id=None):
         super().__init__(timeout=60)
         self.bot = bot
         self.value = None
+        # Offer whatever template packs are currently loaded for this guild
+        self.select_callback.options = [
+            discord.SelectOption(label=template.name[:100], value=template_id, description=template.description[:100])
+            for template_id, template in bot.template_system.templates_for(guild_id).items()
+        ][:25]
         
     @discord.ui.select(
         placeholder="Choose a template...",
@@ -1443,19 +2956,38 @@ class TemplateSelectView(View):
 class AdvancedTemplateBot(commands.Bot):
     def __init__(self):
         intents = discord.Intents.all()
-        super().__init__(command_prefix='/', intents=intents, help_command=None)
+        super().__init__(command_prefix='/', intents=intents, help_command=None, http_trace=metrics.http_trace())
         self.template_system = TemplateSystem()
         self.setup_complete = False
         
     async def setup_hook(self):
         """Bot startup tasks"""
         # Note: auto_backup will be started in on_ready
+        loop_monitor.start()
+        if METRICS_PORT:
+            await metrics_server.start()
+            print(f"📊 Metrics listening on {METRICS_HOST}:{METRICS_PORT}/metrics")
+        if SUBSCRIBER_INGEST_PORT:
+            await subscriber_ingest.start()
+            print(f"📈 Subscriber ingest listening on {SUBSCRIBER_INGEST_HOST}:{SUBSCRIBER_INGEST_PORT}")
+    
+    async def close(self):
+        """Shut down background workers along with the connection"""
+        quote_card_renderer.close()
+        await super().close()
         
     @tasks.loop(hours=24)
     async def auto_backup(self):
-        """Auto backup template configurations"""
+        """Auto backup guild structure (only guilds that changed get a new snapshot)"""
         try:
-            print("Auto-backup completed")
+            changed = 0
+            for guild in self.guilds:
+                if job_manager.busy(guild.id):
+                    continue  # Mid-apply layouts aren't worth keeping
+                _, stored = self.template_system.backup_snapshots.save(guild, "auto-backup")
+                changed += stored
+            removed = self.template_system.backup_snapshots.prune()
+            print(f"Auto-backup completed: {changed}/{len(self.guilds)} servers changed, {removed} old snapshots removed")
         except Exception as e:
             print(f"Auto-backup error: {e}")
         
@@ -1488,6 +3020,19 @@ class AdvancedTemplateBot(commands.Bot):
         # Restore active temp bans
         await self.restore_active_bans()
         
+        # Pick up template applications and milestone role assignments interrupted by a restart
+        await self.resume_template_jobs()
+        self.resume_role_assignments()
+        
+        # Arm scheduled announcements and send the ones missed while offline
+        announcement_scheduler.start()
+        
+        # Clean up temp voice rooms left behind by a restart and refill the pools
+        for guild_id in list(temp_voice_system.creator_channels):
+            guild = self.get_guild(guild_id)
+            if guild:
+                asyncio.create_task(temp_voice_system.reconcile(guild))
+        
         await self.change_presence(activity=discord.Activity(type=discord.ActivityType.watching, name="/help for templates"))
         self.auto_backup.start()
         
@@ -1521,7 +3066,51 @@ class AdvancedTemplateBot(commands.Bot):
                     data_manager.remove_banned_user(user_id_str)
             except Exception as e:
                 print(f"Error restoring ban for {user_id_str}: {e}")
+    
+    async def resume_template_jobs(self):
+        """Resume template applications from their checkpoint journals"""
+        for guild_id_str, state in dict(data_manager.get_template_jobs()).items():
+            if state.get("status") != "running" or job_manager.busy(int(guild_id_str)):
+                continue
+            
+            guild = self.get_guild(int(guild_id_str))
+            template = self.template_system.get_template(state["template"], int(guild_id_str))
+            if not guild or not template:
+                continue
+            
+            try:
+                user = guild.get_member(state["user_id"]) or await self.fetch_user(state["user_id"])
+            except Exception as e:
+                print(f"Could not find user for resumed template job in {guild.name}: {e}")
+                continue
+            
+            journal = TemplateJobJournal(guild.id, state)
+            print(f"♻️ Resuming {state['template']} template in {guild.name} ({len(journal.completed)} operations already done)")
+            job_manager.start(
+                guild.id, "apply", f"Resume {state['template']} template",
+                lambda job, guild=guild, user=user, state=state, template=template, journal=journal:
+                    run_template_job(guild, user, state["template"], template, journal, job=job),
+                state["user_id"]
+            )
+    
+    def resume_role_assignments(self):
+        """Resume milestone role assignments from their checkpoints"""
+        for key, state in dict(data_manager.get_role_assignments()).items():
+            guild = self.get_guild(state["guild_id"])
+            roles = [guild.get_role(role_id) for role_id in state["roles"]] if guild else []
+            if not guild or None in roles:
+                data_manager.remove_role_assignment(key)
+                continue
+            
+            running = milestone_role_assigner.running.get(key)
+            if running and not running.done:
+                continue  # on_ready after a reconnect; the job never stopped
+            
+            channel = guild.get_channel(state["channel_id"]) if state.get("channel_id") else None
+            print(f"♻️ Resuming milestone roles in {guild.name} ({state['assigned']} members already done)")
+            milestone_role_assigner.start(guild, roles, channel, f"Resume {', '.join(role.name for role in roles)}", state)
 
+    @metrics.timed
     async def on_member_join(self, member):
         """Enhanced welcome system for new members"""
         try:
@@ -1563,7 +3152,7 @@ class AdvancedTemplateBot(commands.Bot):
                 
             if member_role:
                 try:
-                    await member.add_roles(member_role)
+                    await outbound.submit(PRIORITY_INTERACTION, member.guild.id, lambda: member.add_roles(member_role))
                 except Exception as e:
                     print(f"Could not assign member role: {e}")
             
@@ -1627,116 +3216,1124 @@ class AdvancedTemplateBot(commands.Bot):
                 
                 embed.set_footer(text=f"ID: {member.id}")
                 
-                await welcome_channel.send(embed=embed)
+                await outbound.submit(PRIORITY_LOG, member.guild.id, lambda: welcome_channel.send(embed=embed))
                 
         except Exception as e:
             print(f"Welcome error: {e}")
             
+    @metrics.timed
     async def on_message(self, message):
         if message.guild and not message.author.bot:
             # Check for bad words first
             if await advanced_auto_mod.check_message(message):
+                metrics.inc("jinbe_moderation_verdicts_total", AUTOMOD_VIOLATION)
                 await advanced_auto_mod.handle_violation(message)
             
             # Then check for NSFW conversations (separate system)
             elif await nsfw_detector.detect_nsfw_conversation(message):
+                metrics.inc("jinbe_moderation_verdicts_total", AUTOMOD_CLEAN)
+                metrics.inc("jinbe_moderation_verdicts_total", NSFW_VIOLATION)
                 severity = nsfw_detector.check_explicit_patterns(message.content)
                 await nsfw_detector.handle_nsfw_violation(message, severity)
+            else:
+                metrics.inc("jinbe_moderation_verdicts_total", AUTOMOD_CLEAN)
+                metrics.inc("jinbe_moderation_verdicts_total", NSFW_CLEAN)
     
         await bot.process_commands(message)
 
-async def delete_all_channels(guild):
-    """Delete ALL existing channels in the server"""
-    try:
-        # Delete all text channels
-        for channel in guild.text_channels:
+# === PROGRESS REPORTING ===
+
+# Discord allows ~5 edits per 5 seconds on a message; stay well inside that
+PROGRESS_UPDATE_INTERVAL = 2.0
+
+class ProgressReporter:
+    """Throttled progress message with real percentages and ETA
+    
+    Updates go to a message that is edited in place. If that fails the
+    reporter falls back to a new message in the channel, then an ephemeral
+    interaction followup, then a DM to the user.
+    """
+    
+    def __init__(self, title, total=0, channel=None, interaction=None, user=None,
+                 interval=PROGRESS_UPDATE_INTERVAL, estimate=None):
+        self.title = title
+        self.total = total
+        self.completed = 0
+        self.stage = title
+        self.channel = channel
+        self.interaction = interaction
+        self.user = user
+        self.interval = interval
+        self.estimate = estimate  # Planned duration, used until real rates are known
+        self.message = None
+        self.started = time.monotonic()
+        self.baseline = 0  # Operations already done before this run (resumed jobs)
+        self.last_update = 0.0
+        self.flush_task = None
+    
+    def percent(self) -> int:
+        if not self.total:
+            return 0
+        return min(100, int(self.completed * 100 / self.total))
+    
+    def eta_seconds(self) -> Optional[float]:
+        remaining = max(0, self.total - self.completed)
+        done_here = self.completed - self.baseline
+        elapsed = time.monotonic() - self.started
+        if done_here > 0:
+            return elapsed / done_here * remaining
+        if self.estimate is not None:
+            return max(0.0, self.estimate - elapsed)
+        return None
+    
+    def render(self) -> str:
+        line = f"**{self.stage}** ({self.percent()}%)"
+        if self.total:
+            line += f" • {self.completed}/{self.total} operations"
+        eta = self.eta_seconds()
+        if eta is not None and self.completed < self.total:
+            line += f" • ETA {format_duration(eta)}"
+        return line
+    
+    async def start(self, stage=None, completed=0):
+        """Post the first progress message straight away"""
+        self.completed = self.baseline = completed
+        self.started = time.monotonic()
+        if stage:
+            self.stage = stage
+        await self.update(force=True)
+    
+    def advance(self, count=1):
+        """Count finished operations; the message is refreshed at most once per interval"""
+        self.completed += count
+        self.schedule()
+    
+    async def set_stage(self, stage):
+        self.stage = stage
+        self.schedule()
+    
+    async def move_to(self, channel):
+        """Continue reporting in another channel (e.g. after the old one was deleted)"""
+        self.channel = channel
+        self.message = None
+        await self.update(force=True)
+    
+    def schedule(self):
+        if self.flush_task and not self.flush_task.done():
+            return  # The pending flush will pick up the latest state
+        delay = max(0.0, self.last_update + self.interval - time.monotonic())
+        self.flush_task = asyncio.create_task(self.flush_after(delay))
+    
+    async def flush_after(self, delay):
+        await asyncio.sleep(delay)
+        await self.update(force=True)
+    
+    async def update(self, force=False):
+        if not force and time.monotonic() - self.last_update < self.interval:
+            self.schedule()
+            return
+        self.last_update = time.monotonic()
+        await self.deliver(content=self.render())
+    
+    async def finish(self, content=None, embed=None):
+        """Replace the progress message with a final result, returns True if it was delivered"""
+        if self.flush_task and not self.flush_task.done():
+            self.flush_task.cancel()
+        return await self.deliver(content=content, embed=embed)
+    
+    async def deliver(self, content=None, embed=None):
+        guild = getattr(self.interaction, "guild", None) or getattr(self.channel, "guild", None)
+        guild_id = guild.id if guild else 0
+        return await outbound.submit(PRIORITY_INTERACTION, guild_id, lambda: self.send_update(content, embed))
+    
+    async def send_update(self, content, embed):
+        if self.message:
             try:
-                await channel.delete()
-                await asyncio.sleep(0.5)  # Rate limit protection
-            except Exception as e:
-                print(f"Error deleting text channel {channel.name}: {e}")
-                continue
+                await self.message.edit(content=content, embed=embed)
+                return True
+            except Exception:
+                self.message = None
         
-        # Delete all voice channels
-        for channel in guild.voice_channels:
+        if self.channel:
             try:
-                await channel.delete()
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                print(f"Error deleting voice channel {channel.name}: {e}")
-                continue
+                self.message = await self.channel.send(content=content, embed=embed)
+                return True
+            except Exception:
+                self.channel = None
         
-        # Delete all stage channels
-        for channel in guild.stage_channels:
+        if self.interaction:
             try:
-                await channel.delete()
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                print(f"Error deleting stage channel {channel.name}: {e}")
-                continue
+                self.message = await self.interaction.followup.send(content=content, embed=embed, ephemeral=True, wait=True)
+                return True
+            except Exception:
+                self.interaction = None
         
-        # Delete all categories
-        for category in guild.categories:
+        if self.user:
             try:
-                await category.delete()
-                await asyncio.sleep(0.5)
-            except Exception as e:
-                print(f"Error deleting category {category.name}: {e}")
-                continue
-                
-        return True
-    except Exception as e:
-        print(f"Error in delete_all_channels: {e}")
+                self.message = await self.user.send(content=content, embed=embed)
+                return True
+            except Exception:
+                self.user = None  # Can't DM user
+        
         return False
 
-async def delete_template_roles(guild):
-    """Delete template-specific roles to prevent role accumulation"""
-    try:
-        # List of template-specific role names to delete
-        template_role_names = [
-            # Gaming template roles
-            "👑 Owner", "⚡ Head Admin", "🔧 Admin", "🛡️ Moderator", 
-            "🎯 Event Host", "⭐ VIP Member", "🎮 Member",
-            
-            # Music template roles
-            "🎼 Curator", "🎧 DJ", "🎤 Artist", "🎵 Listener",
-            
-            # Friends template roles
-            "😊 Friend",
-            
-            # Blox Fruits template roles
-            "🏴‍☠️ Fleet Admiral", "⭐ Vice Captain", "🔧 Officer", 
-            "🎮 Crew Member", "🌊 5M Bounty", "⚓ 5M Marine",
-            "🌊 10M Bounty", "⚓ 10M Marine", "🌊 15M Bounty", "⚓ 15M Marine",
-            "🌊 20M Bounty", "⚓ 20M Marine", "🌊 30M Bounty", "⚓ 30M Marine",
-            
-            # YouTube template roles
-            "🎬 Channel Owner", "📹 Content Creator", "✂️ Editor", "🛡️ Moderator",
-            "🥉 1K Subscribers", "🥈 10K Subscribers", "🥇 25K Subscribers",
-            "💎 50K Subscribers", "🏆 100K Subscribers", "🌟 250K Subscribers",
-            "🚀 500K Subscribers", "👑 1M Subscribers", "👍 Subscriber"
-        ]
-        
-        # Delete template-specific roles
-        deleted_count = 0
-        for role in guild.roles:
-            # Skip @everyone role and bot's own role
-            if role.name == "@everyone" or role.managed:
+# === BACKGROUND JOBS ===
+
+JOB_HISTORY = 25  # Finished jobs kept for /jobs
+
+class JobCancelled(Exception):
+    """Raised at the next checkpoint of a job that was cancelled"""
+
+class TeardownFailed(Exception):
+    """Raised when old channels could not be deleted, before anything new is built"""
+
+class CancellationToken:
+    """Checked by long-running work between operations"""
+    
+    def __init__(self):
+        self.cancelled = False
+        self.cancelled_by = None
+    
+    def cancel(self, user=None):
+        self.cancelled = True
+        self.cancelled_by = user
+    
+    def check(self):
+        if self.cancelled:
+            raise JobCancelled()
+
+class Job:
+    """A long-running guild operation running in the background"""
+    
+    def __init__(self, job_id, guild_id, kind, description, user_id=None, exclusive=True):
+        self.id = job_id
+        self.guild_id = guild_id
+        self.kind = kind
+        self.description = description
+        self.user_id = user_id
+        self.exclusive = exclusive
+        self.status = "queued"
+        self.error = None
+        self.token = CancellationToken()
+        self.progress: Optional[ProgressReporter] = None
+        self.task = None
+        self.started_at = time.monotonic()
+        self.finished_at = None
+    
+    @property
+    def done(self):
+        return self.status in ("completed", "failed", "cancelled")
+    
+    def summary(self) -> str:
+        elapsed = (self.finished_at or time.monotonic()) - self.started_at
+        line = f"`{self.id}` **{self.description}** • {self.status} • {format_duration(elapsed)}"
+        if self.progress and not self.done:
+            line += f" • {self.progress.percent()}%"
+            eta = self.progress.eta_seconds()
+            if eta is not None:
+                line += f" • ETA {format_duration(eta)}"
+        if self.error:
+            line += f"\n  ⚠️ {self.error[:100]}"
+        return line
+
+class JobManager:
+    """Registry of background jobs with per-guild mutual exclusion
+    
+    Exclusive jobs (template apply, teardown, restore) can't overlap in the
+    same guild; non-exclusive ones (milestone roles) run alongside them.
+    """
+    
+    def __init__(self):
+        self.jobs: Dict[str, Job] = {}
+        self.exclusive: Dict[int, Job] = {}  # guild ID -> running exclusive job
+        self.next_id = 1
+    
+    def busy(self, guild_id) -> Optional[Job]:
+        """The exclusive job running in a guild, if any"""
+        return self.exclusive.get(guild_id)
+    
+    def start(self, guild_id, kind, description, runner, user_id=None, exclusive=True) -> Optional[Job]:
+        """Run `runner(job)` in the background; returns None if the guild is busy"""
+        if exclusive and guild_id in self.exclusive:
+            return None
+        job = Job(str(self.next_id), guild_id, kind, description, user_id, exclusive)
+        self.next_id += 1
+        self.jobs[job.id] = job
+        if exclusive:
+            self.exclusive[guild_id] = job
+        job.task = asyncio.create_task(self.run(job, runner))
+        self.prune()
+        return job
+    
+    async def run(self, job, runner):
+        job.status = "running"
+        try:
+            await runner(job)
+            job.status = "cancelled" if job.token.cancelled else "completed"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.status = "failed"
+            job.error = str(e)
+            print(f"Job {job.id} ({job.kind}) failed: {e}")
+        finally:
+            job.finished_at = time.monotonic()
+            if self.exclusive.get(job.guild_id) is job:
+                del self.exclusive[job.guild_id]
+    
+    def cancel(self, guild_id, job_id, user=None) -> Optional[Job]:
+        """Ask a running job to stop at its next checkpoint"""
+        job = self.jobs.get(job_id)
+        if not job or job.guild_id != guild_id or job.done:
+            return None
+        job.token.cancel(user)
+        return job
+    
+    def for_guild(self, guild_id) -> List[Job]:
+        """Jobs of a guild, newest first"""
+        return [job for job in reversed(list(self.jobs.values())) if job.guild_id == guild_id]
+    
+    def prune(self):
+        finished = [job_id for job_id, job in self.jobs.items() if job.done]
+        for job_id in finished[:-JOB_HISTORY]:
+            del self.jobs[job_id]
+
+job_manager = JobManager()
+
+# === TEMPLATE OPERATION PLANNER ===
+
+# Rough model of the Discord rate-limit buckets hit while applying a template.
+# limit/per is the bucket size; API_LATENCY is the average REST round trip.
+RATE_LIMIT_BUCKETS = {
+    "channel_create": {"limit": 5, "per": 5.0},
+    "channel_delete": {"limit": 5, "per": 5.0},
+    "channel_permissions": {"limit": 10, "per": 10.0},
+    "channel_positions": {"limit": 5, "per": 5.0},
+    "role_create": {"limit": 5, "per": 5.0},
+    "role_delete": {"limit": 5, "per": 5.0},
+    "role_positions": {"limit": 5, "per": 5.0},
+    "message_send": {"limit": 5, "per": 5.0},
+    "message_read": {"limit": 5, "per": 5.0},
+    "member_edit": {"limit": 10, "per": 10.0}
+}
+API_LATENCY = 0.25
+
+def format_duration(seconds):
+    """Format a duration in seconds as a short human readable string"""
+    seconds = int(round(seconds))
+    if seconds < 60:
+        return f"{seconds}s"
+    return f"{seconds // 60}m {seconds % 60:02d}s"
+
+class PlannedOperation:
+    """A single step of an operation plan (usually one API call)"""
+    
+    def __init__(self, step, kind, label, bucket=None, data=None, delay=0.0, calls=1, index=0):
+        self.step = step
+        self.kind = kind
+        self.label = label
+        self.bucket = bucket
+        self.data = data or {}
+        self.delay = delay  # Pacing sleep after the call succeeds
+        self.calls = calls if bucket else 0  # Expected API calls (0 = expected no-op)
+        self.index = index  # Position in the plan, used for checkpoints
+    
+    def to_dict(self):
+        return {
+            "step": self.step, "kind": self.kind, "label": self.label, "bucket": self.bucket,
+            "data": self.data, "delay": self.delay, "calls": self.calls
+        }
+
+class OperationPlan:
+    """Ordered list of operations shared by the dry-run planner and the executor"""
+    
+    def __init__(self, name):
+        self.name = name
+        self.operations: List[PlannedOperation] = []
+    
+    def add(self, step, kind, label, bucket=None, data=None, delay=0.0, calls=1):
+        operation = PlannedOperation(step, kind, label, bucket, data, delay, calls, index=len(self.operations))
+        self.operations.append(operation)
+        return operation
+    
+    def to_dict(self):
+        return {"name": self.name, "operations": [op.to_dict() for op in self.operations]}
+    
+    @classmethod
+    def from_dict(cls, data):
+        plan = cls(data["name"])
+        for op in data["operations"]:
+            plan.add(op["step"], op["kind"], op["label"], op.get("bucket"), op.get("data"), op.get("delay", 0.0), op.get("calls", 1))
+        return plan
+    
+    def steps(self) -> List[str]:
+        """Step names in execution order"""
+        seen = []
+        for operation in self.operations:
+            if operation.step not in seen:
+                seen.append(operation.step)
+        return seen
+    
+    def operations_for(self, step=None) -> List[PlannedOperation]:
+        if step is None:
+            return list(self.operations)
+        return [op for op in self.operations if op.step == step]
+    
+    def calls_by_bucket(self, step=None) -> Dict[str, int]:
+        """Expected API calls per rate-limit bucket"""
+        calls = {}
+        for operation in self.operations_for(step):
+            if operation.bucket and operation.calls:
+                calls[operation.bucket] = calls.get(operation.bucket, 0) + operation.calls
+        return calls
+    
+    def total_calls(self, step=None) -> int:
+        return sum(self.calls_by_bucket(step).values())
+    
+    def estimate_seconds(self, step=None) -> float:
+        """Predict wall time from the rate-limit bucket model
+        
+        Steps run one after another; inside a step every bucket is worked
+        concurrently by up to `limit` workers, so the slowest bucket wins.
+        """
+        if step is None:
+            return sum(self.estimate_seconds(name) for name in self.steps())
+        
+        per_bucket = {}
+        waits = 0.0
+        for operation in self.operations_for(step):
+            if not operation.bucket:
+                waits += operation.delay
                 continue
-                
-            # Check if role name matches any template role
-            if role.name in template_role_names:
-                try:
-                    await role.delete()
-                    deleted_count += 1
-                    print(f"Deleted template role: {role.name}")
-                    await asyncio.sleep(0.5)  # Rate limit protection
-                except Exception as e:
-                    print(f"Error deleting role {role.name}: {e}")
-                    continue
+            calls, pacing = per_bucket.get(operation.bucket, (0, 0.0))
+            per_bucket[operation.bucket] = (calls + operation.calls, pacing + (operation.delay if operation.calls else 0.0))
+        
+        slowest = 0.0
+        for bucket, (calls, pacing) in per_bucket.items():
+            if not calls:
+                continue
+            model = RATE_LIMIT_BUCKETS.get(bucket, {"limit": 5, "per": 5.0})
+            workers = min(calls, model["limit"])
+            concurrent = math.ceil(calls / workers) * API_LATENCY + pacing / workers
+            throttled = ((calls - 1) // model["limit"]) * model["per"]
+            slowest = max(slowest, concurrent, throttled)
+        return waits + slowest
+
+class TemplatePlanner:
+    """Builds operation plans for template application and teardown"""
+    
+    def plan_channel_teardown(self, plan, guild, step="teardown_channels"):
+        """Plan deletion of every channel and category (same order as before)"""
+        groups = [
+            ("text channel", guild.text_channels),
+            ("voice channel", guild.voice_channels),
+            ("stage channel", guild.stage_channels),
+            ("category", guild.categories)
+        ]
+        for kind_name, channels in groups:
+            for channel in channels:
+                plan.add(step, "delete_channel", f"Delete {kind_name} {channel.name}", "channel_delete",
+                         {"channel_id": channel.id}, delay=0.5)
+        return plan
+    
+    def plan_role_teardown(self, plan, guild, role_names, step="teardown_roles"):
+        """Plan deletion of template-specific roles (role_names comes from the compiled templates)"""
+        for role in guild.roles:
+            # Skip @everyone role and bot's own role
+            if role.is_default() or role.managed:
+                continue
+            if role.name in role_names:
+                plan.add(step, "delete_role", f"Delete role {role.name}", "role_delete",
+                         {"role_id": role.id}, delay=0.5)
+        return plan
+    
+    def plan_rules_channel(self, plan, template_name, owner_target, existing_channel=None, step="features", known_message=False):
+        """Plan the rules channel: creation, permissions and the rules embed
+        
+        `known_message` means the rules store already tracks a rules message
+        in `existing_channel`, so nothing needs to be read or posted.
+        """
+        if existing_channel:
+            plan.add(step, "use_channel", f"Use #{existing_channel.name}", data={"key": "rules", "channel_id": existing_channel.id})
+            if known_message:
+                return plan
+            plan.add(step, "find_message", "Check for existing rules", "message_read",
+                     {"channel": "rules", "limit": 5, "title": "🛡️ Auto-Generated Server Rules"})
+        else:
+            # Only owner and bot can access, set inline at creation
+            overwrites = [["@everyone", {"view_channel": False}]]
+            if owner_target:
+                overwrites.append([owner_target, {"view_channel": True, "send_messages": True}])
+            overwrites.append(["@me", {"view_channel": True, "send_messages": True}])
+            plan.add(step, "create_channel", "Create #📜rules-config", "channel_create", {
+                "key": "rules", "type": "text", "name": "📜rules-config",
+                "topic": "Server rules configuration - Only Owner & Bot can access",
+                "overwrites": overwrites
+            })
+        
+        rules = RulesSystem().default_rules.get(template_name, [])
+        plan.add(step, "send_message", "Post auto-generated rules", "message_send",
+                 {"channel": "rules", "embed": "rules", "args": {"rules": rules}, "unless_found": bool(existing_channel)})
+        return plan
+    
+    def plan_staff_channel(self, plan, staff_targets, step="features"):
+        """Plan the staff-only channel"""
+        # Only staff roles and the bot can access, set inline at creation
+        overwrites = [["@everyone", {"view_channel": False}]]
+        for target in staff_targets:
+            overwrites.append([target, {"view_channel": True, "send_messages": True}])
+        overwrites.append(["@me", {"view_channel": True, "send_messages": True}])
+        plan.add(step, "create_channel", "Create #🔧staff-chat", "channel_create", {
+            "key": "staff_chat", "type": "text", "name": "🔧staff-chat",
+            "topic": "Staff discussions and coordination",
+            "overwrites": overwrites
+        })
+        plan.add(step, "send_message", "Post staff welcome", "message_send",
+                 {"channel": "staff_chat", "embed": "staff_welcome"})
+        return plan
+    
+    def plan_template(self, guild, template_name, template: CompiledTemplate, role_names=None) -> OperationPlan:
+        """Build the full plan that setup_template executes"""
+        plan = OperationPlan(template_name)
+        if role_names is None:
+            role_names = bot.template_system.role_names | template.role_names
+        
+        # Teardown
+        self.plan_channel_teardown(plan, guild)
+        self.plan_role_teardown(plan, guild, role_names)
+        plan.add("teardown_roles", "wait", "Let Discord settle after teardown", delay=4.0)
+        
+        # Temporary progress channel
+        plan.add("progress", "create_category", "Create setup progress category", "channel_create",
+                 {"key": "setup_progress", "name": "⚙️ Setup Progress"})
+        plan.add("progress", "create_channel", "Create #📋setup-progress", "channel_create",
+                 {"key": "setup_progress", "type": "text", "name": "📋setup-progress", "category": "setup_progress"})
+        
+        # Roles that survive teardown are reused instead of created
+        surviving_names = {role.name for role in guild.roles if role.name not in role_names or role.managed}
+        positions = []
+        
+        # The compiled template lists roles, categories and channels in creation order
+        for operation in template.operations:
+            if operation[0] == "role":
+                role_key = operation[1]
+                role_data = template['roles'][role_key]
+                plan.add("roles", "create_role", f"Create role {role_data['name']}", "role_create", {
+                    "key": role_key,
+                    "name": role_data['name'],
+                    "permissions": list(role_data['permissions']),
+                    "color": role_data['color'],
+                    "hoist": role_data['hoist'],
+                    "mentionable": role_data['mentionable']
+                }, delay=0.5, calls=0 if role_data['name'] in surviving_names else 1)
+            elif operation[0] == "category":
+                cat_key = operation[1]
+                cat_data = template['categories'][cat_key]
+                plan.add("categories", "create_category", f"Create category {cat_data['name']}", "channel_create", {
+                    "key": cat_key,
+                    "name": cat_data['name'],
+                    "overwrites": self.template_overwrites(cat_data)
+                }, delay=0.5)
+                positions.append([cat_key, "category", cat_data['position'], None])
+            elif operation[0] == "channel":
+                cat_key, index = operation[1], operation[2]
+                channel_data = template['channels'][cat_key][index]
+                key = f"{cat_key}/{channel_data['name']}"
+                plan.add("channels", "create_channel", f"Create channel {channel_data['name']}", "channel_create", {
+                    "key": key,
+                    "type": channel_data['type'],
+                    "name": channel_data['name'],
+                    "category": cat_key,
+                    "topic": channel_data.get('topic', ''),
+                    "overwrites": self.template_overwrites(channel_data)
+                }, delay=0.5)
+                positions.append([key, "channel", index, cat_key])
+        
+        # Roles are created concurrently, so order them in one bulk call
+        plan.add("roles", "edit_role_positions", "Order template roles", "role_positions",
+                 {"roles": list(template['roles'].keys())})
+        
+        # Categories and channels are created concurrently, so fix the layout in one bulk call
+        if positions:
+            plan.add("channels", "edit_channel_positions", "Order categories and channels", "channel_positions",
+                     {"positions": positions})
+        
+        # Owner role: the template's own owner role, or a pre-existing "Owner" role
+        owner_target = next((key for key, role in template['roles'].items() if role['name'] == "👑 Owner"), None)
+        if owner_target is None:
+            legacy_owner = discord.utils.get(guild.roles, name="Owner")
+            owner_target = legacy_owner.id if legacy_owner else None
+        staff_targets = list(template.staff_role_keys)
+        
+        self.plan_rules_channel(plan, template_name, owner_target)
+        self.plan_staff_channel(plan, staff_targets)
+        
+        return plan
+        
+    def plan_restore(self, guild, structure, role_names=None) -> OperationPlan:
+        """Build the plan that rebuilds a guild from a snapshot"""
+        plan = OperationPlan("restore")
+        if role_names is None:
+            role_names = bot.template_system.role_names
+        
+        # Snapshot roles keep their IDs when they still exist, missing ones are recreated
+        role_keys = {role['id']: f"role:{role['id']}" for role in structure['roles']}
+        
+        def overwrites(pairs):
+            return [[role_keys.get(target, target), permissions] for target, permissions in pairs]
+        
+        # Teardown: every channel, plus template roles the snapshot didn't have
+        self.plan_channel_teardown(plan, guild)
+        snapshot_names = {role['name'] for role in structure['roles']}
+        self.plan_role_teardown(plan, guild, role_names - snapshot_names)
+        plan.add("teardown_roles", "wait", "Let Discord settle after teardown", delay=4.0)
+        
+        for role in structure['roles']:
+            exists = guild.get_role(role['id']) is not None or discord.utils.get(guild.roles, name=role['name']) is not None
+            plan.add("roles", "create_role", f"Restore role {role['name']}", "role_create", {
+                "key": role_keys[role['id']],
+                "role_id": role['id'],
+                "name": role['name'],
+                "permissions": role['permissions'],
+                "color": role['color'],
+                "hoist": role['hoist'],
+                "mentionable": role['mentionable']
+            }, delay=0.5, calls=0 if exists else 1)
+        if structure['roles']:
+            plan.add("roles", "edit_role_positions", "Order restored roles", "role_positions",
+                     {"roles": [role_keys[role['id']] for role in structure['roles']]})
+        
+        positions = []
+        for category in structure['categories']:
+            key = f"cat:{category['id']}"
+            plan.add("categories", "create_category", f"Restore category {category['name']}", "channel_create", {
+                "key": key,
+                "name": category['name'],
+                "overwrites": overwrites(category['overwrites'])
+            }, delay=0.5)
+            positions.append([key, "category", category['position'], None])
+        
+        for channel in structure['channels']:
+            key = f"chan:{channel['id']}"
+            parent = f"cat:{channel['category']}" if channel['category'] else None
+            plan.add("channels", "create_channel", f"Restore channel {channel['name']}", "channel_create", {
+                "key": key,
+                "type": channel['type'],
+                "name": channel['name'],
+                "category": parent,
+                "topic": channel['topic'],
+                # Synced channels inherit their category's overwrites
+                "overwrites": [] if channel['synced'] else overwrites(channel['overwrites'])
+            }, delay=0.5)
+            positions.append([key, "channel", channel['position'], parent])
+        if positions:
+            plan.add("channels", "edit_channel_positions", "Order categories and channels", "channel_positions",
+                     {"positions": positions})
+        return plan
+    
+    @staticmethod
+    def template_overwrites(entry):
+        """Template overwrites ({role key: {permission: value}}) as plan data"""
+        return [[target, dict(overwrite)] for target, overwrite in thaw(entry.get('overwrites', {})).items()]
+
+template_planner = TemplatePlanner()
+
+def build_rules_embed(rules):
+    embed = discord.Embed(
+        title="🛡️ Auto-Generated Server Rules",
+        description="These rules were automatically generated for your server template.",
+        color=0x00ff00
+    )
+    
+    for i, rule in enumerate(rules, 1):
+        embed.add_field(name=f"Rule #{i}", value=rule, inline=False)
+    
+    embed.add_field(
+        name="⚙️ How to Edit Rules",
+        value="Use `/editrules` to modify these rules. Only server owners can edit rules.",
+        inline=False
+    )
+    return embed
+
+def build_staff_welcome_embed():
+    embed = discord.Embed(
+        title="👋 Welcome to Staff Chat",
+        description="This channel is for staff discussions, coordination, and important server matters.",
+        color=0x7289da
+    )
+    embed.add_field(
+        name="Available Commands",
+        value="• `/announce` - Make server announcements\n• `/welcome` - Set welcome message\n• `/editrules` - Modify server rules",
+        inline=False
+    )
+    return embed
+
+PLAN_EMBED_BUILDERS = {
+    "rules": build_rules_embed,
+    "staff_welcome": build_staff_welcome_embed
+}
+
+# Progress message shown while each plan step runs
+TEMPLATE_STEP_LABELS = {
+    "teardown_channels": "🗑️ DELETING ALL EXISTING CHANNELS...",
+    "teardown_roles": "🗑️ Removing old template roles...",
+    "progress": "🔄 Creating temporary progress channel...",
+    "roles": "🔄 Creating roles...",
+    "categories": "🔄 Creating categories...",
+    "channels": "🔄 Creating channels...",
+    "features": "🔄 Setting up additional features..."
+}
+
+class PlanExecutor:
+    """Executes an OperationPlan and records what actually happened"""
+    
+    def __init__(self, guild, plan: OperationPlan, journal=None, progress=None, token: CancellationToken = None):
+        self.guild = guild
+        self.plan = plan
+        self.journal = journal
+        self.progress = progress
+        self.token = token
+        self.roles = {}
+        self.categories = {}
+        self.channels = {}
+        self.found_messages = {}  # channel key -> ID of the matching message
+        self.sent_messages = {}  # channel key -> message ID, so re-runs don't post twice
+        self.calls = {}  # bucket -> API calls actually made
+        self.failures = {}  # bucket -> failed API calls
+        self.failed = []  # Operations whose API call raised
+        self.step_counts = {}  # step -> successful API calls
+        self.elapsed = 0.0
+        self.semaphores = {}  # bucket -> concurrency limit
+    
+    async def run(self, step=None):
+        """Run every operation of a step (or the whole plan, step by step)
+        
+        Operations inside a step run concurrently, at most `limit` per
+        rate-limit bucket. An operation only waits for earlier operations
+        touching the same role/channel keys (and for `wait` barriers).
+        """
+        if step is None:
+            for name in self.plan.steps():
+                await self.run(name)
+            return
+        
+        started = time.monotonic()
+        operations = [
+            op for op in self.plan.operations_for(step)
+            if not (self.journal and self.journal.is_done(op.index))
+        ]
+        finished = {op.index: asyncio.Event() for op in operations}
+        tasks = [
+            asyncio.create_task(self._run_when_ready(op, [finished[i] for i in dependencies], finished[op.index]))
+            for op, dependencies in self.dependencies(operations)
+        ]
+        try:
+            await asyncio.gather(*tasks)
+        finally:
+            for task in tasks:
+                task.cancel()
+            self.elapsed += time.monotonic() - started
+    
+    async def _run_when_ready(self, operation, dependencies, finished):
+        try:
+            for event in dependencies:
+                await event.wait()
+            semaphore = self.semaphore(operation.bucket)
+            async with semaphore:
+                # Cancellation is honoured between operations, never halfway through one
+                if self.token:
+                    self.token.check()
+                if await self.execute(operation) and self.journal:
+                    self.journal.checkpoint(operation.index, self)
+            if self.progress:
+                self.progress.advance()
+        finally:
+            finished.set()
+    
+    def check_teardown(self, step):
+        """Stop if old channels survived the teardown instead of building the new layout on top of them"""
+        if step == "teardown_channels" and any(operation.kind == "delete_channel" for operation in self.failed):
+            raise TeardownFailed("Failed to delete some existing channels. Setup cancelled.")
+    
+    def semaphore(self, bucket):
+        if bucket not in self.semaphores:
+            limit = RATE_LIMIT_BUCKETS.get(bucket, {"limit": 5})["limit"] if bucket else 1000
+            self.semaphores[bucket] = asyncio.Semaphore(limit)
+        return self.semaphores[bucket]
+    
+    @staticmethod
+    def operation_keys(operation):
+        """Role/channel keys an operation creates or uses"""
+        data = operation.data
+        keys = set()
+        if operation.kind == "create_role":
+            keys.add(("role", data['key']))
+        elif operation.kind == "create_category":
+            keys.add(("category", data['key']))
+        elif operation.kind in ("create_channel", "use_channel"):
+            keys.add(("channel", data['key']))
+        if data.get('category'):
+            keys.add(("category", data['category']))
+        if data.get('channel'):
+            keys.update({("channel", data['channel']), ("category", data['channel'])})
+        
+        targets = [data['target']] if 'target' in data else [target for target, _ in data.get('overwrites', [])]
+        for target in targets:
+            if isinstance(target, str) and not target.startswith(("@", "member:")):
+                keys.add(("role", target))
+        
+        if operation.kind == "edit_role_positions":
+            keys.update(("role", key) for key in data['roles'])
+        elif operation.kind == "edit_channel_positions":
+            for key, kind, _, parent in data['positions']:
+                keys.add((kind, key))
+                if parent:
+                    keys.add(("category", parent))
+        return keys
+    
+    def dependencies(self, operations):
+        """Pair each operation with the plan indices it has to wait for"""
+        last_for_key = {}
+        previous = []
+        barrier = None
+        for operation in operations:
+            if operation.kind == "wait":
+                dependencies = set(previous)
+                barrier = operation.index
+            else:
+                dependencies = {last_for_key[key] for key in self.operation_keys(operation) if key in last_for_key}
+                if barrier is not None:
+                    dependencies.add(barrier)
+            for key in self.operation_keys(operation):
+                last_for_key[key] = operation.index
+            previous.append(operation.index)
+            yield operation, sorted(dependencies)
+    
+    async def execute(self, operation: PlannedOperation):
+        handler = getattr(self, f"_op_{operation.kind}")
+        try:
+            if operation.bucket:
+                made_call = await outbound.submit(PRIORITY_BULK, self.guild.id, lambda: handler(operation))
+            else:
+                made_call = await handler(operation)
+        except Exception as e:
+            print(f"Plan error ({operation.label}): {e}")
+            self.failed.append(operation)
+            if operation.bucket:
+                self.calls[operation.bucket] = self.calls.get(operation.bucket, 0) + 1
+                self.failures[operation.bucket] = self.failures.get(operation.bucket, 0) + 1
+            return False
+        
+        if made_call:
+            self.calls[operation.bucket] = self.calls.get(operation.bucket, 0) + 1
+            self.step_counts[operation.step] = self.step_counts.get(operation.step, 0) + 1
+        if operation.delay and (made_call or not operation.bucket):
+            await asyncio.sleep(operation.delay)
+        return True
+    
+    def resolve_channel(self, key):
+        return self.channels.get(key) or self.categories.get(key)
+    
+    def resolve_target(self, target):
+        """Resolve a permission target: @everyone, @me, member:<id>, a role key or a role ID"""
+        if target == "@everyone":
+            return self.guild.default_role
+        if target == "@me":
+            return self.guild.me
+        if isinstance(target, str) and target.startswith("member:"):
+            return self.guild.get_member(int(target[len("member:"):]))
+        if isinstance(target, int):
+            return self.guild.get_role(target)
+        return self.roles.get(target)
+    
+    async def _op_wait(self, operation):
+        return False
+    
+    async def _op_delete_channel(self, operation):
+        channel = self.guild.get_channel(operation.data['channel_id'])
+        if not channel:
+            return False
+        try:
+            await channel.delete()
+        except discord.NotFound:
+            return False  # Already gone, which is what the teardown wants
+        return True
+    
+    async def _op_delete_role(self, operation):
+        role = self.guild.get_role(operation.data['role_id'])
+        if not role:
+            return False
+        await role.delete()
+        print(f"Deleted template role: {role.name}")
+        return True
+    
+    async def _op_create_role(self, operation):
+        data = operation.data
+        if data['key'] in self.roles:
+            return False
+        # Check if role already exists
+        existing_role = (data.get('role_id') and self.guild.get_role(data['role_id'])) or discord.utils.get(self.guild.roles, name=data['name'])
+        if existing_role:
+            self.roles[data['key']] = existing_role
+            return False
         
-        print(f"Deleted {deleted_count} template-specific roles")
+        permissions = discord.Permissions()
+        for perm in data.get('permissions', []):
+            setattr(permissions, perm, True)
+        
+        self.roles[data['key']] = await self.guild.create_role(
+            name=data['name'],
+            permissions=permissions,
+            color=discord.Color(data.get('color', 0x000000)),
+            hoist=data.get('hoist', False),
+            mentionable=data.get('mentionable', False)
+        )
+        return True
+    
+    def build_overwrites(self, pairs):
+        """Turn plan overwrites ([target, {permission: value}]) into discord overwrites"""
+        overwrites = {}
+        for target, permissions in pairs or []:
+            resolved = self.resolve_target(target)
+            if resolved:
+                overwrites[resolved] = discord.PermissionOverwrite(**permissions)
+        return overwrites
+    
+    async def _op_create_category(self, operation):
+        data = operation.data
+        if data['key'] in self.categories:
+            return False
+        kwargs = {}
+        if 'position' in data:
+            kwargs['position'] = data['position']
+        if data.get('overwrites'):
+            kwargs['overwrites'] = self.build_overwrites(data['overwrites'])
+        self.categories[data['key']] = await self.guild.create_category(name=data['name'], **kwargs)
+        return True
+    
+    async def _op_create_channel(self, operation):
+        data = operation.data
+        if data['key'] in self.channels:
+            return False
+        category = None
+        if data.get('category'):
+            category = self.categories.get(data['category'])
+            if not category:
+                return False
+        
+        # Without explicit overwrites a channel inherits its category's permissions
+        kwargs = {}
+        if data.get('overwrites'):
+            kwargs['overwrites'] = self.build_overwrites(data['overwrites'])
+        
+        if data['type'] == 'text':
+            channel = await self.guild.create_text_channel(
+                name=data['name'],
+                category=category,
+                topic=data.get('topic', ''),
+                **kwargs
+            )
+        elif data['type'] == 'voice':
+            channel = await self.guild.create_voice_channel(name=data['name'], category=category, **kwargs)
+        elif data['type'] == 'stage':
+            channel = await self.guild.create_stage_channel(name=data['name'], category=category, **kwargs)
+        else:
+            return False
+        self.channels[data['key']] = channel
+        return True
+    
+    async def _op_edit_role_positions(self, operation):
+        # Keep template order directly below the bot's highest role
+        top = self.guild.me.top_role.position
+        roles = [
+            self.roles[key] for key in operation.data['roles']
+            if key in self.roles and not self.roles[key].managed and self.roles[key].position < top
+        ]
+        positions = {role: top - 1 - i for i, role in enumerate(roles) if top - 1 - i > 0}
+        if not positions:
+            return False
+        await self.guild.edit_role_positions(positions=positions)
+        return True
+    
+    async def _op_edit_channel_positions(self, operation):
+        payload = []
+        for key, kind, position, parent in operation.data['positions']:
+            channel = (self.categories if kind == "category" else self.channels).get(key)
+            if not channel:
+                continue
+            entry = {"id": channel.id, "position": position}
+            if parent and parent in self.categories:
+                entry["parent_id"] = self.categories[parent].id
+            payload.append(entry)
+        if not payload:
+            return False
+        await edit_channel_positions(self.guild, payload)
+        return True
+    
+    async def _op_use_channel(self, operation):
+        channel = self.guild.get_channel(operation.data['channel_id'])
+        if channel:
+            self.channels[operation.data['key']] = channel
+        return False
+    
+    async def _op_set_permissions(self, operation):
+        data = operation.data
+        channel = self.resolve_channel(data['channel'])
+        target = self.resolve_target(data['target'])
+        if not channel or not target:
+            return False
+        await channel.set_permissions(target, **data['overwrite'])
+        return True
+    
+    async def _op_find_message(self, operation):
+        data = operation.data
+        channel = self.resolve_channel(data['channel'])
+        if not channel:
+            return False
+        async for message in channel.history(limit=data.get('limit', 5)):
+            if data['title'] in message.content or (message.embeds and message.embeds[0].title == data['title']):
+                self.found_messages[data['channel']] = message.id
+                break
+        return True
+    
+    async def _op_send_message(self, operation):
+        data = operation.data
+        if data.get('unless_found') and data['channel'] in self.found_messages:
+            return False
+        if data['channel'] in self.sent_messages:
+            return False
+        channel = self.resolve_channel(data['channel'])
+        if not channel:
+            return False
+        embed = PLAN_EMBED_BUILDERS[data['embed']](**data.get('args', {}))
+        message = await channel.send(embed=embed)
+        self.sent_messages[data['channel']] = message.id
+        return True
+    
+    def planned_vs_actual(self, step=None) -> str:
+        """Describe planned against actual API calls per bucket"""
+        planned = self.plan.calls_by_bucket(step)
+        lines = []
+        for bucket in sorted(set(planned) | set(self.calls)):
+            line = f"• `{bucket}`: {self.calls.get(bucket, 0)}/{planned.get(bucket, 0)} calls"
+            if self.failures.get(bucket):
+                line += f" ({self.failures[bucket]} failed)"
+            lines.append(line)
+        lines.append(f"• Time: {format_duration(self.elapsed)} (estimated {format_duration(self.plan.estimate_seconds(step))})")
+        return "\n".join(lines)
+
+async def edit_channel_positions(guild, payload):
+    """Move many channels at once (PATCH /guilds/{guild_id}/channels)
+    
+    discord.py only exposes per-channel moves, so this goes through the
+    HTTP client directly to keep a whole layout change to one request.
+    """
+    await guild._state.http.bulk_channel_update(guild.id, payload, reason="Template layout")
+
+class TemplateJobJournal:
+    """Persisted checkpoint journal for a template application job"""
+    
+    def __init__(self, guild_id, state):
+        self.guild_id = str(guild_id)
+        self.state = state
+        self.completed = set(state.get("completed", []))
+    
+    @classmethod
+    def start(cls, guild_id, template_name, plan: OperationPlan, user_id, snapshot=None):
+        journal = cls(guild_id, {
+            "template": template_name,
+            "user_id": user_id,
+            "snapshot": snapshot,
+            "status": "running",
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            "plan": plan.to_dict(),
+            "completed": [],
+            "created": {"roles": {}, "categories": {}, "channels": {}, "messages": {}}
+        })
+        journal.save()
+        return journal
+    
+    @classmethod
+    def load(cls, guild_id):
+        state = data_manager.get_template_jobs().get(str(guild_id))
+        return cls(guild_id, state) if state else None
+    
+    @property
+    def plan(self) -> OperationPlan:
+        return OperationPlan.from_dict(self.state["plan"])
+    
+    def is_done(self, index):
+        return index in self.completed
+    
+    def step_done(self, step, plan: OperationPlan):
+        return all(self.is_done(op.index) for op in plan.operations_for(step))
+    
+    def checkpoint(self, index, executor):
+        """Record a finished operation and every object created so far"""
+        self.completed.add(index)
+        self.state["completed"] = sorted(self.completed)
+        self.state["created"] = {
+            "roles": {key: role.id for key, role in executor.roles.items()},
+            "categories": {key: category.id for key, category in executor.categories.items()},
+            "channels": {key: channel.id for key, channel in executor.channels.items()},
+            "messages": dict(executor.sent_messages)
+        }
+        self.save()
+    
+    def restore(self, executor):
+        """Re-attach objects created before a restart to an executor"""
+        created = self.state.get("created", {})
+        guild = executor.guild
+        for key, role_id in created.get("roles", {}).items():
+            role = guild.get_role(role_id)
+            if role:
+                executor.roles[key] = role
+        for key, channel_id in created.get("categories", {}).items():
+            category = guild.get_channel(channel_id)
+            if category:
+                executor.categories[key] = category
+        for key, channel_id in created.get("channels", {}).items():
+            channel = guild.get_channel(channel_id)
+            if channel:
+                executor.channels[key] = channel
+        executor.sent_messages.update(created.get("messages", {}))
+    
+    def finish(self, status="completed"):
+        if status == "completed":
+            data_manager.remove_template_job(self.guild_id)
+        else:
+            self.state["status"] = status
+            self.save()
+    
+    def save(self):
+        data_manager.set_template_job(self.guild_id, self.state)
+
+async def delete_all_channels(guild, progress: ProgressReporter = None, token: CancellationToken = None):
+    """Delete ALL existing channels in the server"""
+    try:
+        plan = template_planner.plan_channel_teardown(OperationPlan("teardown"), guild)
+        if progress:
+            progress.total += len(plan.operations)
+        await PlanExecutor(guild, plan, progress=progress, token=token).run()
+        return True
+    except JobCancelled:
+        raise
+    except Exception as e:
+        print(f"Error in delete_all_channels: {e}")
+        return False
+
+async def delete_template_roles(guild, progress: ProgressReporter = None, token: CancellationToken = None):
+    """Delete template-specific roles to prevent role accumulation"""
+    try:
+        plan = template_planner.plan_role_teardown(OperationPlan("teardown"), guild, bot.template_system.role_names)
+        if progress:
+            progress.total += len(plan.operations)
+        executor = PlanExecutor(guild, plan, progress=progress, token=token)
+        await executor.run()
+        print(f"Deleted {executor.calls.get('role_delete', 0) - executor.failures.get('role_delete', 0)} template-specific roles")
         return True
+    except JobCancelled:
+        raise
     except Exception as e:
         print(f"Error in delete_template_roles: {e}")
         return False
@@ -1760,7 +4357,7 @@ async def templates(interaction: discord.Interaction):
         color=0x7289da
     )
     
-    templates = bot.template_system.templates
+    templates = bot.template_system.templates_for(interaction.guild.id)
     for template_id, template in templates.items():
         embed.add_field(
             name=f"{template['name']}",
@@ -1769,7 +4366,7 @@ async def templates(interaction: discord.Interaction):
         )
     
     embed.set_footer(text="React with 🎮, 🎵, or 👥 to select a template")
-    view = TemplateSelectView(bot)
+    view = TemplateSelectView(bot, interaction.guild.id)
     
     await interaction.response.send_message(embed=embed, view=view, ephemeral=True)
     
@@ -1784,8 +4381,11 @@ async def templates(interaction: discord.Interaction):
         pass
 
 @bot.tree.command(name="apply", description="Apply a template to the server (WILL DELETE ALL EXISTING CHANNELS)")
-@discord.app_commands.describe(template_name="The template to apply: gaming, music, friends, bloxfruits, or youtube")
-async def apply(interaction: discord.Interaction, template_name: str = None):
+@discord.app_commands.describe(
+    template_name="The template to apply: gaming, music, friends, bloxfruits, or youtube",
+    dry_run="Only show the planned operations, API calls and estimated time (nothing is changed)"
+)
+async def apply(interaction: discord.Interaction, template_name: str = None, dry_run: bool = False):
     """Apply a template to the server (WILL DELETE ALL EXISTING CHANNELS)"""
     
     # Check if user is server owner
@@ -1798,13 +4398,23 @@ async def apply(interaction: discord.Interaction, template_name: str = None):
         return
         
     template_name = template_name.lower()
-    templates = bot.template_system.templates
+    templates = bot.template_system.templates_for(interaction.guild.id)
     
     if template_name not in templates:
         await interaction.response.send_message("❌ Invalid template. Use `/templates` to see available options.", ephemeral=True)
         return
         
     template = templates[template_name]
+    plan = template_planner.plan_template(interaction.guild, template_name, template)
+    
+    running = job_manager.busy(interaction.guild.id)
+    if not dry_run and running:
+        await interaction.response.send_message(f"❌ Job `{running.id}` ({running.description}) is already running on this server. Use `/jobs` to check on it.", ephemeral=True)
+        return
+    
+    if dry_run:
+        await interaction.response.send_message(embed=build_dry_run_embed(template, plan), ephemeral=True)
+        return
     
     # WARNING embed - this is destructive!
     embed = discord.Embed(
@@ -1813,317 +4423,117 @@ async def apply(interaction: discord.Interaction, template_name: str = None):
         color=0xff0000
     )
     embed.add_field(
-        name="🚨 WARNING", 
+        name="🚨 WARNING",
         value="• All current channels will be PERMANENTLY deleted\n• All categories will be removed\n• Only roles and members will be preserved\n• This action cannot be undone!",
         inline=False
     )
     embed.add_field(name="New Template Includes", value=f"• {len(template['roles'])} Roles\n• {len(template['categories'])} Categories\n• Multiple new channels", inline=False)
-    embed.add_field(name="Estimated Time", value="60-90 seconds", inline=True)
+    embed.add_field(name="Estimated Time", value=f"~{format_duration(plan.estimate_seconds())} ({plan.total_calls()} API calls)", inline=True)
+    
+    # Since we can't use buttons with slash commands in this context, we'll proceed directly
+    job = job_manager.start(
+        interaction.guild.id, "apply", f"Apply {template_name} template",
+        lambda job: setup_template(interaction, template_name, template, plan, job),
+        interaction.user.id
+    )
+    embed.add_field(name="Job", value=f"`{job.id}` • `/jobs` for status, `/cancel {job.id}` to stop", inline=True)
     
     # Send the warning message
     await interaction.response.send_message(embed=embed, ephemeral=True)
+
+def build_dry_run_embed(template, plan: OperationPlan):
+    """Describe a template plan without executing it"""
+    embed = discord.Embed(
+        title=f"🧪 Dry Run: {template['name']}",
+        description="Nothing has been changed. This is what `/apply` would do right now.",
+        color=0x7289da
+    )
     
-    # Since we can't use buttons with slash commands in this context, we'll proceed directly
-    await setup_template(interaction, template_name, template)
+    step_lines = []
+    for step in plan.steps():
+        operations = plan.operations_for(step)
+        step_lines.append(f"• **{step}**: {len(operations)} operations, {plan.total_calls(step)} API calls (~{format_duration(plan.estimate_seconds(step))})")
+    embed.add_field(name="📋 Steps", value="\n".join(step_lines) or "Nothing to do", inline=False)
+    
+    bucket_lines = []
+    for bucket, calls in sorted(plan.calls_by_bucket().items()):
+        bucket_lines.append(f"• `{bucket}`: {calls}")
+    embed.add_field(name="📡 API Calls by Rate-Limit Bucket", value="\n".join(bucket_lines) or "None", inline=False)
+    
+    embed.add_field(name="⏱️ Estimated Time", value=format_duration(plan.estimate_seconds()), inline=True)
+    embed.add_field(name="🔢 Total API Calls", value=str(plan.total_calls()), inline=True)
+    embed.set_footer(text=f"Run /apply {plan.name} without dry_run to apply it")
+    return embed
 
-async def setup_template(interaction: discord.Interaction, template_name: str, template: dict):
+async def setup_template(interaction: discord.Interaction, template_name: str, template: dict, plan: OperationPlan = None, job: Job = None):
     """Main template setup function - DELETES ALL EXISTING CHANNELS FIRST"""
     
     guild = interaction.guild
+    if plan is None:
+        plan = template_planner.plan_template(guild, template_name, template)
     
+    # Keep a copy of the current layout so /restore can undo the teardown
+    snapshot_hash = None
     try:
-        # Send initial progress message to the first available channel
-        progress_channel = None
-        progress_msg = None
-        
-        # Try to find an existing channel for progress updates
-        for chan in guild.text_channels:
-            if chan.permissions_for(guild.me).send_messages:
-                progress_channel = chan
-                break
-        
-        # If no channel available, we'll send updates via DM until we can create channels
-        if not progress_channel:
-            try:
-                await interaction.user.send("🔄 **Starting DESTRUCTIVE template setup...** (0%) - Please check your server for progress updates.")
-            except:
-                pass  # Can't DM user
-        
-        # If we found a channel, send the initial progress message
-        if progress_channel:
-            try:
-                progress_msg = await progress_channel.send("🔄 **Starting DESTRUCTIVE template setup...** (0%)")
-            except:
-                pass
-        
-        # === STEP 1: DELETE ALL EXISTING CHANNELS (25%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🗑️ **DELETING ALL EXISTING CHANNELS...** (25%)")
-            except:
-                # If we can't edit the message, try to send a new one
-                try:
-                    progress_msg = await progress_channel.send("🗑️ **DELETING ALL EXISTING CHANNELS...** (25%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🗑️ **DELETING ALL EXISTING CHANNELS...** (25%)")
-            except:
-                pass
-        
-        # Delete all existing channels
-        deletion_success = await delete_all_channels(guild)
-        if not deletion_success:
-            error_msg = "❌ Failed to delete some existing channels. Setup cancelled."
-            if progress_msg:
-                try:
-                    await progress_msg.edit(content=error_msg)
-                except:
-                    # Try to send a new message
-                    try:
-                        if progress_channel:
-                            await progress_channel.send(error_msg)
-                    except:
-                        pass
-            # Send error message to user
-            try:
-                await interaction.user.send(error_msg)
-            except:
-                pass
-            return
-            
-        # Delete template-specific roles to prevent accumulation
-        await delete_template_roles(guild)
-        await asyncio.sleep(2)
-            
-        await asyncio.sleep(2)
-        
-        # After deletion, we need to create a new channel for progress updates
-        progress_channel = None
-        progress_msg = None
-        
-        # Create a temporary category and channel for progress updates
-        try:
-            temp_category = await guild.create_category("⚙️ Setup Progress")
-            progress_channel = await guild.create_text_channel("📋setup-progress", category=temp_category)
-        except Exception as e:
-            # If we can't create channels, continue with DM updates
-            try:
-                await interaction.user.send("🔄 **Creating temporary progress channel...** (30%)")
-            except:
-                pass
-        
-        # If we successfully created a progress channel, send update
-        if progress_channel:
-            try:
-                progress_msg = await progress_channel.send("🔄 **Creating temporary progress channel...** (30%)")
-            except:
-                pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Creating roles...** (50%)")
-            except:
-                pass
-        
-        # === STEP 2: Create Roles (50%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🔄 **Creating roles...** (50%)")
-            except:
-                # Try to send a new message
-                try:
-                    progress_msg = await progress_channel.send("🔄 **Creating roles...** (50%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Creating roles...** (50%)")
-            except:
-                pass
-                
-        role_mapping = {}
-        
-        for role_key, role_data in template['roles'].items():
-            try:
-                # Check if role already exists
-                existing_role = discord.utils.get(guild.roles, name=role_data['name'])
-                if existing_role:
-                    role_mapping[role_key] = existing_role
-                    continue
-                    
-                # Create new role
-                permissions = discord.Permissions()
-                for perm in role_data.get('permissions', []):
-                    setattr(permissions, perm, True)
-                    
-                new_role = await guild.create_role(
-                    name=role_data['name'],
-                    permissions=permissions,
-                    color=discord.Color(role_data.get('color', 0x000000)),
-                    hoist=True if role_key in ['owner', 'admin', 'moderator'] else False,
-                    mentionable=True if role_key in ['owner', 'admin'] else False
-                )
-                role_mapping[role_key] = new_role
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Role creation error: {e}")
-                continue
-        
-        # === STEP 3: Create Categories (75%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🔄 **Creating categories...** (75%)")
-            except:
-                # Try to send a new message
-                try:
-                    progress_msg = await progress_channel.send("🔄 **Creating categories...** (75%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Creating categories...** (75%)")
-            except:
-                pass
-                
-        category_mapping = {}
-        
-        for cat_key, cat_data in template['categories'].items():
-            try:
-                new_category = await guild.create_category(
-                    name=cat_data['name'],
-                    position=cat_data.get('position', 0)
-                )
-                category_mapping[cat_key] = new_category
-                await asyncio.sleep(0.5)
-                
-            except Exception as e:
-                print(f"Category creation error: {e}")
-                continue
-        
-        # === STEP 4: Create Channels (90%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🔄 **Creating channels...** (90%)")
-            except:
-                # Try to send a new message
-                try:
-                    progress_msg = await progress_channel.send("🔄 **Creating channels...** (90%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Creating channels...** (90%)")
-            except:
-                pass
-        
-        channel_count = 0
-        for cat_key, channels in template['channels'].items():
-            if cat_key not in category_mapping:
-                continue
-                
-            category = category_mapping[cat_key]
-            
-            for channel_data in channels:
-                try:
-                    if channel_data['type'] == 'text':
-                        new_channel = await guild.create_text_channel(
-                            name=channel_data['name'],
-                            category=category,
-                            topic=channel_data.get('topic', '')
-                        )
-                    elif channel_data['type'] == 'voice':
-                        new_channel = await guild.create_voice_channel(
-                            name=channel_data['name'],
-                            category=category
-                        )
-                    elif channel_data['type'] == 'stage':
-                        new_channel = await guild.create_stage_channel(
-                            name=channel_data['name'],
-                            category=category
-                        )
-                    
-                    channel_count += 1
-                    await asyncio.sleep(0.5)
-                    
-                except Exception as e:
-                    print(f"Channel creation error: {e}")
-                    continue
-        
-        # === STEP 5: Setup New Features (95%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🔄 **Setting up additional features...** (95%)")
-            except:
-                # Try to send a new message
-                try:
-                    progress_msg = await progress_channel.send("🔄 **Setting up additional features...** (95%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Setting up additional features...** (95%)")
-            except:
-                pass
-        
-        # Get owner role
-        owner_role = discord.utils.get(guild.roles, name="👑 Owner")
-        if not owner_role:
-            owner_role = discord.utils.get(guild.roles, name="Owner")
+        snapshot_hash, _ = bot.template_system.backup_snapshots.save(guild, f"before /apply {template_name}")
+    except Exception as e:
+        print(f"Snapshot before apply failed for {guild.name}: {e}")
+    
+    journal = TemplateJobJournal.start(guild.id, template_name, plan, interaction.user.id, snapshot_hash)
+    await run_template_job(guild, interaction.user, template_name, template, journal, interaction, job)
+
+async def run_template_job(guild, user, template_name: str, template: dict, journal: TemplateJobJournal,
+                           interaction: discord.Interaction = None, job: Job = None):
+    """Run (or resume) a checkpointed template application"""
+    
+    plan = journal.plan
+    progress = ProgressReporter(
+        "🔄 Starting DESTRUCTIVE template setup...",
+        total=len(plan.operations),
+        interaction=interaction,
+        user=user,
+        estimate=plan.estimate_seconds()
+    )
+    executor = PlanExecutor(guild, plan, journal, progress, job.token if job else None)
+    journal.restore(executor)
+    if job:
+        job.progress = progress
+    
+    try:
+        # Find an existing channel for progress updates (a resumed job reuses its own)
+        progress.channel = executor.channels.get("setup_progress")
+        if not progress.channel and not journal.step_done("teardown_channels", plan):
+            for chan in guild.text_channels:
+                if chan.permissions_for(guild.me).send_messages:
+                    progress.channel = chan
+                    break
         
-        # Get staff roles (only from roles that were actually created)
-        staff_roles = []
-        staff_role_names = ["👑 Owner", "⚡ Head Admin", "🔧 Admin", "🛡️ Moderator", "Owner", "Admin", "Moderator"]
-        for role_key, role_data in template['roles'].items():
-            if role_data['name'] in staff_role_names:
-                if role_key in role_mapping:
-                    staff_roles.append(role_mapping[role_key])
+        # Without a channel the reporter falls back to an ephemeral followup or a DM
+        await progress.start(completed=len(journal.completed))
         
-        # Setup new features
-        await setup_rules_channel(guild, template_name, owner_role)
-        await setup_staff_channel(guild, staff_roles)
+        for step in plan.steps():
+            await progress.set_stage(TEMPLATE_STEP_LABELS.get(step, step))
+            await executor.run(step)
+            executor.check_teardown(step)
         
-        # Set up basic permissions
-        try:
-            staff_category = category_mapping.get('staff')
-            if staff_category:
-                await staff_category.set_permissions(guild.default_role, view_channel=False)
-                
-            if staff_category and role_mapping.get('moderator'):
-                await staff_category.set_permissions(role_mapping['moderator'], view_channel=True)
-                
-        except Exception as e:
-            print(f"Permission error: {e}")
+            # Old channels are gone after the teardown, so report in the temporary progress channel
+            if step == "progress" and executor.channels.get("setup_progress"):
+                await progress.move_to(executor.channels["setup_progress"])
         
         # Set up default welcome message based on template
         welcome_message = welcome_system.get_default_welcome(template_name)
         data_manager.set_welcome_message(guild.id, welcome_message)
         
-        # === STEP 6: Final Setup (100%) ===
-        if progress_msg:
-            try:
-                await progress_msg.edit(content="🔄 **Finalizing setup...** (100%)")
-            except:
-                # Try to send a new message
-                try:
-                    progress_msg = await progress_channel.send("🔄 **Finalizing setup...** (100%)")
-                except:
-                    pass
-        else:
-            # Send update via DM
-            try:
-                await interaction.user.send("🔄 **Finalizing setup...** (100%)")
-            except:
-                pass
+        # Track the posted rules so /editrules can edit them in place
+        if executor.channels.get("rules") and executor.sent_messages.get("rules"):
+            rules_store.adopt_template(guild.id, executor.channels["rules"].id, executor.sent_messages["rules"], RulesSystem().default_rules.get(template_name, []))
+        journal.finish()
         
         # === COMPLETION MESSAGE ===
+        role_count = len([key for key in executor.roles if key in template['roles']])
+        category_count = len([key for key in executor.categories if key in template['categories']])
+        channel_count = executor.step_counts.get("channels", 0)
+        
         completion_embed = discord.Embed(
             title=f"✅ {template['name']} Setup Complete!",
             description=f"Server has been completely transformed with the {template['name']} template.",
@@ -2133,7 +4543,13 @@ async def setup_template(interaction: discord.Interaction, template_name: str, t
         
         completion_embed.add_field(
             name="📊 Setup Summary",
-            value=f"• All old channels deleted\n• {len(role_mapping)} roles configured\n• {len(category_mapping)} categories created\n• {channel_count} channels created",
+            value=f"• All old channels deleted\n• {role_count} roles configured\n• {category_count} categories created\n• {channel_count} channels created",
+            inline=False
+        )
+        
+        completion_embed.add_field(
+            name="📐 Planned vs Actual",
+            value=executor.planned_vs_actual(),
             inline=False
         )
         
@@ -2149,32 +4565,17 @@ async def setup_template(interaction: discord.Interaction, template_name: str, t
             inline=False
         )
         
-        completion_embed.set_footer(text=f"Template applied by {interaction.user}", icon_url=interaction.user.avatar.url if interaction.user.avatar else None)
+        if journal.state.get("snapshot"):
+            completion_embed.add_field(
+                name="💾 Backup",
+                value=f"The previous layout was saved as `{journal.state['snapshot'][:12]}`. Use `/restore {journal.state['snapshot'][:12]}` to bring it back.",
+                inline=False
+            )
         
-        # Send completion message
-        success_sent = False
-        if progress_msg:
-            try:
-                await progress_msg.edit(content=None, embed=completion_embed)
-                success_sent = True
-            except:
-                # Try to send a new message
-                try:
-                    await progress_channel.send(embed=completion_embed)
-                    success_sent = True
-                except:
-                    pass
+        completion_embed.set_footer(text=f"Template applied by {user}", icon_url=user.avatar.url if user.avatar else None)
         
-        # If we couldn't send to the progress channel, try DM
-        if not success_sent:
-            try:
-                await interaction.user.send(embed=completion_embed)
-                success_sent = True
-            except:
-                pass
-                
-        # Final fallback - try to send to any available channel
-        if not success_sent:
+        # Send completion message, final fallback is any available channel
+        if not await progress.finish(embed=completion_embed):
             try:
                 for chan in guild.text_channels:
                     if chan.permissions_for(guild.me).send_messages:
@@ -2183,17 +4584,25 @@ async def setup_template(interaction: discord.Interaction, template_name: str, t
             except:
                 pass
                 
+    except JobCancelled:
+        # Stopped by /cancel: keep the journal for reference, but don't resume it
+        journal.finish("cancelled")
+        cancel_embed = discord.Embed(
+            title="🛑 Template Setup Cancelled",
+            description=f"Stopped after {len(journal.completed)}/{len(plan.operations)} operations. Use `/restore` to bring back the previous layout.",
+            color=0xffa500
+        )
+        await progress.finish(embed=cancel_embed)
+        raise
     except Exception as e:
         # Handle errors
+        journal.finish("failed")
         error_embed = discord.Embed(
             title="❌ Template Setup Failed",
             description=f"An error occurred during setup: {str(e)}",
             color=0xff0000
         )
-        # Try to send error message to user via DM
-        try:
-            await interaction.user.send(embed=error_embed)
-        except:
+        if not await progress.finish(embed=error_embed):
             # Try to send to any available channel
             try:
                 for chan in guild.text_channels:
@@ -2202,6 +4611,7 @@ async def setup_template(interaction: discord.Interaction, template_name: str, t
                         break
             except:
                 pass
+        raise
 
 @bot.tree.command(name="help", description="Show help menu")
 async def help_command(interaction: discord.Interaction):
@@ -2215,14 +4625,31 @@ async def help_command(interaction: discord.Interaction):
     commands_list = [
         ("`/templates`", "View available templates with interactive menu"),
         ("`/apply <template>`", "🚨 APPLY TEMPLATE (deletes all existing channels)"),
-        ("`/quote [message_link] [reply_text]`", "🎨 Create beautiful quotes from message links"),
+        ("`/apply <template> dry_run:True`", "🧪 Preview the plan, API calls and estimated time without changing anything"),
+        ("`/restore [snapshot]`", "💾 List layout snapshots, or rebuild the server from one"),
+        ("`/capture <template_id>`", "📦 Save this server's layout as a template for /apply"),
+        ("`/jobs`", "🧵 Show background jobs (template apply, restore, milestone roles)"),
+        ("`/cancel <job_id>`", "🛑 Cancel a running background job"),
+        ("`/reactionrole [message_link] [emoji] [role]`", "🎭 Bind a reaction on a message to a role (no arguments lists bindings)"),
+        ("`/tempvoice <category>`", "🎤 Set up join-to-create voice rooms (`disable:True` removes them)"),
+        ("`/quote [message_link] [reply_text] [image]`", "🎨 Create beautiful quotes from message links (up to 10 links or `first..last`; `image:True` renders cards)"),
         ("`/announce <message>`", "Make announcements in announcements channel"),
+        ("`/schedule <message> <when> [repeat]`", "📅 Schedule a one-off or recurring announcement"),
+        ("`/scheduled [cancel]`", "📅 List or cancel scheduled announcements"),
+        ("`/broadcasts <enabled>`", "📡 Opt this server in or out of bot-wide announcements"),
+        ("`/broadcast <message>`", "📡 Announce in every opted-in server with a delivery report (Bot owner only)"),
         ("`/welcome <message>`", "Set custom welcome message"),
         ("`/editrules <rules>`", "Edit server rules (Owner only)"),
+        ("`/rulesversions [rollback]`", "List or restore earlier rules (Owner only)"),
+        ("`/rulesmirror <channel> [remove]`", "Keep the rules in another channel in sync (Owner only)"),
         ("`!lock <#channel>`", "🔒 Lock a channel to prevent messages"),
         ("`!unlock <#channel>`", "🔓 Unlock a locked channel"),
+        ("`!lockdown [category]`", "🚨 Lock every visible channel in the server or a category"),
+        ("`!endlockdown`", "✅ Lift the lockdown, restoring each channel's previous permissions"),
         ("`/sync`", "Sync commands manually (if not showing)"),
         ("`/global_sync`", "Force global command sync (Owner only)"),
+        ("`/reloadtemplates`", "Reload template packs from disk (Bot owner only)"),
+        ("`/diag`", "🩺 Event loop lag and the code blocking it (Bot owner only)"),
         ("`/help`", "Show this help menu")
     ]
     
@@ -2289,8 +4716,545 @@ async def global_sync(interaction: discord.Interaction):
     except Exception as e:
         await interaction.edit_original_response(content=f"❌ Global sync failed: {e}")
 
+@bot.tree.command(name="reloadtemplates", description="Reload template packs from disk (Bot owner only)")
+async def reload_templates(interaction: discord.Interaction):
+    """Recompile template packs without restarting the bot"""
+    # Check if user is bot owner
+    app_info = await bot.application_info()
+    if interaction.user.id != app_info.owner.id:
+        await interaction.response.send_message("❌ Only bot owner can use this command.", ephemeral=True)
+        return
+    
+    count, errors = bot.template_system.reload()
+    message = f"✅ Loaded {count} templates ({bot.template_system.compiler.cache_hits} from cache)."
+    if errors:
+        message += "\n⚠️ Skipped invalid packs:\n" + "\n".join(f"• {error}" for error in errors[:10])
+    await interaction.response.send_message(message, ephemeral=True)
+
+@bot.tree.command(name="diag", description="Show event loop lag and the code blocking it (Bot owner only)")
+async def diag(interaction: discord.Interaction):
+    """Event loop health: lag percentiles and the worst blocking subsystems"""
+    app_info = await bot.application_info()
+    if interaction.user.id != app_info.owner.id:
+        await interaction.response.send_message("❌ Only bot owner can use this command.", ephemeral=True)
+        return
+    
+    embed = discord.Embed(
+        title="🩺 Event Loop Diagnostics",
+        description=f"Stalls longer than {loop_monitor.threshold * 1000:.0f}ms are recorded with the stack that was running.",
+        color=0x7289da
+    )
+    embed.add_field(
+        name="⏱️ Loop Lag (last minute)",
+        value=(f"p50 {loop_monitor.lag_percentile(0.5) * 1000:.1f}ms • p99 {loop_monitor.lag_percentile(0.99) * 1000:.1f}ms\n"
+               f"Max since start {loop_monitor.max_lag * 1000:.0f}ms • Gateway latency {bot.latency * 1000:.0f}ms"),
+        inline=False
+    )
+    
+    offenders = loop_monitor.worst_offenders()
+    lines = [
+        f"• **{subsystem}**: {offender['count']}x, worst {offender['worst'] * 1000:.0f}ms, "
+        f"avg {offender['total'] / offender['count'] * 1000:.0f}ms\n  `{offender['where']}`"
+        for subsystem, offender in offenders
+    ]
+    embed.add_field(name="🐢 Worst Offenders", value="\n".join(lines)[:1024] or "Nothing has blocked the loop yet", inline=False)
+    if offenders:
+        stack = offenders[0][1]["stack"]
+        embed.add_field(name=f"📚 Stack of worst stall ({offenders[0][0]})", value=f"```\n{stack[-1000:]}\n```", inline=False)
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="capture", description="Save this server's layout as a reusable template")
+@discord.app_commands.describe(
+    template_id="Name to use with /apply (lowercase letters, numbers, - and _)",
+    name="Display name of the template",
+    description="Description shown in /templates"
+)
+async def capture(interaction: discord.Interaction, template_id: str, name: str = None, description: str = None):
+    """Capture the server's roles, categories and channels into a template pack"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    template_id = template_id.lower()
+    if not re.fullmatch(r"[a-z0-9_-]{1,32}", template_id):
+        await interaction.response.send_message("❌ Template names can only use lowercase letters, numbers, `-` and `_` (max 32).", ephemeral=True)
+        return
+    
+    # Captured packs are private to the guild they came from
+    guild_pack_dir = os.path.join(TEMPLATE_CAPTURE_DIR, str(interaction.guild.id))
+    path = os.path.join(guild_pack_dir, f"{template_id}.json")
+    if template_id in bot.template_system.templates_for(interaction.guild.id) or os.path.exists(path):
+        await interaction.response.send_message(f"❌ A template called `{template_id}` already exists.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True, thinking=True)
+    guild = interaction.guild
+    
+    # Write to the staging directory first so a half-written pack is never loaded
+    os.makedirs(TEMPLATE_STAGING_DIR, exist_ok=True)
+    staging_path = os.path.join(TEMPLATE_STAGING_DIR, f"{guild.id}-{template_id}.json")
+    try:
+        started = time.monotonic()
+        counts = await capture_template_pack(
+            guild, staging_path,
+            name or f"📦 {guild.name}",
+            description or f"Captured from {guild.name}"
+        )
+        bot.template_system.compiler.compile_file(staging_path, use_cache=False)  # Validate before publishing
+        os.makedirs(guild_pack_dir, exist_ok=True)
+        os.replace(staging_path, path)
+        bot.template_system.reload()
+    except (OSError, TemplatePackError) as e:
+        try:
+            os.remove(staging_path)
+        except OSError:
+            pass
+        await interaction.followup.send(f"❌ Could not capture this server: {e}", ephemeral=True)
+        return
+    
+    await interaction.followup.send(
+        f"✅ Captured **{guild.name}** as `{template_id}` in {format_duration(time.monotonic() - started)}: "
+        f"{counts['roles']} roles, {counts['categories']} categories, {counts['channels']} channels.\n"
+        f"Use `/apply {template_id}` in this server to use it.",
+        ephemeral=True
+    )
+
+@bot.tree.command(name="restore", description="Restore the server layout from a snapshot (WILL DELETE ALL CURRENT CHANNELS)")
+@discord.app_commands.describe(snapshot="Snapshot ID from /restore (leave empty to list snapshots)")
+async def restore(interaction: discord.Interaction, snapshot: str = None):
+    """List snapshots, or rebuild the server from one"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    store = bot.template_system.backup_snapshots
+    guild = interaction.guild
+    
+    if not snapshot:
+        history = store.history(guild.id)
+        if not history:
+            await interaction.response.send_message("❌ No snapshots yet. One is taken before every `/apply` and by the daily auto-backup.", ephemeral=True)
+            return
+        embed = discord.Embed(title="💾 Server Snapshots", description="Use `/restore <id>` to rebuild the server from one of these.", color=0x7289da)
+        for entry in history:
+            embed.add_field(
+                name=f"`{entry['hash'][:12]}` • {entry['reason']}",
+                value=f"{entry['taken_at'][:16].replace('T', ' ')} UTC • {entry['roles']} roles, {entry['categories']} categories, {entry['channels']} channels",
+                inline=False
+            )
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    entry = store.find(guild.id, snapshot)
+    if not entry:
+        await interaction.response.send_message("❌ Snapshot not found. Use `/restore` to list snapshots.", ephemeral=True)
+        return
+    
+    running = job_manager.busy(guild.id)
+    if running:
+        await interaction.response.send_message(f"❌ Job `{running.id}` ({running.description}) is already running on this server. Use `/jobs` to check on it.", ephemeral=True)
+        return
+    
+    try:
+        structure = store.load(entry["hash"])
+    except Exception as e:
+        await interaction.response.send_message(f"❌ Could not read snapshot: {e}", ephemeral=True)
+        return
+    
+    plan = template_planner.plan_restore(guild, structure)
+    job = job_manager.start(
+        guild.id, "restore", f"Restore snapshot {entry['hash'][:12]}",
+        lambda job: run_restore(interaction, entry, plan, job),
+        interaction.user.id
+    )
+    await interaction.response.send_message(
+        f"⚠️ Restoring snapshot `{entry['hash'][:12]}` ({entry['reason']}) as job `{job.id}`. All current channels will be replaced. ~{format_duration(plan.estimate_seconds())} ({plan.total_calls()} API calls)",
+        ephemeral=True
+    )
+
+async def run_restore(interaction: discord.Interaction, entry, plan: OperationPlan, job: Job):
+    """Rebuild a guild from a snapshot plan with the template executor"""
+    guild = interaction.guild
+    try:
+        # The current layout is snapshotted too, so a restore can be undone
+        bot.template_system.backup_snapshots.save(guild, "before /restore")
+        
+        # Every channel is deleted first, so progress goes to an ephemeral followup
+        progress = ProgressReporter("♻️ Restoring snapshot...", total=len(plan.operations), interaction=interaction,
+                                    user=interaction.user, estimate=plan.estimate_seconds())
+        executor = PlanExecutor(guild, plan, progress=progress, token=job.token)
+        job.progress = progress
+        await progress.start()
+        for step in plan.steps():
+            await progress.set_stage(TEMPLATE_STEP_LABELS.get(step, step))
+            await executor.run(step)
+            executor.check_teardown(step)
+        
+        embed = discord.Embed(
+            title="✅ Snapshot Restored",
+            description=f"Rebuilt {len(executor.categories)} categories and {len(executor.channels)} channels from `{entry['hash'][:12]}`.",
+            color=0x00ff00,
+            timestamp=datetime.datetime.now(datetime.timezone.utc)
+        )
+        embed.add_field(name="📐 Planned vs Actual", value=executor.planned_vs_actual(), inline=False)
+        await progress.finish(embed=embed)
+    except JobCancelled:
+        try:
+            await interaction.followup.send("🛑 Restore cancelled. The layout before the restore was snapshotted, see `/restore`.", ephemeral=True)
+        except:
+            pass
+        raise
+    except Exception as e:
+        print(f"Restore error in {guild.name}: {e}")
+        try:
+            await interaction.followup.send(f"❌ Restore failed: {e}", ephemeral=True)
+        except:
+            pass
+        raise
+
+@bot.tree.command(name="jobs", description="Show background jobs running on this server")
+async def jobs(interaction: discord.Interaction):
+    """List this server's background jobs"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    guild_jobs = job_manager.for_guild(interaction.guild.id)
+    embed = discord.Embed(title="🧵 Background Jobs", color=0x7289da)
+    running = [job for job in guild_jobs if not job.done]
+    finished = [job for job in guild_jobs if job.done]
+    if running:
+        embed.add_field(name="▶️ Running", value="\n".join(job.summary() for job in running)[:1024], inline=False)
+    if finished:
+        embed.add_field(name="📜 Recent", value="\n".join(job.summary() for job in finished[:10])[:1024], inline=False)
+    if not guild_jobs:
+        embed.description = "📭 No background jobs have run on this server since the bot started."
+    
+    # Shared outbound queue, across all servers
+    queue_lines = [
+        f"• `{stat['priority']}`: {stat['depth']} queued, wait avg {stat['avg_wait'] * 1000:.0f}ms / p95 {stat['p95_wait'] * 1000:.0f}ms"
+        for stat in outbound.stats()
+    ]
+    embed.add_field(name="📡 Outbound Queue", value="\n".join(queue_lines), inline=False)
+    embed.set_footer(text="Use /cancel <job id> to stop a running job")
+    await interaction.response.send_message(embed=embed, ephemeral=True)
+
+@bot.tree.command(name="cancel", description="Cancel a running background job")
+@discord.app_commands.describe(job_id="Job ID from /jobs")
+async def cancel(interaction: discord.Interaction, job_id: str):
+    """Stop a background job at its next checkpoint"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    job = job_manager.cancel(interaction.guild.id, job_id.strip("`# "), interaction.user)
+    if not job:
+        await interaction.response.send_message("❌ No running job with that ID on this server. Use `/jobs` to list them.", ephemeral=True)
+        return
+    await interaction.response.send_message(f"🛑 Cancelling job `{job.id}` ({job.description}). It will stop after the operation in progress.", ephemeral=True)
+
+# === REACTION ROLE COMMAND ===
+
+@bot.tree.command(name="reactionrole", description="Give a role to members who react to a message")
+@discord.app_commands.describe(
+    message_link="Link to the message (right-click → Copy Message Link); leave empty to list bindings",
+    emoji="The reaction emoji",
+    role="The role to give (leave empty with remove to clear the emoji)",
+    remove="Remove the binding instead of adding it"
+)
+async def reactionrole(interaction: discord.Interaction, message_link: str = None, emoji: str = None, role: discord.Role = None, remove: bool = False):
+    """Bind a reaction on a message to a role"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    if not message_link:
+        lines = []
+        for message_id, entry in reaction_role_system.bindings_for_guild(interaction.guild.id).items():
+            link = f"https://discord.com/channels/{interaction.guild.id}/{entry['channel_id']}/{message_id}"
+            for key, role_id in entry["roles"].items():
+                shown = str(bot.get_emoji(int(key)) or key) if key.isdigit() else key
+                lines.append(f"{shown} → <@&{role_id}> on {link}")
+        await interaction.response.send_message("\n".join(lines)[:2000] or "No reaction roles on this server. Use `/reactionrole <message_link> <emoji> <role>`.", ephemeral=True)
+        return
+    
+    try:
+        parts = message_link.strip().split('/')
+        message_id = int(parts[-1])
+        channel = interaction.guild.get_channel(int(parts[-2]))
+        if not channel:
+            raise ValueError("channel not in this server")
+    except (ValueError, IndexError):
+        await interaction.response.send_message("❌ Invalid message link! Use 'Copy Message Link' on a message in this server.", ephemeral=True)
+        return
+    
+    if remove:
+        # The link's message ID could belong to another server; only touch this channel's bindings
+        entry = reaction_role_system.binding(message_id)
+        if (not entry or entry.get("guild_id") != interaction.guild.id or entry.get("channel_id") != channel.id
+                or not reaction_role_system.unbind(message_id, emoji)):
+            await interaction.response.send_message("❌ No matching reaction role on that message.", ephemeral=True)
+            return
+        await interaction.response.send_message(f"✅ Removed reaction role{'' if emoji else 's'} from that message.", ephemeral=True)
+        return
+    
+    if not emoji or not role:
+        await interaction.response.send_message("❌ Please give both an emoji and a role.", ephemeral=True)
+        return
+    if role >= interaction.guild.me.top_role or role.managed:
+        await interaction.response.send_message("❌ I can't assign that role. Move my role above it first.", ephemeral=True)
+        return
+    
+    partial = discord.PartialEmoji.from_str(emoji.strip())
+    try:
+        message = await channel.fetch_message(message_id)
+        await message.add_reaction(partial)
+    except discord.NotFound:
+        await interaction.response.send_message("❌ Message not found!", ephemeral=True)
+        return
+    except discord.HTTPException:
+        await interaction.response.send_message("❌ I couldn't react with that emoji. Use a standard emoji or one from this server.", ephemeral=True)
+        return
+    
+    reaction_role_system.bind(interaction.guild.id, channel.id, message_id, partial, role.id)
+    await interaction.response.send_message(f"✅ Reacting with {emoji} on that message now gives {role.mention}.", ephemeral=True)
+
+# === TEMP VOICE COMMAND ===
+
+@bot.tree.command(name="tempvoice", description="Set up join-to-create temporary voice rooms")
+@discord.app_commands.describe(
+    category="Category for the creator channel and the rooms",
+    disable="Remove the creator channel and all empty rooms"
+)
+async def tempvoice(interaction: discord.Interaction, category: discord.CategoryChannel = None, disable: bool = False):
+    """Create the ➕ Create Voice channel and its pool of rooms"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    guild = interaction.guild
+    if disable:
+        if guild.id not in temp_voice_system.creator_channels:
+            await interaction.response.send_message("❌ Temp voice isn't set up on this server.", ephemeral=True)
+            return
+        await interaction.response.defer(ephemeral=True)
+        await temp_voice_system.disable(guild)
+        await interaction.followup.send("✅ Temp voice disabled.", ephemeral=True)
+        return
+    
+    if guild.id in temp_voice_system.creator_channels:
+        await interaction.response.send_message(f"❌ Temp voice is already set up in <#{temp_voice_system.creator_channels[guild.id]}>. Use `/tempvoice disable:True` first.", ephemeral=True)
+        return
+    if not category:
+        await interaction.response.send_message("❌ Please choose a category for the temp voice rooms.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    if await temp_voice_system.setup_temp_voice(guild, category.id):
+        await interaction.followup.send(f"✅ Join <#{temp_voice_system.creator_channels[guild.id]}> to get your own voice room. {TEMP_VOICE_POOL_SIZE} rooms are kept ready.", ephemeral=True)
+    else:
+        await interaction.followup.send("❌ Could not find that category.", ephemeral=True)
+
 # === ANNOUNCEMENT COMMAND ===
 
+# Names used by the templates, in order of preference
+ANNOUNCEMENT_CHANNEL_NAMES = ("announcements", "📢announcements", "🎯announcements", "📢yt-announcements")
+
+class AnnouncementChannels:
+    """Finds a guild's announcements channel in one pass and remembers it by guild ID"""
+    
+    def __init__(self):
+        self.cache = {}  # guild ID -> channel ID
+    
+    def resolve(self, guild):
+        channel = guild.get_channel(self.cache.get(guild.id, 0))
+        if channel:
+            return channel
+        found = {}
+        for channel in guild.text_channels:
+            if channel.name in ANNOUNCEMENT_CHANNEL_NAMES:
+                found.setdefault(channel.name, channel)
+        channel = next((found[name] for name in ANNOUNCEMENT_CHANNEL_NAMES if name in found), None)
+        if channel:
+            self.cache[guild.id] = channel.id
+        return channel
+    
+    def remember(self, channel):
+        self.cache[channel.guild.id] = channel.id
+
+announcement_channels = AnnouncementChannels()
+
+def build_announcement_embed(message, author_name, author_icon=None, title="📢 Server Announcement"):
+    embed = discord.Embed(
+        title=title,
+        description=message,
+        color=0xffd700,
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    embed.set_author(
+        name=author_name, 
+        icon_url=author_icon
+    )
+    embed.set_footer(text=f"Announcement by {author_name}")
+    return embed
+
+async def deliver_announcement(guild, embed, ping=False):
+    """Post an embed in a guild's announcements channel through the outbound scheduler
+    
+    Returns (status, seconds until delivered); nothing is created when the
+    guild has no announcements channel.
+    """
+    start = time.monotonic()
+    channel = announcement_channels.resolve(guild)
+    if not channel:
+        return "no announcements channel", 0.0
+    if not channel.permissions_for(guild.me).send_messages:
+        return "missing permissions", 0.0
+    try:
+        await outbound.submit(PRIORITY_BULK, guild.id, lambda: channel.send("@everyone" if ping else None, embed=embed))
+        return "delivered", time.monotonic() - start
+    except discord.Forbidden:
+        return "forbidden", time.monotonic() - start
+    except Exception as e:
+        return f"error: {e}", time.monotonic() - start
+
+ANNOUNCEMENT_SCHEDULE_LIMIT = 25  # Pending scheduled announcements per guild
+ANNOUNCEMENT_REPEATS = {"never": 0, "hourly": 3600, "daily": 86400, "weekly": 604800}
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+
+def parse_when(text, now=None):
+    """Epoch seconds for '30m', 'in 1d 2h' or an ISO date/time (UTC unless it has an offset)"""
+    now = time.time() if now is None else now
+    text = text.strip().lower()
+    if text.startswith("in "):
+        text = text[3:]
+    parts = re.findall(r"(\d+)\s*([smhdw])", text)
+    if parts and re.fullmatch(r"(\s*\d+\s*[smhdw])+\s*", text):
+        return now + sum(int(amount) * DURATION_UNITS[unit] for amount, unit in parts)
+    moment = datetime.datetime.fromisoformat(text.upper().replace(" UTC", ""))
+    if moment.tzinfo is None:
+        moment = moment.replace(tzinfo=datetime.timezone.utc)
+    return moment.timestamp()
+
+class AnnouncementScheduler:
+    """Scheduled and recurring announcements, persisted in bot_data.json
+    
+    Announcements are grouped by the second they are due; each occupied
+    second is one entry in a shared TimerQueue, so any number of pending
+    announcements costs one sleeping task. Everything due in the same
+    second is delivered together. On startup, announcements missed while
+    the bot was down are delivered once, and recurring ones continue from
+    their next future occurrence.
+    """
+    
+    def __init__(self):
+        self.timers = TimerQueue("announcement")
+        self.buckets = {}  # due second -> set of announcement IDs
+        self.started = False
+        self.delivered = 0
+    
+    def entries(self):
+        return data_manager.get_scheduled_announcements()
+    
+    def start(self):
+        if self.started:
+            return
+        self.started = True
+        now = time.time()
+        missed = []
+        for announcement_id, entry in self.entries().items():
+            if entry["next_run"] <= now:
+                missed.append(announcement_id)
+            else:
+                self.arm(announcement_id, entry["next_run"])
+        if missed:
+            print(f"📅 Catching up on {len(missed)} scheduled announcement(s) missed while offline")
+            asyncio.create_task(self.deliver(missed))
+    
+    def arm(self, announcement_id, next_run):
+        second = int(next_run)
+        bucket = self.buckets.setdefault(second, set())
+        bucket.add(announcement_id)
+        if len(bucket) == 1:
+            self.timers.schedule(second, max(0.0, second - time.time()), lambda: self.fire(second))
+    
+    def add(self, guild_id, message, next_run, interval, author, ping=False):
+        announcement_id = os.urandom(3).hex()
+        while announcement_id in self.entries():
+            announcement_id = os.urandom(3).hex()
+        self.entries()[announcement_id] = {
+            "guild_id": guild_id,
+            "message": message,
+            "next_run": next_run,
+            "interval": interval,
+            "ping": ping,
+            "author_name": author.display_name,
+            "author_icon": author.avatar.url if author.avatar else None
+        }
+        data_manager.save_data()
+        self.arm(announcement_id, next_run)
+        return announcement_id
+    
+    def remove(self, guild_id, announcement_id):
+        entry = self.entries().get(announcement_id)
+        if not entry or entry["guild_id"] != guild_id:
+            return False
+        del self.entries()[announcement_id]
+        data_manager.save_data()
+        second = int(entry["next_run"])
+        bucket = self.buckets.get(second)
+        if bucket is not None:
+            bucket.discard(announcement_id)
+            if not bucket:
+                del self.buckets[second]
+                self.timers.cancel(second)
+        return True
+    
+    def for_guild(self, guild_id):
+        return sorted(
+            ((announcement_id, entry) for announcement_id, entry in self.entries().items() if entry["guild_id"] == guild_id),
+            key=lambda item: item[1]["next_run"]
+        )
+    
+    async def fire(self, second):
+        await self.deliver(list(self.buckets.pop(second, ())))
+    
+    async def deliver(self, announcement_ids):
+        entries = self.entries()
+        due = [(announcement_id, entries[announcement_id]) for announcement_id in announcement_ids if announcement_id in entries]
+        
+        async def send(entry):
+            guild = bot.get_guild(entry["guild_id"])
+            if not guild:
+                return "guild unavailable", 0.0
+            embed = build_announcement_embed(entry["message"], entry["author_name"], entry["author_icon"])
+            return await deliver_announcement(guild, embed, entry["ping"])
+        
+        results = await asyncio.gather(*[send(entry) for _, entry in due])
+        now = time.time()
+        for (announcement_id, entry), (status, _) in zip(due, results):
+            if status == "delivered":
+                self.delivered += 1
+            else:
+                print(f"Scheduled announcement {announcement_id} in guild {entry['guild_id']} not delivered: {status}")
+            if entry["interval"]:
+                # Skip occurrences missed while offline instead of sending each of them
+                missed = max(0, math.floor((now - entry["next_run"]) / entry["interval"])) + 1
+                entry["next_run"] += missed * entry["interval"]
+                self.arm(announcement_id, entry["next_run"])
+            else:
+                del entries[announcement_id]
+        if due:
+            data_manager.save_data()
+
+announcement_scheduler = AnnouncementScheduler()
+
 @bot.tree.command(name="announce", description="Make an announcement in the announcements channel")
 @discord.app_commands.describe(message="Your announcement message")
 async def announce(interaction: discord.Interaction, message: str):
@@ -2302,16 +5266,7 @@ async def announce(interaction: discord.Interaction, message: str):
             return
     
         # Find announcements channel - check ALL possible names used in templates
-        announcements_channel = None
-        possible_names = [
-            "announcements", "📢announcements", "🎯announcements",
-            "📢yt-announcements"
-        ]
-        
-        for name in possible_names:
-            announcements_channel = discord.utils.get(interaction.guild.channels, name=name)
-            if announcements_channel:
-                break
+        announcements_channel = announcement_channels.resolve(interaction.guild)
         
         # If still not found, create it with template-appropriate naming
         if not announcements_channel:
@@ -2365,6 +5320,7 @@ async def announce(interaction: discord.Interaction, message: str):
                     category=category,
                     topic="Important server announcements"
                 )
+                announcement_channels.remember(announcements_channel)
                 
             except Exception as e:
                 await interaction.response.send_message(
@@ -2375,17 +5331,7 @@ async def announce(interaction: discord.Interaction, message: str):
                 return
         
         # Create announcement embed
-        embed = discord.Embed(
-            title="📢 Server Announcement",
-            description=message,
-            color=0xffd700,
-            timestamp=datetime.datetime.now(datetime.timezone.utc)
-        )
-        embed.set_author(
-            name=interaction.user.display_name, 
-            icon_url=interaction.user.avatar.url if interaction.user.avatar else None
-        )
-        embed.set_footer(text=f"Announcement by {interaction.user.display_name}")
+        embed = build_announcement_embed(message, interaction.user.display_name, interaction.user.avatar.url if interaction.user.avatar else None)
         
         try:
             # Try to send with @everyone ping first
@@ -2404,6 +5350,125 @@ async def announce(interaction: discord.Interaction, message: str):
         print(f"Error in announce command: {str(e)}")
         await interaction.response.send_message(f"❌ An error occurred: {str(e)}", ephemeral=True)
 
+@bot.tree.command(name="broadcast", description="Send an announcement to every server that opted in (Bot owner only)")
+@discord.app_commands.describe(
+    message="Your announcement message",
+    ping="Ping @everyone where the bot is allowed to"
+)
+async def broadcast(interaction: discord.Interaction, message: str, ping: bool = False):
+    """Deliver one announcement to all opted-in servers concurrently and report per server"""
+    # Check if user is bot owner
+    app_info = await bot.application_info()
+    if interaction.user.id != app_info.owner.id:
+        await interaction.response.send_message("❌ Only bot owner can use this command.", ephemeral=True)
+        return
+    
+    guilds = [guild for guild in bot.guilds if data_manager.get_server_config(guild.id).get("broadcasts")]
+    if not guilds:
+        await interaction.response.send_message("❌ No servers have opted in. Server owners can use `/broadcasts enabled:True`.", ephemeral=True)
+        return
+    await interaction.response.defer(ephemeral=True)
+    
+    embed = build_announcement_embed(message, interaction.user.display_name, interaction.user.avatar.url if interaction.user.avatar else None, title="📢 Announcement")
+    start = time.monotonic()
+    results = await asyncio.gather(*[deliver_announcement(guild, embed, ping) for guild in guilds])
+    elapsed = time.monotonic() - start
+    
+    by_status = {}
+    for status, _ in results:
+        by_status[status] = by_status.get(status, 0) + 1
+    latencies = sorted(latency for status, latency in results if status == "delivered")
+    
+    summary = discord.Embed(
+        title="📡 Broadcast Report",
+        description=f"Delivered to **{by_status.get('delivered', 0)}/{len(guilds)}** servers in {format_duration(elapsed)}.",
+        color=0x00ff00 if by_status.get("delivered", 0) == len(guilds) else 0xffa500
+    )
+    summary.add_field(name="Results", value="\n".join(f"• {status}: {count}" for status, count in sorted(by_status.items()))[:1024], inline=False)
+    if latencies:
+        summary.add_field(
+            name="Delivery Latency",
+            value=f"p50 {latencies[len(latencies) // 2] * 1000:.0f}ms • p95 {latencies[int(len(latencies) * 0.95)] * 1000:.0f}ms • max {latencies[-1] * 1000:.0f}ms",
+            inline=False
+        )
+    report = io.StringIO()
+    writer = csv.writer(report)
+    writer.writerow(["guild_id", "guild_name", "status", "latency_ms"])
+    for guild, (status, latency) in zip(guilds, results):
+        writer.writerow([guild.id, guild.name, status, round(latency * 1000)])
+    await interaction.followup.send(embed=summary, file=discord.File(io.BytesIO(report.getvalue().encode("utf-8")), filename="broadcast-report.csv"), ephemeral=True)
+
+@bot.tree.command(name="schedule", description="Schedule a one-off or recurring announcement")
+@discord.app_commands.describe(
+    message="Your announcement message",
+    when="When to post: a delay like 30m, 2h or 1d 6h, or a UTC date/time like 2025-01-31 18:00",
+    repeat="Post again every hour, day or week",
+    ping="Ping @everyone"
+)
+@discord.app_commands.choices(repeat=[
+    discord.app_commands.Choice(name=name.capitalize(), value=name) for name in ANNOUNCEMENT_REPEATS
+])
+async def schedule(interaction: discord.Interaction, message: str, when: str, repeat: str = "never", ping: bool = False):
+    """Store an announcement to be posted later"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    try:
+        next_run = parse_when(when)
+    except ValueError:
+        await interaction.response.send_message("❌ Couldn't read that time. Use a delay like `30m`, `2h`, `1d 6h` or a UTC date like `2025-01-31 18:00`.", ephemeral=True)
+        return
+    if next_run <= time.time():
+        await interaction.response.send_message("❌ That time is in the past.", ephemeral=True)
+        return
+    if len(announcement_scheduler.for_guild(interaction.guild.id)) >= ANNOUNCEMENT_SCHEDULE_LIMIT:
+        await interaction.response.send_message(f"❌ This server already has {ANNOUNCEMENT_SCHEDULE_LIMIT} scheduled announcements. Cancel one with `/scheduled`.", ephemeral=True)
+        return
+    
+    announcement_id = announcement_scheduler.add(interaction.guild.id, message, next_run, ANNOUNCEMENT_REPEATS[repeat], interaction.user, ping)
+    repeat_text = f", then {repeat}" if ANNOUNCEMENT_REPEATS[repeat] else ""
+    await interaction.response.send_message(f"📅 Scheduled `{announcement_id}` for <t:{int(next_run)}:F> (<t:{int(next_run)}:R>){repeat_text}.", ephemeral=True)
+
+@bot.tree.command(name="scheduled", description="List or cancel scheduled announcements")
+@discord.app_commands.describe(cancel="ID of a scheduled announcement to cancel")
+async def scheduled(interaction: discord.Interaction, cancel: str = None):
+    """Show this server's scheduled announcements"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    if cancel:
+        if announcement_scheduler.remove(interaction.guild.id, cancel.strip("`# ")):
+            await interaction.response.send_message(f"🗑️ Cancelled scheduled announcement `{cancel}`.", ephemeral=True)
+        else:
+            await interaction.response.send_message("❌ No scheduled announcement with that ID on this server.", ephemeral=True)
+        return
+    
+    lines = []
+    for announcement_id, entry in announcement_scheduler.for_guild(interaction.guild.id):
+        repeat = next((name for name, seconds in ANNOUNCEMENT_REPEATS.items() if seconds == entry["interval"]), "never")
+        preview = entry["message"] if len(entry["message"]) <= 60 else entry["message"][:57] + "..."
+        lines.append(f"`{announcement_id}` <t:{int(entry['next_run'])}:R> • {repeat} • {preview}")
+    await interaction.response.send_message("\n".join(lines)[:2000] or "No scheduled announcements. Use `/schedule` to add one.", ephemeral=True)
+
+@bot.tree.command(name="broadcasts", description="Choose whether this server receives bot-wide announcements")
+@discord.app_commands.describe(enabled="Receive announcements broadcast by the bot owner")
+async def broadcasts(interaction: discord.Interaction, enabled: bool):
+    """Opt this server in or out of /broadcast"""
+    # Check if user is server owner
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    data_manager.update_server_config(interaction.guild.id, broadcasts=enabled)
+    if enabled and not announcement_channels.resolve(interaction.guild):
+        await interaction.response.send_message("✅ Broadcasts enabled, but there's no announcements channel yet. Use `/announce` once to create one.", ephemeral=True)
+        return
+    await interaction.response.send_message(f"✅ Broadcasts {'enabled' if enabled else 'disabled'} for this server.", ephemeral=True)
+
 # === WELCOME COMMAND ===
 
 @bot.tree.command(name="welcome", description="Set custom welcome message for new members")
@@ -2475,35 +5540,219 @@ async def edit_rules(interaction: discord.Interaction, rules: str):
         await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
         return
     
-    # Find rules channel
-    rules_channel = discord.utils.get(interaction.guild.channels, name="📜rules-config")
-    if not rules_channel:
-        await interaction.response.send_message("❌ Rules channel not found!", ephemeral=True)
+    guild = interaction.guild
+    rules_list = [rule.strip() for rule in rules.split('\n') if rule.strip()]
+    if not rules_list:
+        await interaction.response.send_message("❌ Please give at least one rule.", ephemeral=True)
         return
     
-    # Parse rules
-    rules_list = [rule.strip() for rule in rules.split('\n') if rule.strip()]
+    # Rules posted before versioning have no recorded message: clear the old
+    # channel once and track the message posted from now on
+    legacy_channel = None
+    if not rules_store.state(guild.id)["messages"]:
+        legacy_channel = discord.utils.get(guild.channels, name="📜rules-config")
+        if not legacy_channel:
+            await interaction.response.send_message("❌ Rules channel not found!", ephemeral=True)
+            return
     
-    # Create new rules embed
-    embed = discord.Embed(
-        title="🛡️ Server Rules (Edited)",
-        description="These rules were customized by the server owner.",
-        color=0xffa500
-    )
+    await interaction.response.defer(ephemeral=True)
+    version = rules_store.record(guild.id, rules_list, interaction.user.id)
+    if legacy_channel:
+        await legacy_channel.purge(limit=10)
+        rules_store.set_message(guild.id, legacy_channel.id, None)
     
-    for i, rule in enumerate(rules_list, 1):
-        embed.add_field(name=f"Rule #{i}", value=rule, inline=False)
+    results = await rules_store.publish(guild, version)
+    failed = [channel.mention for channel, result in results.items() if result == "failed"]
+    message = f"✅ Rules updated to version {version['version']} in {len(results) - len(failed)} channel(s)!"
+    if failed:
+        message += f"\n⚠️ Could not update: {', '.join(failed)}"
+    await interaction.followup.send(message, ephemeral=True)
     
-    embed.add_field(
-        name="📝 Last Updated",
-        value=f"Edited by {interaction.user.mention} at <t:{int(datetime.datetime.now(datetime.timezone.utc).timestamp())}:F>",
-        inline=False
-    )
+@bot.tree.command(name="rulesversions", description="List earlier versions of the server rules or roll back to one (Owner only)")
+@discord.app_commands.describe(rollback="Version number to restore")
+async def rules_versions(interaction: discord.Interaction, rollback: int = None):
+    """List rule versions or restore one - Owner only"""
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    guild = interaction.guild
+    if rollback is None:
+        versions = rules_store.state(guild.id)["versions"]
+        if not versions:
+            await interaction.response.send_message("📭 No rule versions have been recorded yet.", ephemeral=True)
+            return
+        embed = discord.Embed(title="📜 Rules Versions", color=0xffa500)
+        for version in reversed(versions):
+            edited_at = int(datetime.datetime.fromisoformat(version["edited_at"]).timestamp())
+            editor = f"<@{version['edited_by']}>" if version["edited_by"] else "Template"
+            embed.add_field(
+                name=f"Version {version['version']} ({version['kind']})",
+                value=f"{len(version['rules'])} rules by {editor}, <t:{edited_at}:R>",
+                inline=False
+            )
+        embed.set_footer(text="Use /rulesversions rollback:<version> to restore one")
+        await interaction.response.send_message(embed=embed, ephemeral=True)
+        return
+    
+    previous = rules_store.version(guild.id, rollback)
+    if not previous:
+        await interaction.response.send_message(f"❌ Version {rollback} is not in the rules history.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    version = rules_store.record(guild.id, previous["rules"], interaction.user.id, kind="rollback")
+    results = await rules_store.publish(guild, version)
+    updated = len([result for result in results.values() if result != "failed"])
+    await interaction.followup.send(f"✅ Restored version {rollback} as version {version['version']} in {updated} channel(s).", ephemeral=True)
+
+@bot.tree.command(name="rulesmirror", description="Show the server rules in another channel and keep it in sync (Owner only)")
+@discord.app_commands.describe(channel="Channel to show the rules in", remove="Stop updating the rules in this channel")
+async def rules_mirror(interaction: discord.Interaction, channel: discord.TextChannel, remove: bool = False):
+    """Mirror the rules into another channel - Owner only"""
+    if interaction.user.id != interaction.guild.owner_id:
+        await interaction.response.send_message("❌ Only the server owner can use this command.", ephemeral=True)
+        return
+    
+    guild = interaction.guild
+    if remove:
+        if rules_store.remove_channel(guild.id, channel.id):
+            await interaction.response.send_message(f"✅ {channel.mention} will no longer be updated with the rules.", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"❌ {channel.mention} isn't showing the rules.", ephemeral=True)
+        return
+    
+    version = rules_store.current(guild.id)
+    if not version:
+        await interaction.response.send_message("❌ No rules have been recorded yet. Use `/editrules` first.", ephemeral=True)
+        return
+    
+    await interaction.response.defer(ephemeral=True)
+    try:
+        await rules_store.show(guild, channel, rules_store.embed_for(version))
+    except discord.HTTPException as e:
+        await interaction.followup.send(f"❌ Could not post the rules in {channel.mention}: {e}", ephemeral=True)
+        return
+    await interaction.followup.send(f"✅ {channel.mention} now shows rules version {version['version']} and follows every edit.", ephemeral=True)
+
+# === LOCKDOWN SYSTEM ===
+
+LOCK_PERMISSIONS = {
+    "send_messages": False,
+    "send_messages_in_threads": False,
+    "add_reactions": False,
+    "create_public_threads": False,
+    "create_private_threads": False
+}
+LOCK_VOICE_PERMISSIONS = {"connect": False, "speak": False}
+
+class LockdownManager:
+    """Locks channels for @everyone and puts back exactly what was there before
+    
+    Each channel's @everyone overwrite is saved as an (allow, deny) pair, or
+    None when the channel had no overwrite, before it is locked, and the
+    snapshots are persisted so an unlock works after a restart. Guild or
+    category lockdowns lock all affected channels concurrently through the
+    outbound scheduler at moderation priority. Starting and ending a
+    lockdown take a per-guild lock, so overlapping commands run one after
+    the other instead of snapshotting channels that are already locked.
+    """
+    
+    def __init__(self):
+        self.guild_locks = {}  # guild ID -> asyncio.Lock
+    
+    def guild_lock(self, guild_id):
+        return self.guild_locks.setdefault(guild_id, asyncio.Lock())
     
-    # Clear old rules and send new ones
-    await rules_channel.purge(limit=10)
-    await rules_channel.send(embed=embed)
-    await interaction.response.send_message("✅ Rules updated successfully!", ephemeral=True)
+    @staticmethod
+    def lock_permissions(channel):
+        if isinstance(channel, (discord.VoiceChannel, discord.StageChannel)):
+            return dict(LOCK_PERMISSIONS, **LOCK_VOICE_PERMISSIONS)
+        return LOCK_PERMISSIONS
+    
+    @staticmethod
+    def snapshot(channel):
+        role = channel.guild.default_role
+        if role not in channel.overwrites:
+            return None
+        allow, deny = channel.overwrites[role].pair()
+        return [allow.value, deny.value]
+    
+    def is_locked(self, channel):
+        overwrite = channel.overwrites_for(channel.guild.default_role)
+        return all(getattr(overwrite, name) is value for name, value in self.lock_permissions(channel).items())
+    
+    async def lock(self, channel):
+        """Lock one channel; returns its snapshot"""
+        snapshot = self.snapshot(channel)
+        if not self.is_locked(channel):
+            overwrite = channel.overwrites_for(channel.guild.default_role)
+            overwrite.update(**self.lock_permissions(channel))
+            await outbound.submit(PRIORITY_MODERATION, channel.guild.id, lambda: channel.set_permissions(channel.guild.default_role, overwrite=overwrite))
+        return snapshot
+    
+    async def restore(self, channel, snapshot):
+        """Put back a channel's @everyone overwrite exactly as it was snapshotted"""
+        if self.snapshot(channel) == snapshot:
+            return
+        if snapshot is None:
+            overwrite = None
+        else:
+            overwrite = discord.PermissionOverwrite.from_pair(discord.Permissions(snapshot[0]), discord.Permissions(snapshot[1]))
+        await outbound.submit(PRIORITY_MODERATION, channel.guild.id, lambda: channel.set_permissions(channel.guild.default_role, overwrite=overwrite))
+    
+    def lockdown_targets(self, guild, category=None):
+        """Channels @everyone can see, in the category or the whole guild"""
+        channels = category.channels if category else [channel for channel in guild.channels if not isinstance(channel, discord.CategoryChannel)]
+        return [channel for channel in channels if channel.permissions_for(guild.default_role).view_channel]
+    
+    async def start_lockdown(self, guild, category=None, user=None):
+        """Lock every target channel; returns (locked count, failed count) or None if a lockdown is active"""
+        async with self.guild_lock(guild.id):
+            if str(guild.id) in data_manager.get_lockdowns():
+                return None
+            channels = self.lockdown_targets(guild, category)
+        
+            # Persist the snapshots first, so a crash halfway through still leaves everything to restore
+            state = {
+                "category_id": category.id if category else None,
+                "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(),
+                "started_by": user.id if user else None,
+                "channels": {str(channel.id): self.snapshot(channel) for channel in channels}
+            }
+            data_manager.set_lockdown(guild.id, state)
+            results = await asyncio.gather(*[self.lock(channel) for channel in channels], return_exceptions=True)
+            
+            failed = [channel for channel, result in zip(channels, results) if isinstance(result, Exception)]
+            if failed:
+                for channel in failed:
+                    del state["channels"][str(channel.id)]
+                data_manager.set_lockdown(guild.id, state)
+            return len(channels) - len(failed), len(failed)
+    
+    async def end_lockdown(self, guild):
+        """Restore every channel of the active lockdown; returns (restored, failed) or None if there is none"""
+        async with self.guild_lock(guild.id):
+            return await self.restore_lockdown(guild)
+    
+    async def restore_lockdown(self, guild):
+        state = data_manager.get_lockdowns().get(str(guild.id))
+        if state is None:
+            return None
+        channels = [(guild.get_channel(int(channel_id)), snapshot) for channel_id, snapshot in state["channels"].items()]
+        channels = [(channel, snapshot) for channel, snapshot in channels if channel]
+        results = await asyncio.gather(*[self.restore(channel, snapshot) for channel, snapshot in channels], return_exceptions=True)
+        
+        failed = {str(channel.id): snapshot for (channel, snapshot), result in zip(channels, results) if isinstance(result, Exception)}
+        if failed:
+            # Keep what couldn't be restored so the next attempt only retries those
+            state["channels"] = failed
+            data_manager.set_lockdown(guild.id, state)
+        else:
+            data_manager.remove_lockdown(guild.id)
+        return len(channels) - len(failed), len(failed)
+
+lockdown_manager = LockdownManager()
 
 # === LOCK CHANNEL COMMAND (PREFIX) ===
 
@@ -2519,15 +5768,11 @@ async def lock_channel(ctx, channel: discord.TextChannel = None):
     # Default to current channel if not specified
     target_channel = channel or ctx.channel
     
-    # Lock the channel by denying send_messages for @everyone
+    # Lock the channel by denying send_messages for @everyone, remembering the previous overwrite
     try:
-        await target_channel.set_permissions(
-            ctx.guild.default_role,
-            send_messages=False,
-            add_reactions=False,
-            create_public_threads=False,
-            create_private_threads=False
-        )
+        if str(target_channel.id) not in data_manager.get_channel_locks():
+            data_manager.set_channel_lock(target_channel.id, lockdown_manager.snapshot(target_channel))
+        await lockdown_manager.lock(target_channel)
         
         # Create lock embed
         embed = discord.Embed(
@@ -2560,15 +5805,19 @@ async def unlock_channel(ctx, channel: discord.TextChannel = None):
     # Default to current channel if not specified
     target_channel = channel or ctx.channel
     
-    # Unlock the channel by allowing send_messages for @everyone
+    # Unlock the channel by restoring the @everyone overwrite it had before !lock
     try:
-        await target_channel.set_permissions(
-            ctx.guild.default_role,
-            send_messages=None,
-            add_reactions=None,
-            create_public_threads=None,
-            create_private_threads=None
-        )
+        found, snapshot = data_manager.pop_channel_lock(target_channel.id)
+        if found:
+            await lockdown_manager.restore(target_channel, snapshot)
+        else:
+            await target_channel.set_permissions(
+                ctx.guild.default_role,
+                send_messages=None,
+                add_reactions=None,
+                create_public_threads=None,
+                create_private_threads=None
+            )
         
         # Create unlock embed
         embed = discord.Embed(
@@ -2587,143 +5836,225 @@ async def unlock_channel(ctx, channel: discord.TextChannel = None):
     except Exception as e:
         pass
 
+# === LOCKDOWN COMMANDS (PREFIX) ===
+
+@bot.command(name="lockdown")
+async def lockdown(ctx, category: discord.CategoryChannel = None):
+    """Lock every channel @everyone can see, in the whole server or one category
+    Usage: !lockdown or !lockdown <category>
+    """
+    # Check if user is server owner
+    if ctx.author.id != ctx.guild.owner_id:
+        return
+    
+    start = time.monotonic()
+    result = await lockdown_manager.start_lockdown(ctx.guild, category, ctx.author)
+    if result is None:
+        await ctx.send("❌ A lockdown is already active. Use `!endlockdown` to lift it first.")
+        return
+    locked, failed = result
+    
+    embed = discord.Embed(
+        title="🚨 Server Lockdown",
+        description=f"{locked} channel(s){' in ' + category.name if category else ''} locked by {ctx.author.mention} in {format_duration(time.monotonic() - start)}.",
+        color=0xff0000,
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    if failed:
+        embed.add_field(name="⚠️ Not locked", value=f"{failed} channel(s) could not be locked (check my permissions).", inline=False)
+    embed.set_footer(text="Use !endlockdown to restore every channel exactly as it was")
+    await ctx.send(embed=embed)
+
+@bot.command(name="endlockdown")
+async def end_lockdown(ctx):
+    """Lift the active lockdown, restoring each channel's previous @everyone permissions
+    Usage: !endlockdown
+    """
+    # Check if user is server owner
+    if ctx.author.id != ctx.guild.owner_id:
+        return
+    
+    start = time.monotonic()
+    result = await lockdown_manager.end_lockdown(ctx.guild)
+    if result is None:
+        await ctx.send("❌ There is no active lockdown.")
+        return
+    restored, failed = result
+    
+    embed = discord.Embed(
+        title="✅ Lockdown Lifted",
+        description=f"{restored} channel(s) restored by {ctx.author.mention} in {format_duration(time.monotonic() - start)}.",
+        color=0x00ff00,
+        timestamp=datetime.datetime.now(datetime.timezone.utc)
+    )
+    if failed:
+        embed.add_field(name="⚠️ Not restored", value=f"{failed} channel(s) could not be restored. Run `!endlockdown` again to retry them.", inline=False)
+    await ctx.send(embed=embed)
+
 # === QUOTE SYSTEM ===
 
-@bot.tree.command(name="quote", description="Create a beautiful quote from a message")
-@discord.app_commands.describe(message_link="Link to the message you want to quote (right-click → Copy Message Link)")
-@discord.app_commands.describe(reply_text="Your reply text")
-async def quote_command(interaction: discord.Interaction, message_link: str = None, reply_text: str = None):
-    """Create a stylish quote from any message using its link"""
-    try:
-        # If no message link provided, try to get from reference
-        if not message_link:
-            # For slash commands, we need to get the message link from the interaction context
-            # This is a limitation of slash commands - they don't have direct access to replied messages
-            await interaction.response.send_message(
-                "❌ Please provide a message link.\n"
-                "Right-click the message → **Copy Message Link** → Use that link with this command.\n"
-                "Or use the context menu: Right-click message → **Apps** → **Create Quote**", 
-                ephemeral=True
-            )
-            return
-            
-        # Parse the message link
-        try:
-            # Expected format: https://discord.com/channels/{guild_id}/{channel_id}/{message_id}
-            parts = message_link.split('/')
-            if len(parts) < 2:
-                raise ValueError("Invalid link format")
-                
-            message_id = int(parts[-1])
-            channel_id = int(parts[-2])
-            
-            # Get channel (might be same or different channel)
-            if channel_id == interaction.channel_id:
-                channel = interaction.channel
-            else:
-                channel = bot.get_channel(channel_id)
-                if not channel:
-                    channel = await bot.fetch_channel(channel_id)
-        except Exception as e:
-            await interaction.response.send_message("❌ Invalid message link format! Please use the 'Copy Message Link' option.", ephemeral=True)
-            return
+QUOTE_MESSAGE_CACHE_SIZE = 1000
+QUOTE_MESSAGE_CACHE_TTL = 300  # Seconds a fetched message is trusted without an edit/delete event
+QUOTE_EMBED_CACHE_SIZE = 500
 
-        # Fetch the message
-        try:
-            referenced_message = await channel.fetch_message(message_id)
-        except discord.NotFound:
-            await interaction.response.send_message("❌ Message not found! Make sure the link is correct and I have access to that channel.", ephemeral=True)
-            return
-        except discord.Forbidden:
-            await interaction.response.send_message("❌ I don't have permission to read that message!", ephemeral=True)
-            return
-        except Exception as e:
-            await interaction.response.send_message(f"❌ Error fetching message: {str(e)}", ephemeral=True)
-            return
+class LRUCache:
+    """Bounded mapping that evicts the least recently used entry, with an optional TTL"""
+    
+    def __init__(self, maxsize, ttl=None):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.entries = OrderedDict()  # key -> (stored at, value)
+        self.hits = 0
+        self.misses = 0
+    
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None or (self.ttl is not None and time.monotonic() - entry[0] > self.ttl):
+            if entry is not None:
+                del self.entries[key]
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry[1]
+    
+    def put(self, key, value):
+        self.entries[key] = (time.monotonic(), value)
+        self.entries.move_to_end(key)
+        if len(self.entries) > self.maxsize:
+            self.entries.popitem(last=False)
+    
+    def pop(self, key):
+        entry = self.entries.pop(key, None)
+        return entry[1] if entry else None
+    
+    def __len__(self):
+        return len(self.entries)
 
-        # Create the quote embed
-        embed = discord.Embed(
-            color=0x5865F2,
-            timestamp=referenced_message.created_at
-        )
-        
-        # Set author with original message info
-        embed.set_author(
-            name=f"{referenced_message.author.display_name} said:",
-            icon_url=referenced_message.author.display_avatar.url
-        )
-        
-        # Add the quoted message (truncate if too long)
-        quoted_content = referenced_message.content
-        if len(quoted_content) > 1000:
-            quoted_content = quoted_content[:997] + "..."
-        
-        embed.add_field(
-            name="",
-            value=quoted_content,
-            inline=False
-        )
-        
-        # Add attachments info if present
-        if referenced_message.attachments:
-            attachment_text = f"📎 {len(referenced_message.attachments)} attachment(s)"
-            if referenced_message.attachments[0].content_type and referenced_message.attachments[0].content_type.startswith('image/'):
-                attachment_text += " 🖼️"
-                # If it's an image, set it as the embed image
-                if referenced_message.attachments[0].content_type.startswith('image/'):
-                    embed.set_image(url=referenced_message.attachments[0].url)
-            embed.add_field(name="Attachments", value=attachment_text, inline=True)
-        
-        # Add reactions info if present
-        if referenced_message.reactions:
-            reaction_text = " ".join([f"{reaction.emoji} {reaction.count}" for reaction in referenced_message.reactions[:5]])
-            embed.add_field(name="Reactions", value=reaction_text, inline=True)
-        
-        # Add reply text if provided
-        if reply_text:
-            embed.add_field(
-                name=f"💬 {interaction.user.display_name} replied:",
-                value=reply_text,
-                inline=False
-            )
-        
-        # Add footer with context
-        embed.set_footer(
-            text=f"Quoted by {interaction.user.display_name} • #{referenced_message.channel.name}",
-            icon_url=interaction.user.display_avatar.url
+QUOTE_MAX_MESSAGES = 10  # Embeds per Discord message
+QUOTE_FETCH_CONCURRENCY = 10  # Message fetches in flight across all quote commands
+MESSAGE_LINK_PATTERN = re.compile(r"channels/(?:\d+|@me)/(\d+)/(\d+)")
+
+def parse_message_links(text):
+    """([(channel ID, message ID)] for every link in `text`, whether they were written as `first..last`)"""
+    links = [(int(channel_id), int(message_id)) for channel_id, message_id in MESSAGE_LINK_PATTERN.findall(text)]
+    return links, ".." in text
+
+class QuoteCache:
+    """Fetched messages and channels plus built quote embeds
+    
+    Messages are kept for QUOTE_MESSAGE_CACHE_TTL seconds and dropped early
+    on raw edit/delete/reaction events, so quoting a popular message again
+    needs no REST call. Concurrent fetches of one message share a request.
+    Quote embeds are keyed by everything they show that can change:
+    edited_at, the author's display name and avatar, and the reaction
+    counts, so a stale quote is never served.
+    """
+    
+    def __init__(self):
+        self.messages = LRUCache(QUOTE_MESSAGE_CACHE_SIZE, QUOTE_MESSAGE_CACHE_TTL)
+        self.channels = LRUCache(QUOTE_MESSAGE_CACHE_SIZE)
+        self.embeds = LRUCache(QUOTE_EMBED_CACHE_SIZE)
+        self.inflight = {}  # message ID -> future of the fetch in progress
+        self.fetch_limit = asyncio.Semaphore(QUOTE_FETCH_CONCURRENCY)
+        self.fetches = 0
+    
+    async def get_channel(self, channel_id):
+        channel = bot.get_channel(channel_id) or self.channels.get(channel_id)
+        if channel is None:
+            channel = await bot.fetch_channel(channel_id)
+            self.channels.put(channel_id, channel)
+        return channel
+    
+    async def get_message(self, channel_id, message_id, channel=None):
+        message = self.messages.get(message_id)
+        if message is not None:
+            return message
+        if message_id in self.inflight:
+            return await asyncio.shield(self.inflight[message_id])
+        
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[message_id] = future
+        try:
+            channel = channel or await self.get_channel(channel_id)
+            self.fetches += 1
+            message = await channel.fetch_message(message_id)
+            self.messages.put(message_id, message)
+            future.set_result(message)
+            return message
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()  # Mark retrieved when nobody else was waiting
+            raise
+        finally:
+            del self.inflight[message_id]
+    
+    async def get_messages(self, links, channel=None):
+        """Fetch (channel ID, message ID) pairs concurrently, in order; failures are returned as exceptions"""
+        async def fetch(channel_id, message_id):
+            async with self.fetch_limit:
+                known = channel if channel and channel.id == channel_id else None
+                return await self.get_message(channel_id, message_id, known)
+        return await asyncio.gather(*[fetch(*link) for link in links], return_exceptions=True)
+    
+    async def get_range(self, channel_id, first_id, last_id, limit):
+        """Up to `limit` messages from first_id to last_id (inclusive) in one history request"""
+        channel = await self.get_channel(channel_id)
+        async with self.fetch_limit:
+            self.fetches += 1
+            messages = [message async for message in channel.history(
+                limit=limit, after=discord.Object(first_id - 1), before=discord.Object(last_id + 1), oldest_first=True
+            )]
+        for message in messages:
+            self.remember(message)
+        return messages
+    
+    def remember(self, message):
+        self.messages.put(message.id, message)
+    
+    def invalidate(self, message_id):
+        self.messages.pop(message_id)
+    
+    def embed_for(self, message):
+        """The shared part of a quote embed; callers add their own footer and reply"""
+        key = (
+            message.id,
+            message.edited_at,
+            message.author.display_name,
+            message.author.display_avatar.key,
+            tuple((str(reaction.emoji), reaction.count) for reaction in message.reactions[:5])
         )
-        
-        # Add jump link to original message
-        embed.description = f"[Jump to original message]({referenced_message.jump_url})"
-        
-        # Send the quote
-        await interaction.response.send_message(embed=embed)
-        
-    except Exception as e:
-        await interaction.response.send_message(f"❌ Error creating quote: {str(e)}", ephemeral=True)
+        data = self.embeds.get(key)
+        if data is None:
+            data = build_quote_base_embed(message).to_dict()
+            self.embeds.put(key, data)
+        # Embed.copy() shares the fields list, so copy the dict deeply instead
+        return discord.Embed.from_dict(copy.deepcopy(data))
 
-# === CONTEXT MENU QUOTE (Right-click on message) ===
+quote_cache = QuoteCache()
 
-@bot.tree.context_menu(name="Create Quote")
-async def quote_context_menu(interaction: discord.Interaction, message: discord.Message):
-    """Right-click context menu to quote a message"""
-    # Create the quote embed
+def build_quote_base_embed(message):
     embed = discord.Embed(
         color=0x5865F2,
         timestamp=message.created_at
     )
     
+    # Set author with original message info
     embed.set_author(
         name=f"{message.author.display_name} said:",
         icon_url=message.author.display_avatar.url
     )
     
-    # Truncate message content if needed
+    # Add the quoted message (truncate if too long)
     quoted_content = message.content
     if len(quoted_content) > 1000:
         quoted_content = quoted_content[:997] + "..."
     
-    embed.add_field(name="", value=quoted_content, inline=False)
+    embed.add_field(
+        name="",
+        value=quoted_content,
+        inline=False
+    )
     
     # Add attachments info if present
     if message.attachments:
@@ -2731,8 +6062,7 @@ async def quote_context_menu(interaction: discord.Interaction, message: discord.
         if message.attachments[0].content_type and message.attachments[0].content_type.startswith('image/'):
             attachment_text += " 🖼️"
             # If it's an image, set it as the embed image
-            if message.attachments[0].content_type.startswith('image/'):
-                embed.set_image(url=message.attachments[0].url)
+            embed.set_image(url=message.attachments[0].url)
         embed.add_field(name="Attachments", value=attachment_text, inline=True)
     
     # Add reactions info if present
@@ -2740,55 +6070,420 @@ async def quote_context_menu(interaction: discord.Interaction, message: discord.
         reaction_text = " ".join([f"{reaction.emoji} {reaction.count}" for reaction in message.reactions[:5]])
         embed.add_field(name="Reactions", value=reaction_text, inline=True)
     
+    # Add jump link to original message
+    embed.description = f"[Jump to original message]({message.jump_url})"
+    return embed
+
+def build_quote_embed(message, quoted_by, reply_text=None):
+    """Quote embed for `message`, shared by /quote and the Create Quote context menu"""
+    embed = quote_cache.embed_for(message)
+    
+    # Add reply text if provided
+    if reply_text:
+        embed.add_field(
+            name=f"💬 {quoted_by.display_name} replied:",
+            value=reply_text,
+            inline=False
+        )
+    
+    # Add footer with context
+    channel_name = getattr(message.channel, "name", None)
     embed.set_footer(
-        text=f"Quoted by {interaction.user.display_name}",
-        icon_url=interaction.user.display_avatar.url
+        text=f"Quoted by {quoted_by.display_name}" + (f" • #{channel_name}" if channel_name else ""),
+        icon_url=quoted_by.display_avatar.url
     )
+    return embed
+
+# === QUOTE CARDS ===
+
+QUOTE_CARD_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "quote_cache")
+QUOTE_CARD_VERSION = 1  # Bump when the card layout changes, so old renders aren't served
+QUOTE_CARD_FONT = os.getenv("QUOTE_CARD_FONT") or next((path for path in (
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf",
+    "/usr/share/fonts/TTF/DejaVuSans.ttf",
+    "/Library/Fonts/Arial.ttf",
+    "C:\\Windows\\Fonts\\arial.ttf"
+) if os.path.exists(path)), None)
+QUOTE_RENDER_WORKERS = max(1, min(4, (os.cpu_count() or 2) // 2))
+QUOTE_RENDER_CACHE_SIZE = 200  # Rendered PNGs kept in memory; all of them stay on disk
+QUOTE_CARD_WIDTH = 800
+QUOTE_CARD_MAX_LINES = 12
+
+# Per-process caches of the render workers
+_card_fonts = {}
+_card_avatars = OrderedDict()
+
+def _card_font(path, size):
+    key = (path, size)
+    if key not in _card_fonts:
+        _card_fonts[key] = ImageFont.truetype(path, size) if path else ImageFont.load_default()
+    return _card_fonts[key]
+
+def _card_avatar(path, size):
+    if path not in _card_avatars:
+        avatar = Image.open(path).convert("RGBA").resize((size, size))
+        mask = Image.new("L", (size, size), 0)
+        ImageDraw.Draw(mask).ellipse((0, 0, size - 1, size - 1), fill=255)
+        avatar.putalpha(mask)
+        _card_avatars[path] = avatar
+        if len(_card_avatars) > 64:
+            _card_avatars.popitem(last=False)
+    return _card_avatars[path]
+
+def _wrap_card_text(draw, text, font, width):
+    lines = []
+    for paragraph in text.splitlines() or [""]:
+        line = ""
+        for word in paragraph.split(" "):
+            candidate = f"{line} {word}" if line else word
+            if draw.textlength(candidate, font=font) <= width:
+                line = candidate
+                continue
+            if line:
+                lines.append(line)
+            # Hard-break words that are wider than a whole line
+            while draw.textlength(word, font=font) > width and len(word) > 1:
+                cut = len(word)
+                while cut > 1 and draw.textlength(word[:cut], font=font) > width:
+                    cut -= 1
+                lines.append(word[:cut])
+                word = word[cut:]
+            line = word
+        lines.append(line)
+    if len(lines) > QUOTE_CARD_MAX_LINES:
+        lines = lines[:QUOTE_CARD_MAX_LINES]
+        lines[-1] = lines[-1][:max(0, len(lines[-1]) - 3)] + "..."
+    return lines
+
+def render_quote_card(avatar_path, font_path, name, text, timestamp):
+    """Rasterize a quote card to PNG bytes; runs in a worker process"""
+    padding, avatar_size, line_height = 32, 96, 36
+    text_x = padding * 2 + avatar_size
+    name_font, text_font, small_font = _card_font(font_path, 30), _card_font(font_path, 28), _card_font(font_path, 20)
     
-    embed.description = f"[Jump to original message]({message.jump_url})"
+    measure = ImageDraw.Draw(Image.new("RGB", (1, 1)))
+    lines = _wrap_card_text(measure, text, text_font, QUOTE_CARD_WIDTH - text_x - padding)
+    height = max(avatar_size + padding * 2, padding * 2 + 48 + len(lines) * line_height + 36)
+    
+    image = Image.new("RGB", (QUOTE_CARD_WIDTH, height), (32, 34, 37))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle((0, 0, 6, height), fill=(88, 101, 242))
+    if avatar_path:
+        avatar = _card_avatar(avatar_path, avatar_size)
+        image.paste(avatar, (padding, padding), avatar)
+    draw.text((text_x, padding), name, font=name_font, fill=(255, 255, 255))
+    for index, line in enumerate(lines):
+        draw.text((text_x, padding + 48 + index * line_height), line, font=text_font, fill=(220, 221, 222))
+    draw.text((text_x, height - padding - 20), timestamp, font=small_font, fill=(142, 146, 151))
+    
+    buffer = io.BytesIO()
+    image.save(buffer, "PNG")
+    return buffer.getvalue()
+
+class QuoteCardRenderer:
+    """Renders quote cards to PNG off the event loop
+    
+    Avatars and the font are stored in a content-addressed cache on disk
+    (assets/<sha256>), with an index from avatar URL / font path to hash so
+    warm restarts don't download again. Cards are rasterized in a process
+    pool and stored under the hash of everything drawn on them, so an
+    identical quote is served from memory or disk without rendering. All
+    file reads and writes run in a thread, so a cache miss never blocks
+    the event loop. Needs Pillow; `available` is False without it.
+    """
+    
+    def __init__(self, cache_dir=QUOTE_CARD_DIR, font_path=QUOTE_CARD_FONT, workers=QUOTE_RENDER_WORKERS):
+        self.cache_dir = cache_dir
+        self.font_path = font_path
+        self.workers = workers
+        self.executor = None
+        self.renders = LRUCache(QUOTE_RENDER_CACHE_SIZE)
+        self.inflight = {}  # render key -> future
+        self.asset_index = None  # source -> asset path
+        self.index_lock = asyncio.Lock()  # One index write at a time
+        self.rendered = 0
+    
+    @property
+    def available(self):
+        return Image is not None
+    
+    def index_path(self):
+        return os.path.join(self.cache_dir, "assets", "index.json")
+    
+    def read_index(self):
+        try:
+            with open(self.index_path(), 'r', encoding='utf-8') as f:
+                return json.load(f)
+        except (FileNotFoundError, ValueError):
+            return {}
+    
+    def write_index(self, index):
+        path = self.index_path()
+        with open(path + ".tmp", 'w', encoding='utf-8') as f:
+            json.dump(index, f)
+        os.replace(path + ".tmp", path)
+    
+    async def load_index(self):
+        if self.asset_index is None:
+            index = await asyncio.to_thread(self.read_index)
+            if self.asset_index is None:
+                self.asset_index = index
+        return self.asset_index
+    
+    def store(self, folder, name, data):
+        path = os.path.join(self.cache_dir, folder, name)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path + ".tmp", 'wb') as f:
+                f.write(data)
+            os.replace(path + ".tmp", path)
+        return path
+    
+    async def asset(self, source, load, extension):
+        """Path of the cached asset for `source`, calling `load()` for its bytes on a miss"""
+        index = await self.load_index()
+        path = index.get(source)
+        if path and await asyncio.to_thread(os.path.exists, path):
+            return path
+        data = await load()
+        path = await asyncio.to_thread(self.store, "assets", hashlib.sha256(data).hexdigest() + extension, data)
+        index[source] = path
+        async with self.index_lock:
+            try:
+                await asyncio.to_thread(self.write_index, dict(index))
+            except OSError as e:
+                print(f"Could not save quote asset index: {e}")
+        return path
+    
+    def pool(self):
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(max_workers=self.workers)
+        return self.executor
     
-    await interaction.response.send_message(embed=embed)
+    def close(self):
+        """Stop the render processes; the pool is started again on the next render"""
+        if self.executor is not None:
+            self.executor.shutdown(wait=False, cancel_futures=True)
+            self.executor = None
+    
+    async def render_card(self, avatar_source, load_avatar, name, text, timestamp):
+        """PNG bytes of a card, rendering only when nothing identical was rendered before"""
+        avatar_path = await self.asset(avatar_source, load_avatar, ".png") if avatar_source else None
+        font_path = None
+        if self.font_path:
+            font_path = await self.asset(self.font_path, lambda: asyncio.to_thread(self.read_file, self.font_path), os.path.splitext(self.font_path)[1])
+        
+        content = [QUOTE_CARD_VERSION, os.path.basename(avatar_path or ""), os.path.basename(font_path or ""), name, text, timestamp]
+        key = hashlib.sha256(json.dumps(content, ensure_ascii=False).encode("utf-8")).hexdigest()
+        png = self.renders.get(key)
+        if png is not None:
+            return png
+        if key in self.inflight:
+            return await asyncio.shield(self.inflight[key])
+        
+        future = asyncio.get_running_loop().create_future()
+        self.inflight[key] = future
+        try:
+            path = os.path.join(self.cache_dir, "renders", f"{key}.png")
+            png = await asyncio.to_thread(self.read_cached, path)
+            if png is None:
+                png = await asyncio.get_running_loop().run_in_executor(
+                    self.pool(), render_quote_card, avatar_path, font_path, name, text, timestamp
+                )
+                self.rendered += 1
+                await asyncio.to_thread(self.store, "renders", f"{key}.png", png)
+            self.renders.put(key, png)
+            future.set_result(png)
+            return png
+        except BaseException as e:
+            future.set_exception(e)
+            future.exception()
+            raise
+        finally:
+            del self.inflight[key]
+    
+    @staticmethod
+    def read_file(path):
+        with open(path, 'rb') as f:
+            return f.read()
+    
+    @staticmethod
+    def read_cached(path):
+        try:
+            with open(path, 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            return None
+    
+    async def render_message(self, message):
+        avatar = message.author.display_avatar.replace(size=128, format="png")
+        timestamp = message.created_at.strftime("%b %d, %Y • %H:%M UTC")
+        if message.edited_at:
+            timestamp += " (edited)"
+        return await self.render_card(str(avatar.url), avatar.read, message.author.display_name, message.content, timestamp)
+
+quote_card_renderer = QuoteCardRenderer()
+
+def fit_quote_embeds(embeds, budget=6000):
+    """Shorten the longest quoted texts until the embeds fit Discord's per-message character limit"""
+    excess = sum(len(embed) for embed in embeds) - budget
+    while excess > 0:
+        embed = max(embeds, key=lambda embed: len(embed.fields[0].value))
+        value = embed.fields[0].value
+        if len(value) <= 3:
+            break
+        embed.set_field_at(0, name="", value=value[:max(0, len(value) - excess - 3)] + "...", inline=False)
+        excess = sum(len(embed) for embed in embeds) - budget
+
+@bot.tree.command(name="quote", description="Create a beautiful quote from a message")
+@discord.app_commands.describe(message_link="Message link(s) to quote (right-click → Copy Message Link); several links, or first..last for a range")
+@discord.app_commands.describe(reply_text="Your reply text")
+@discord.app_commands.describe(image="Attach the quote as a rendered image card")
+async def quote_command(interaction: discord.Interaction, message_link: str = None, reply_text: str = None, image: bool = False):
+    """Create a stylish quote from one or more messages using their links"""
+    try:
+        # If no message link provided, try to get from reference
+        if not message_link:
+            # For slash commands, we need to get the message link from the interaction context
+            # This is a limitation of slash commands - they don't have direct access to replied messages
+            await interaction.response.send_message(
+                "❌ Please provide a message link.\n"
+                "Right-click the message → **Copy Message Link** → Use that link with this command.\n"
+                "Or use the context menu: Right-click message → **Apps** → **Create Quote**", 
+                ephemeral=True
+            )
+            return
+            
+        # Parse the message links
+        # Expected format: https://discord.com/channels/{guild_id}/{channel_id}/{message_id}
+        links, is_range = parse_message_links(message_link)
+        if not links or (is_range and (len(links) != 2 or links[0][0] != links[1][0])):
+            await interaction.response.send_message("❌ Invalid message link format! Please use the 'Copy Message Link' option (for a range: `first_link..last_link` in one channel).", ephemeral=True)
+            return
+        if len(links) > QUOTE_MAX_MESSAGES:
+            await interaction.response.send_message(f"❌ You can quote up to {QUOTE_MAX_MESSAGES} messages at once.", ephemeral=True)
+            return
+        if image and not quote_card_renderer.available:
+            await interaction.response.send_message("❌ Image quotes need Pillow installed on the bot (`pip install Pillow`).", ephemeral=True)
+            return
+
+        if len(links) > 1 or image:
+            await interaction.response.defer()
+        
+        # Fetch the messages concurrently (served from the quote cache when quoted recently)
+        channel = interaction.channel
+        if is_range:
+            first_id, last_id = sorted(message_id for _, message_id in links)
+            try:
+                results = await quote_cache.get_range(links[0][0], first_id, last_id, QUOTE_MAX_MESSAGES)
+            except Exception as e:
+                results = [e]
+        else:
+            results = await quote_cache.get_messages(links, channel)
+        messages = [result for result in results if not isinstance(result, BaseException)]
+        failures = [result for result in results if isinstance(result, BaseException)]
+        
+        if not messages:
+            error = failures[0] if failures else None
+            if isinstance(error, discord.NotFound) or error is None:
+                text = "❌ Message not found! Make sure the link is correct and I have access to that channel."
+            elif isinstance(error, discord.Forbidden):
+                text = "❌ I don't have permission to read that message!"
+            else:
+                text = f"❌ Error fetching message: {str(error)}"
+            if interaction.response.is_done():
+                await interaction.followup.send(text, ephemeral=True)
+            else:
+                await interaction.response.send_message(text, ephemeral=True)
+            return
+
+        # One embed per quoted message; the reply and quoter footer go on the last one
+        embeds = [quote_cache.embed_for(message) for message in messages[:-1]]
+        embeds.append(build_quote_embed(messages[-1], interaction.user, reply_text))
+        fit_quote_embeds(embeds)
+        files = []
+        if image:
+            cards = await asyncio.gather(*[quote_card_renderer.render_message(message) for message in messages])
+            for index, (embed, png) in enumerate(zip(embeds, cards)):
+                files.append(discord.File(io.BytesIO(png), filename=f"quote-{index}.png"))
+                embed.set_image(url=f"attachment://quote-{index}.png")
+        
+        content = f"⚠️ {len(failures)} message(s) could not be fetched." if failures else None
+        if interaction.response.is_done():
+            await interaction.followup.send(content=content, embeds=embeds, files=files)
+        else:
+            await interaction.response.send_message(content=content, embeds=embeds)
+        
+    except Exception as e:
+        if interaction.response.is_done():
+            await interaction.followup.send(f"❌ Error creating quote: {str(e)}", ephemeral=True)
+        else:
+            await interaction.response.send_message(f"❌ Error creating quote: {str(e)}", ephemeral=True)
+
+# === CONTEXT MENU QUOTE (Right-click on message) ===
+
+@bot.tree.context_menu(name="Create Quote")
+async def quote_context_menu(interaction: discord.Interaction, message: discord.Message):
+    """Right-click context menu to quote a message"""
+    quote_cache.remember(message)
+    await interaction.response.send_message(embed=build_quote_embed(message, interaction.user))
 
 # === REACTION ROLE EVENT HANDLERS ===
 
 @bot.event
+@metrics.timed
 async def on_raw_reaction_add(payload):
-    if payload.message_id in reaction_role_system.reaction_roles:
+    quote_cache.invalidate(payload.message_id)  # Cached reaction counts are now stale
+    role_id = reaction_role_system.role_for(payload.message_id, payload.emoji)
+    if role_id:
         guild = bot.get_guild(payload.guild_id)
-        role_id = reaction_role_system.reaction_roles.get(str(payload.emoji))
-        if role_id:
-            role = guild.get_role(role_id)
-            if role:
-                member = guild.get_member(payload.user_id)
-                if member and not member.bot: 
-                    await member.add_roles(role)
+        if guild:
+            member = guild.get_member(payload.user_id)
+            if member and not member.bot:
+                reaction_role_batcher.queue(guild, member.id, role_id, True)
 
 @bot.event
+@metrics.timed
 async def on_raw_reaction_remove(payload):
-    if payload.message_id in reaction_role_system.reaction_roles:
+    quote_cache.invalidate(payload.message_id)
+    role_id = reaction_role_system.role_for(payload.message_id, payload.emoji)
+    if role_id:
         guild = bot.get_guild(payload.guild_id)
-        role_id = reaction_role_system.reaction_roles.get(str(payload.emoji))
-        if role_id:
-            role = guild.get_role(role_id)
-            if role:
-                member = guild.get_member(payload.user_id)
-                if member and not member.bot: 
-                    await member.remove_roles(role)
+        if guild:
+            member = guild.get_member(payload.user_id)
+            if member and not member.bot:
+                reaction_role_batcher.queue(guild, member.id, role_id, False)
+
+@bot.event
+async def on_raw_message_delete(payload):
+    quote_cache.invalidate(payload.message_id)
+    # Drop bindings for deleted reaction role messages
+    if payload.message_id in reaction_role_system.reaction_roles:
+        reaction_role_system.unbind(payload.message_id)
+
+@bot.event
+async def on_raw_bulk_message_delete(payload):
+    for message_id in payload.message_ids:
+        quote_cache.invalidate(message_id)
+
+@bot.event
+async def on_raw_message_edit(payload):
+    quote_cache.invalidate(payload.message_id)
 
 # === TEMPORARY VOICE CHANNELS EVENT HANDLER ===
 
 @bot.event
+@metrics.timed
 async def on_voice_state_update(member, before, after):
-    if (after.channel and after.channel.id in temp_voice_system.creator_channels.values()):
-        guild = member.guild
-        category = after.channel.category
-        temp_channel = await guild.create_voice_channel(name=f"🎤 {member.display_name}'s Room", category=category, user_limit=10)
-        await member.move_to(temp_channel)
-        temp_voice_system.temp_channels[temp_channel.id] = {'owner': member.id, 'created_at': datetime.datetime.now(datetime.timezone.utc)}
-    if before.channel and before.channel.id in temp_voice_system.temp_channels:
-        if len(before.channel.members) == 0:
-            await before.channel.delete()
-            del temp_voice_system.temp_channels[before.channel.id]
+    # Mute, deafen, stream and video toggles don't change the channel
+    if before.channel == after.channel:
+        return
+    before_id = before.channel.id if before.channel else None
+    after_id = after.channel.id if after.channel else None
+    if (before_id not in temp_voice_system.temp_channels and after_id not in temp_voice_system.temp_channels
+            and after_id not in temp_voice_system.creator_ids):
+        return
+    await temp_voice_system.handle_voice_move(member, before.channel, after.channel)
 
 # === ERROR HANDLING ===
 
@@ -0,0 +1,64 @@
+import asyncio
+import time
+
+import jinbe
+from jinbe import LoopMonitor, MetricsRegistry
+
+def make_monitor():
+    registry = MetricsRegistry()
+    registry.histogram("jinbe_event_loop_lag_seconds", "lag")
+    registry.counter("jinbe_slow_callbacks_total", "slow callbacks")
+    return LoopMonitor(interval=0.02, threshold=0.05, registry=registry), registry
+
+def block_in_test(seconds):
+    time.sleep(seconds)
+
+def test_blocking_calls_are_attributed_to_their_subsystem(tmp_path, monkeypatch):
+    # A slow disk: the json.dump in DataManager.save_data stalls the loop
+    monkeypatch.setattr(jinbe.json, "dump", lambda data, f, **kwargs: time.sleep(0.3))
+    data_manager = jinbe.DataManager()
+    data_manager.data_file = str(tmp_path / "bot_data.json")
+
+    async def scenario():
+        monitor, registry = make_monitor()
+        monitor.start()
+        await asyncio.sleep(0.1)
+        data_manager.save_data()
+        await asyncio.sleep(0.1)
+        block_in_test(0.15)
+        await asyncio.sleep(0.1)
+        monitor.stop()
+        return monitor, registry
+
+    monitor, registry = asyncio.run(scenario())
+    assert set(monitor.offenders) == {"DataManager", "test_loop_monitor"}
+
+    data_stall = monitor.offenders["DataManager"]
+    assert data_stall["count"] == 1
+    assert 0.25 <= data_stall["worst"] < 0.5
+    assert "DataManager.save_data" in data_stall["where"]
+    assert "save_data" in data_stall["stack"]
+
+    test_stall = monitor.offenders["test_loop_monitor"]
+    assert "block_in_test" in test_stall["where"]
+    assert [subsystem for subsystem, _ in monitor.worst_offenders()] == ["DataManager", "test_loop_monitor"]
+
+    assert registry.counters["jinbe_slow_callbacks_total"][(("subsystem", "DataManager"),)] == 1
+    assert monitor.max_lag >= 0.25
+    assert "jinbe_slow_callbacks_total{subsystem=\"DataManager\"} 1" in registry.render()
+
+def test_idle_loop_records_no_stalls():
+    async def scenario():
+        monitor, registry = make_monitor()
+        monitor.start()
+        # Short awaits and quick callbacks only
+        for _ in range(20):
+            await asyncio.sleep(0.01)
+        monitor.stop()
+        return monitor, registry
+
+    monitor, registry = asyncio.run(scenario())
+    assert monitor.offenders == {}
+    assert len(monitor.recent_lag) >= 5
+    assert monitor.lag_percentile(0.5) < 0.05
+    assert registry.histograms["jinbe_event_loop_lag_seconds"][()].count == len(monitor.recent_lag)
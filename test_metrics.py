@@ -0,0 +1,145 @@
+import asyncio
+import re
+
+import aiohttp
+from aiohttp import web
+
+from jinbe import DataManager, MetricsRegistry, MetricsServer, api_route, metrics
+
+SAMPLE = re.compile(r'^([a-zA-Z_:][a-zA-Z0-9_:]*)(\{.*\})? (\S+)$')
+LABEL = re.compile(r'(\w+)="((?:[^"\\]|\\.)*)"')
+
+# Minimal local scraper: parse the text exposition format into
+# {(name, frozenset(labels)): value} and check every family is declared
+def parse_exposition(text):
+    samples, types = {}, {}
+    for line in text.splitlines():
+        if line.startswith("# TYPE "):
+            _, _, name, kind = line.split(" ")
+            types[name] = kind
+        elif line and not line.startswith("#"):
+            match = SAMPLE.match(line)
+            assert match, f"malformed sample line: {line!r}"
+            name, labels, value = match.groups()
+            family = re.sub(r"_(bucket|sum|count)$", "", name) if name not in types else name
+            assert family in types, f"sample {name} has no TYPE line"
+            samples[(name, frozenset(LABEL.findall(labels or "")))] = float(value)
+    return samples, types
+
+async def scrape(registry):
+    server = MetricsServer(registry)
+    await server.start("127.0.0.1", 0)
+    port = server.runner.addresses[0][1]
+    try:
+        async with aiohttp.ClientSession() as session:
+            async with session.get(f"http://127.0.0.1:{port}/metrics") as response:
+                assert response.status == 200
+                assert response.content_type == "text/plain"
+                return await response.text()
+    finally:
+        await server.stop()
+
+def test_handler_histograms_and_counters_are_scraped():
+    async def scenario():
+        registry = MetricsRegistry()
+        registry.histogram("jinbe_event_handler_seconds", "handlers")
+        registry.counter("jinbe_moderation_verdicts_total", "verdicts")
+        registry.gauge("jinbe_queue_depth", "depth", lambda: {(("priority", "bulk"),): 3})
+
+        @registry.timed
+        async def on_message(message):
+            await asyncio.sleep(0.02)
+
+        for _ in range(5):
+            await on_message(None)
+        registry.inc("jinbe_moderation_verdicts_total", (("detector", "automod"), ("verdict", "clean")), 4)
+        registry.inc("jinbe_moderation_verdicts_total", (("detector", "nsfw"), ("verdict", 'odd "value"\n')))
+        return await scrape(registry)
+
+    samples, types = parse_exposition(asyncio.run(scenario()))
+    assert types == {"jinbe_event_handler_seconds": "histogram", "jinbe_moderation_verdicts_total": "counter", "jinbe_queue_depth": "gauge"}
+
+    event = ("event", "on_message")
+    assert samples[("jinbe_event_handler_seconds_count", frozenset([event]))] == 5
+    assert samples[("jinbe_event_handler_seconds_sum", frozenset([event]))] >= 0.1
+    assert samples[("jinbe_event_handler_seconds_bucket", frozenset([event, ("le", "0.01")]))] == 0
+    assert samples[("jinbe_event_handler_seconds_bucket", frozenset([event, ("le", "+Inf")]))] == 5
+
+    assert samples[("jinbe_moderation_verdicts_total", frozenset([("detector", "automod"), ("verdict", "clean")]))] == 4
+    assert samples[("jinbe_moderation_verdicts_total", frozenset([("detector", "nsfw"), ("verdict", 'odd \\"value\\"\\n')]))] == 1
+    assert samples[("jinbe_queue_depth", frozenset([("priority", "bulk")]))] == 3
+
+def test_api_calls_and_rate_limits_are_counted_by_route(tmp_path):
+    async def scenario():
+        # Stand-in for the Discord API: one 200 route and one that answers 429
+        async def ok(request):
+            return web.json_response({})
+
+        async def limited(request):
+            return web.json_response({"retry_after": 1}, status=429, headers={"X-RateLimit-Scope": "user"})
+
+        app = web.Application()
+        app.router.add_post("/api/v10/channels/{channel}/messages", ok)
+        app.router.add_put("/api/v10/channels/{channel}/messages/{message}/reactions/{emoji}/@me", limited)
+        runner = web.AppRunner(app)
+        await runner.setup()
+        site = web.TCPSite(runner, "127.0.0.1", 0)
+        await site.start()
+        base = f"http://127.0.0.1:{runner.addresses[0][1]}/api/v10"
+
+        try:
+            async with aiohttp.ClientSession(trace_configs=[metrics.http_trace()]) as session:
+                for channel in (111111111111111111, 222222222222222222):
+                    async with session.post(f"{base}/channels/{channel}/messages", json={}):
+                        pass
+                async with session.put(f"{base}/channels/111111111111111111/messages/333333333333333333/reactions/%F0%9F%91%8D/@me"):
+                    pass
+        finally:
+            await runner.cleanup()
+
+        data_manager = DataManager()
+        data_manager.data_file = str(tmp_path / "bot_data.json")
+        data_manager.save_data()
+        return await scrape(metrics)
+
+    samples, types = parse_exposition(asyncio.run(scenario()))
+    assert types["jinbe_api_requests_total"] == "counter"
+    assert samples[("jinbe_api_requests_total", frozenset([("method", "POST"), ("route", "/channels/{id}/messages"), ("status", "200")]))] == 2
+    reaction_route = "/channels/{id}/messages/{id}/reactions/{emoji}/@me"
+    assert samples[("jinbe_api_requests_total", frozenset([("method", "PUT"), ("route", reaction_route), ("status", "429")]))] == 1
+    assert samples[("jinbe_api_rate_limited_total", frozenset([("route", reaction_route), ("scope", "user")]))] == 1
+    assert samples[("jinbe_data_flush_seconds_count", frozenset())] >= 1
+    assert all(samples[("jinbe_outbound_queue_depth", frozenset([("priority", name)]))] == 0
+               for name in ("moderation", "interaction", "log", "bulk"))
+
+def test_tokens_and_ids_never_reach_labels():
+    assert api_route("/api/v10/interactions/123456789012345678/aW50ZXJhY3Rpb24/callback") == "/interactions/{id}/{token}/callback"
+    assert api_route("/api/v10/webhooks/123456789012345678/abc.def-ghi/messages/@original") == "/webhooks/{id}/{token}/messages/@original"
+    assert api_route("/api/v10/guilds/123456789012345678/members/223456789012345678/roles/323456789012345678") == "/guilds/{id}/members/{id}/roles/{id}"
+
+def test_timed_handler_passes_results_and_errors_through():
+    registry = MetricsRegistry()
+    registry.histogram("jinbe_event_handler_seconds", "handlers")
+
+    async def on_reaction_add(reaction, user=None):
+        if reaction is None:
+            raise ValueError("no reaction")
+        return reaction, user
+
+    timed = registry.timed(on_reaction_add)
+    assert timed.__name__ == "on_reaction_add"
+
+    async def scenario():
+        results = [await timed(index, user="someone") for index in range(3)]
+        try:
+            await timed(None)
+        except ValueError:
+            pass
+        else:
+            raise AssertionError("the handler's exception was swallowed")
+        return results
+
+    assert asyncio.run(scenario()) == [(0, "someone"), (1, "someone"), (2, "someone")]
+    # Failed runs are timed too
+    histogram = registry.histograms["jinbe_event_handler_seconds"][(("event", "on_reaction_add"),)]
+    assert histogram.count == 4
@@ -0,0 +1,57 @@
+import asyncio
+
+import jinbe
+from jinbe import reaction_role_system, reactionrole
+
+class FakeResponse:
+    def __init__(self):
+        self.messages = []
+
+    async def send_message(self, content=None, **kwargs):
+        self.messages.append(content)
+
+class FakeChannel:
+    def __init__(self, channel_id):
+        self.id = channel_id
+
+class FakeGuild:
+    def __init__(self, guild_id, channel_ids):
+        self.id = guild_id
+        self.owner_id = 1
+        self.channels = {channel_id: FakeChannel(channel_id) for channel_id in channel_ids}
+
+    def get_channel(self, channel_id):
+        return self.channels.get(channel_id)
+
+class FakeInteraction:
+    def __init__(self, guild):
+        self.guild = guild
+        self.user = type("User", (), {"id": 1})()
+        self.response = FakeResponse()
+
+def remove_binding(guild, link, emoji=None):
+    interaction = FakeInteraction(guild)
+    asyncio.run(reactionrole.callback(interaction, message_link=link, emoji=emoji, remove=True))
+    return interaction.response.messages[-1]
+
+def test_remove_refuses_bindings_of_other_guilds(tmp_path, monkeypatch):
+    monkeypatch.setattr(jinbe.data_manager, "data_file", str(tmp_path / "bot_data.json"))
+    monkeypatch.setattr(jinbe.data_manager, "data", {"reaction_roles": {}})
+    monkeypatch.setattr(reaction_role_system, "reaction_roles", {})
+
+    # Guild B (200) binds 👍 on message 900 in its channel 20
+    reaction_role_system.bind(200, 20, 900, "👍", 5)
+    guild_a = FakeGuild(100, [10])
+    guild_b = FakeGuild(200, [20])
+
+    # Owner of A pairs one of A's channels with B's message ID
+    reply = remove_binding(guild_a, "https://discord.com/channels/100/10/900")
+    assert reply.startswith("❌")
+    assert reaction_role_system.role_for(900, "👍") == 5
+    assert "900" in jinbe.data_manager.get_reaction_roles()
+
+    # The right channel in the right guild still works
+    reply = remove_binding(guild_b, "https://discord.com/channels/200/20/900", "👍")
+    assert reply.startswith("✅")
+    assert reaction_role_system.role_for(900, "👍") is None
+    assert "900" not in jinbe.data_manager.get_reaction_roles()
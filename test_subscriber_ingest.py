@@ -0,0 +1,112 @@
+import asyncio
+import time
+
+import aiohttp
+
+from jinbe import SubscriberIngest
+
+# Stand-in for the external poller: bursts of counts for a few guilds
+# posted to a local ingest server on an ephemeral port
+async def run_poller_burst():
+    evaluated = []
+
+    async def evaluate(guild_id, count):
+        evaluated.append((guild_id, count, time.monotonic()))
+
+    ingest = SubscriberIngest(evaluate, interval=0.5, token="secret")
+    await ingest.start("127.0.0.1", 0)
+    port = ingest.runner.addresses[0][1]
+    url = f"http://127.0.0.1:{port}/subscribers"
+    headers = {"Authorization": "Bearer secret"}
+
+    try:
+        async with aiohttp.ClientSession() as session:
+            # 3 guilds x 50 updates each, sent as fast as possible
+            for count in range(1000, 1050):
+                for guild_id in (1, 2, 3):
+                    async with session.post(url, json={"guild_id": guild_id, "count": count}, headers=headers) as response:
+                        assert response.status == 202
+
+            # Batched form, rejected auth and malformed bodies
+            async with session.post(url, json={"updates": [{"guild_id": 1, "count": 5000}]}, headers=headers) as response:
+                assert response.status == 202
+            async with session.post(url, json={"guild_id": 1, "count": 1}) as response:
+                assert response.status == 401
+            async with session.post(url, json={"guild_id": "x"}, headers=headers) as response:
+                assert response.status == 400
+
+            await asyncio.sleep(1.2)
+
+            async with session.get(f"http://127.0.0.1:{port}/subscribers/metrics") as response:
+                metrics = await response.json()
+    finally:
+        await ingest.stop()
+
+    return evaluated, metrics
+
+def test_burst_is_coalesced_per_guild():
+    evaluated, metrics = asyncio.run(run_poller_burst())
+
+    # Each guild gets its first evaluation right away, then at most one per interval
+    by_guild = {}
+    for guild_id, count, at in evaluated:
+        by_guild.setdefault(guild_id, []).append((count, at))
+    assert set(by_guild) == {1, 2, 3}
+    for guild_id, runs in by_guild.items():
+        assert len(runs) <= 3
+        for (_, first), (_, second) in zip(runs, runs[1:]):
+            assert second - first >= 0.45
+
+    # The newest count always wins
+    assert by_guild[1][-1][0] == 5000
+    assert by_guild[2][-1][0] == 1049
+    assert by_guild[3][-1][0] == 1049
+
+    assert metrics["received"] == 151
+    assert metrics["rejected"] == 2
+    assert metrics["evaluations"] == len(evaluated)
+    assert metrics["coalesced"] == metrics["received"] - metrics["evaluations"]
+    assert metrics["pending_guilds"] == 0
+    assert metrics["evaluation_latency_max"] >= metrics["evaluation_latency_p95"] >= 0
+
+def test_evaluation_error_does_not_stop_ingest():
+    async def scenario():
+        calls = []
+
+        async def evaluate(guild_id, count):
+            calls.append(count)
+            if len(calls) == 1:
+                raise RuntimeError("discord unavailable")
+
+        ingest = SubscriberIngest(evaluate, interval=0.1, token=None)
+        ingest.submit(1, 10)
+        await asyncio.sleep(0.05)
+        ingest.submit(1, 20)
+        await asyncio.sleep(0.2)
+        await ingest.stop()
+        return calls, ingest.metrics()
+
+    calls, metrics = asyncio.run(scenario())
+    assert calls == [10, 20]
+    assert metrics["evaluations"] == 2
+
+def test_stop_cancels_pending_evaluations():
+    async def scenario():
+        calls = []
+
+        async def evaluate(guild_id, count):
+            calls.append((guild_id, count))
+
+        ingest = SubscriberIngest(evaluate, interval=0.2, token=None)
+        ingest.submit(1, 10)
+        await asyncio.sleep(0.05)
+        ingest.submit(1, 20)  # Waits for the interval
+        ingest.submit(2, 30)  # Not evaluated yet either
+        await ingest.stop()
+        await asyncio.sleep(0.4)
+        return calls, ingest
+
+    calls, ingest = asyncio.run(scenario())
+    assert calls == [(1, 10)]
+    assert ingest.timers == {}
+    assert set(ingest.pending) == {1, 2}